@@ -1,9 +1,9 @@
 from typing import Any
 
-from dateutil.parser import parse
 from httpx import Response
 
-from app.models.todoist import Task
+from app.models.todoist import SyncResult, Task
+from app.utils.dates import parse_date
 
 
 def build_task_from_response(response: Response) -> Task:
@@ -16,9 +16,13 @@ def build_tasks_from_response(response: Response) -> list[Task]:
     return [_build_task_from_json(task) for task in json]
 
 
+def build_sync_result_from_response(response: Response) -> SyncResult:
+    return SyncResult(**response.json())
+
+
 def _build_task_from_json(json: Any) -> Task:
     try:
-        due_date = parse(json["due"]["date"]).date()
+        due_date = parse_date(json["due"]["date"])
     except (KeyError, TypeError):
         due_date = None
     return Task(due_date=due_date, **json)
@@ -1,10 +1,13 @@
-import asyncio
 from logging import getLogger
+from typing import TYPE_CHECKING
 
 import click
 
-from app.main import main
-from app.show import print_source_names, print_sources
+# The application modules are imported by each command when it runs, so commands like
+# `--help` or `print` do not pay for importing the HTTP, AWS and HTML parsing libraries
+if TYPE_CHECKING:  # pragma: no cover
+    from app.core.result_cache import ResultCacheMode
+    from app.core.sharding import Shard
 
 logger = getLogger(__name__)
 dry_run = click.option(
@@ -13,16 +16,53 @@ dry_run = click.option(
     is_flag=True,
     help="Do not send any telegram messages or create any todoist tasks",
 )
+result_cache = click.option(
+    "--result-cache",
+    type=click.Choice(["use", "refresh", "bypass"]),
+    default="use",
+    show_default=True,
+    help="Serve recent source results from the local cache, refresh it or bypass it",
+)
+
+
+def _parse_shard(_ctx: click.Context, _param: click.Parameter, value: str | None) -> "Shard | None":
+    if value is None:
+        return None
+
+    from app.core.sharding import parse_shard
+
+    try:
+        return parse_shard(value)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc))
+
+
+shard = click.option(
+    "--shard",
+    callback=_parse_shard,
+    metavar="i/N",
+    help="Only process the part i (starting at 0) of the sources split in N parts",
+)
 
 
 @click.group(invoke_without_command=True, context_settings={"help_option_names": ["-h", "--help"]})
 @dry_run
+@result_cache
+@shard
 @click.pass_context
-def cli(ctx: click.Context, dry_run: bool) -> None:
+def cli(
+    ctx: click.Context, dry_run: bool, result_cache: "ResultCacheMode", shard: "Shard | None"
+) -> None:
     ctx.ensure_object(dict)
     ctx.obj["dry_run"] = dry_run
+    ctx.obj["result_cache"] = result_cache
+    ctx.obj["shard"] = shard
     if ctx.invoked_subcommand is None:
-        asyncio.run(main(dry_run=dry_run))
+        import asyncio
+
+        from app.main import main
+
+        asyncio.run(main(dry_run=dry_run, result_cache=result_cache, shard=shard))
 
 
 @cli.command()
@@ -34,8 +74,27 @@ def update_single_source(ctx: click.Context, entire_source: str) -> None:
     This command only creates todoist tasks, it does not send telegram notifications
     for non scheduled episodes.
     """
+    import asyncio
+
+    from app.main import main
+
+    dry_run = ctx.obj["dry_run"]
+    result_cache = ctx.obj["result_cache"]
+    asyncio.run(main(entire_source=entire_source, dry_run=dry_run, result_cache=result_cache))
+
+
+@cli.command()
+@click.pass_context
+def daemon(ctx: click.Context) -> None:
+    """Keep processing the sources, each one on its own interval, until SIGTERM is received."""
+    import asyncio
+
+    from app.daemon import run_daemon
+
     dry_run = ctx.obj["dry_run"]
-    asyncio.run(main(entire_source=entire_source, dry_run=dry_run))
+    result_cache = ctx.obj["result_cache"]
+    shard = ctx.obj["shard"]
+    asyncio.run(run_daemon(dry_run=dry_run, result_cache=result_cache, shard=shard))
 
 
 @cli.group("print")
@@ -45,11 +104,15 @@ def print_cli() -> None:
 
 @print_cli.command("sources")
 def print_helper_sources() -> None:
+    from app.show import print_sources
+
     print_sources()
 
 
 @print_cli.command("source-names")
 def print_helper_source_names() -> None:
+    from app.show import print_source_names
+
     print_source_names()
 
 
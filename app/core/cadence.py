@@ -0,0 +1,88 @@
+from collections.abc import Iterable
+from datetime import date, datetime, time
+from statistics import median
+
+from pydantic import BaseModel
+
+from app.core.state_store import StateStore, get_state_store
+from app.settings import settings
+
+# Only the most recent releases are kept, so the cadence follows changes in the schedule
+MAX_RELEASES = 20
+
+
+class ReleaseHistory(BaseModel):
+    """Timestamps of the releases of a source, sorted and without duplicates.
+
+    Scheduled episodes are recorded by their release date, which can be in the future, and
+    non scheduled episodes by the time they were discovered.
+    """
+
+    releases: list[float] = []
+
+    def add(self, timestamps: Iterable[float]) -> None:
+        releases = sorted(set(self.releases).union(timestamps))
+        self.releases = releases[-MAX_RELEASES:]
+
+    @property
+    def cadence(self) -> float | None:
+        """Median number of seconds between releases, None if it is unknown."""
+        gaps = [b - a for a, b in zip(self.releases, self.releases[1:])]
+        if not gaps:
+            return None
+        return median(gaps)
+
+    def get_next_release(self, now: float) -> float | None:
+        """Timestamp of the next known release, or the expected one from the cadence."""
+        upcoming = [x for x in self.releases if x > now]
+        if upcoming:
+            return upcoming[0]
+        if self.cadence is None:
+            return None
+        return self.releases[-1] + self.cadence
+
+
+def date_to_timestamp(value: date) -> float:
+    return datetime.combine(value, time()).timestamp()
+
+
+class AdaptivePollingPolicy:
+    """Poll interval of each source, learned from its release history.
+
+    Sources are polled every `min_interval` seconds around their expected release, in a window
+    of `window` times the cadence on each side. Before the window the source is polled again
+    when the window starts, and after it the interval grows with the delay of the release, so
+    sources that stopped releasing, like ended series, are polled every `max_interval`.
+    """
+
+    window = 0.05
+
+    def __init__(self, min_interval: float, max_interval: float):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    def get_interval(self, history: ReleaseHistory | None, now: float) -> float | None:
+        """Seconds until the next poll, None if the release cadence is unknown."""
+        if history is None or history.cadence is None:
+            return None
+
+        next_release = history.get_next_release(now)
+        assert next_release is not None
+        window = history.cadence * self.window
+        if now < next_release - window:
+            interval = next_release - window - now
+        elif now <= next_release + window:
+            interval = self.min_interval
+        else:
+            interval = now - next_release
+        return min(max(interval, self.min_interval), self.max_interval)
+
+
+def get_polling_policy() -> AdaptivePollingPolicy | None:
+    if settings.daemon_polling_policy != "adaptive":
+        return None
+    return AdaptivePollingPolicy(settings.daemon_min_interval, settings.daemon_max_interval)
+
+
+def get_release_history_store() -> StateStore[ReleaseHistory] | None:
+    return get_state_store("releases", ReleaseHistory)
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from importlib.util import find_spec
+
+from httpx import URL, AsyncClient, Limits
+
+from app.settings import settings
+from app.utils.misc import get_version
+
+logger = logging.getLogger(__name__)
+
+
+class ClientManager:
+    """Process-wide registry of HTTP clients, one per host.
+
+    Each client keeps its own keep-alive connection pool, so every repository and provider
+    talking to the same host reuses warm connections instead of paying a new TCP and TLS
+    handshake per request.
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[str, AsyncClient] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def get_client(self, url: str) -> AsyncClient:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pooled connections are bound to the event loop that opened them, so the clients
+            # of a previous loop can't be closed (or reused) from this one
+            if self._clients:
+                logger.warning(
+                    "Dropping %d HTTP clients of a previous event loop without closing them, "
+                    "call aclose before the event loop finishes",
+                    len(self._clients),
+                )
+            self._clients = {}
+            self._loop = loop
+
+        key = self._get_host_key(url)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._clients[key] = self._create_client(key)
+        return client
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients = {}
+        await asyncio.gather(*[client.aclose() for client in clients])
+
+    @staticmethod
+    def _get_host_key(url: str) -> str:
+        parsed_url = URL(url)
+        return f"{parsed_url.scheme}://{parsed_url.netloc.decode('ascii')}"
+
+    @staticmethod
+    def _create_client(key: str) -> AsyncClient:
+        http2 = _is_http2_enabled()
+        limits = Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        # The Accept-Encoding header is set by httpx, it includes brotli if it is installed
+        headers = {"User-Agent": "EntertainmentSourceManager/" + get_version()}
+        client = AsyncClient(
+            timeout=10,
+            follow_redirects=True,
+            headers=headers,
+            limits=limits,
+            http2=http2,
+        )
+        logger.debug("Created HTTP client for %s", key, extra={"http2": http2})
+        return client
+
+
+def _is_http2_enabled() -> bool:
+    if not settings.http2_enabled:
+        return False
+    if find_spec("h2") is None:
+        logger.warning("HTTP/2 is enabled but the h2 package is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+client_manager = ClientManager()
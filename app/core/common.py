@@ -1,62 +1,218 @@
+import asyncio
 import logging
+from collections.abc import Callable
 from copy import deepcopy
 from datetime import date
-from typing import Any
+from time import monotonic
+from typing import Any, TypeVar
 
-from bs4 import BeautifulSoup
 from click import ClickException
-from httpx import AsyncClient, Response
+from httpx import URL, Response
 
-from app.utils.misc import get_version
+from app.core.client import client_manager
+from app.core.http_cache import get_http_cache
+from app.core.rate_limit import parse_retry_after, rate_limiters
+from app.core.retry import RetryPolicy
+from app.core.singleflight import SingleFlight
+from app.core.streaming import PageReader
+from app.core.workers import worker_pool
+from app.models.settings import HTMLParser
+from app.settings import settings
 
 _DCT = dict[str, Any] | None
 logger = logging.getLogger(__name__)
+T = TypeVar("T")
+# Shared by all the repositories, so identical concurrent page requests are sent only once
+_page_flight: SingleFlight[str] = SingleFlight()
 
 
 class BaseRepository:
+    # Name used to look up per provider settings, like the HTTP cache TTL
+    provider_name: str | None = None
+    # Seconds a cached page is served without revalidating it with the server
+    http_cache_ttl: float = 0
+    retry_policy = RetryPolicy()
+
     def __init__(self, api_base_url: str, bearer_token: str | None = None):
         self.bearer_token = bearer_token
         self.api_base_url = api_base_url
 
     async def _send_request(
-        self, method: str, path: str, data: _DCT = None, params: _DCT = None
+        self,
+        method: str,
+        path: str,
+        data: _DCT = None,
+        params: _DCT = None,
+        headers: dict[str, str] | None = None,
+        page_reader: PageReader | None = None,
     ) -> Response:
-        headers = {
-            "User-Agent": "EntertainmentSourceManager/" + get_version(),
-        }
+        """Send an HTTP request, retrying it according to the repository retry policy.
+
+        If `page_reader` is set, the response is streamed and the body of successful responses
+        is read by it, instead of being loaded into `response.text`.
+        """
+        headers = dict(headers or {})
         if self.bearer_token:
             headers["Authorization"] = f"Bearer {self.bearer_token}"
 
         url = self.api_base_url + path
-        async with AsyncClient(timeout=10, follow_redirects=True, headers=headers) as client:
-            response = await client.request(method, url, json=data, params=params)
-            if response.status_code >= 400:
-                logger.error(
-                    "Error sending HTTP request",
-                    extra={
-                        "request": {
-                            "method": method,
-                            "url": url,
-                            "data": data,
-                            "params": params,
-                        },
-                        "response": {
-                            "status_code": response.status_code,
-                            "response_body": response.text,
-                            "response_headers": response.headers,
-                        },
-                    },
+        start = monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = await self._send_request_once(
+                    method, url, data, params, headers, page_reader
                 )
-                raise ClickException(
-                    f"Error while fetching {url}: {response.status_code} {response.text}"
+            except Exception as exc:
+                delay = self.retry_policy.get_delay(method, attempt, monotonic() - start, exc=exc)
+                if delay is None:
+                    raise
+                self._log_retry(method, url, attempt, delay, repr(exc))
+            else:
+                delay = self.retry_policy.get_delay(
+                    method, attempt, monotonic() - start, response=response
                 )
-            return response
+                if delay is None:
+                    break
+                self._log_retry(method, url, attempt, delay, response.status_code)
+            await asyncio.sleep(delay)
+
+        retry_info = {"retries": attempt - 1, "elapsed": monotonic() - start}
+        if attempt > 1:
+            logger.info(
+                "HTTP request to %s finished after %d retries",
+                url,
+                attempt - 1,
+                extra={"retry": retry_info, "status_code": response.status_code},
+            )
+
+        if response.status_code >= 400:
+            logger.error(
+                "Error sending HTTP request",
+                extra={
+                    "request": {
+                        "method": method,
+                        "url": url,
+                        "data": data,
+                        "params": params,
+                    },
+                    "response": {
+                        "status_code": response.status_code,
+                        "response_body": response.text,
+                        "response_headers": response.headers,
+                    },
+                    "retry": retry_info,
+                },
+            )
+            raise ClickException(
+                f"Error while fetching {url}: {response.status_code} {response.text}"
+            )
+        return response
+
+    async def _send_request_once(
+        self,
+        method: str,
+        url: str,
+        data: _DCT,
+        params: _DCT,
+        headers: dict[str, str],
+        page_reader: PageReader | None,
+    ) -> Response:
+        client = client_manager.get_client(url)
+        limiter = rate_limiters.get_limiter(url)
+        request = client.build_request(method, url, json=data, params=params, headers=headers)
+        async with limiter.acquire():
+            response = await client.send(request, stream=True)
+            try:
+                if page_reader and response.is_success:
+                    await page_reader.read(response)
+                else:
+                    await response.aread()
+            finally:
+                await response.aclose()
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if response.status_code in (429, 503) and retry_after is not None:
+            limiter.pause(retry_after)
+        return response
+
+    def _log_retry(self, method: str, url: str, attempt: int, delay: float, reason: Any) -> None:
+        logger.warning(
+            "Retrying HTTP request to %s in %.2fs (attempt %d failed: %s)",
+            url,
+            delay,
+            attempt,
+            reason,
+            extra={"request": {"method": method, "url": url}, "retry_delay": delay},
+        )
+
+    async def _send_request_page(
+        self,
+        method: str,
+        path: str,
+        data: _DCT = None,
+        params: _DCT = None,
+        stop_after: str | None = None,
+    ) -> str:
+        """Fetch an HTML page and return its text.
+
+        If `stop_after` is set, the download stops once the element with that id is closed.
+
+        Concurrent GET requests to the same URL share a single request.
+        """
+        if method != "GET" or data is not None:
+            return await self._get_page(method, path, data, params, stop_after)
+
+        url = self.api_base_url + path
+        key = (method, url, str(sorted((params or {}).items())), stop_after)
+        return await _page_flight.do(
+            key, lambda: self._get_page(method, path, data, params, stop_after)
+        )
+
+    async def _run_parser(self, func: Callable[..., T], *args: Any) -> T:
+        """Run a parsing function in the worker pool, see `app.core.workers.WorkerPool`."""
+        return await worker_pool.run(func, *args)
+
+    async def _get_page(
+        self, method: str, path: str, data: _DCT, params: _DCT, stop_after: str | None
+    ) -> str:
+        reader = PageReader(settings.http_max_body_size, stop_after)
+        cache = get_http_cache()
+        if cache is None or method != "GET":
+            await self._send_request(method, path, data, params, page_reader=reader)
+            return reader.text
+
+        url = str(URL(self.api_base_url + path, params=params))
+        # Pages cut short by `stop_after` are cached apart from the whole ones
+        key = f"{url}#{stop_after}" if stop_after else url
+        entry = cache.get(key)
+        if entry is None:
+            response = await self._send_request(method, path, data, params, page_reader=reader)
+            return cache.set(key, response, reader.text).body
+
+        if entry.age < self._get_http_cache_ttl():
+            logger.debug("Serving %s from HTTP cache", url, extra={"cache_age": entry.age})
+            return entry.body
+
+        response = await self._send_request(
+            method, path, data, params, entry.validators, page_reader=reader
+        )
+        if response.status_code == 304:
+            logger.debug("Page %s not modified, serving it from HTTP cache", url)
+            cache.refresh(entry)
+            return entry.body
+        return cache.set(key, response, reader.text).body
+
+    def _get_html_parser(self) -> HTMLParser:
+        if self.provider_name is None:
+            return settings.html_parser
+        return settings.html_parsers.get(self.provider_name, settings.html_parser)
 
-    async def _send_request_soup(
-        self, method: str, path: str, data: _DCT = None, params: _DCT = None
-    ) -> BeautifulSoup:
-        response = await self._send_request(method, path, data, params)
-        return BeautifulSoup(response.text, "html.parser")
+    def _get_http_cache_ttl(self) -> float:
+        if self.provider_name is None:
+            return self.http_cache_ttl
+        return settings.http_cache_ttl.get(self.provider_name, self.http_cache_ttl)
 
     def _normalize_payload(self, payload: dict[str, Any]) -> dict[str, Any]:
         payload = deepcopy(payload)
@@ -0,0 +1,101 @@
+import logging
+import os
+from hashlib import sha256
+from pathlib import Path
+from time import time
+
+from httpx import Response
+from pydantic import BaseModel, ValidationError
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(BaseModel):
+    url: str
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+    body: str
+
+    @property
+    def age(self) -> float:
+        return time() - self.stored_at
+
+    @property
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    """On-disk cache of HTTP responses, used to send conditional GET requests.
+
+    Each URL is stored in its own file. Reading an entry updates the file modification time,
+    so when the cache grows bigger than `max_size` bytes the least recently used entries
+    are evicted first.
+    """
+
+    def __init__(self, path: Path, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def get(self, url: str) -> CacheEntry | None:
+        file = self._get_file(url)
+        try:
+            entry = CacheEntry.parse_raw(file.read_text("utf-8"))
+        except FileNotFoundError:
+            return None
+        except ValidationError:
+            logger.warning("Removing corrupted HTTP cache entry for %s", url)
+            file.unlink(missing_ok=True)
+            return None
+        os.utime(file)
+        return entry
+
+    def set(self, url: str, response: Response, body: str) -> CacheEntry:
+        entry = CacheEntry(
+            url=url,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            stored_at=time(),
+            body=body,
+        )
+        self._write(entry)
+        return entry
+
+    def refresh(self, entry: CacheEntry) -> None:
+        entry.stored_at = time()
+        self._write(entry)
+
+    def _write(self, entry: CacheEntry) -> None:
+        file = self._get_file(entry.url)
+        tmp_file = file.with_suffix(".tmp")
+        tmp_file.write_text(entry.json(), "utf-8")
+        tmp_file.replace(file)
+        self._evict()
+
+    def _evict(self) -> None:
+        files = [(x, x.stat()) for x in self.path.glob("*.json")]
+        total_size = sum(stat.st_size for _, stat in files)
+        for file, stat in sorted(files, key=lambda x: x[1].st_mtime):
+            if total_size <= self.max_size:
+                break
+            logger.debug("Evicting HTTP cache file %s", file.name)
+            file.unlink(missing_ok=True)
+            total_size -= stat.st_size
+
+    def _get_file(self, url: str) -> Path:
+        return self.path / (sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def get_http_cache() -> HTTPCache | None:
+    if settings.cache_dir is None:
+        return None
+    return HTTPCache(settings.cache_dir / "http", settings.http_cache_max_size)
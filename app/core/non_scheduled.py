@@ -3,6 +3,8 @@ from datetime import date
 from itertools import groupby
 from logging import getLogger
 
+from app.core.sink import EpisodesSink
+from app.core.todoist_writer import get_todoist_writer
 from app.models.episodes import NonScheduledEpisode, S3NonScheduledEpisode
 from app.models.todoist import TaskCreate
 from app.repositories.s3 import S3Repository
@@ -15,51 +17,112 @@ logger = getLogger(__name__)
 async def process_non_scheduled_episodes(
     episodes: list[NonScheduledEpisode], assume_new: bool, dry_run: bool
 ) -> None:
-    today = date.today()
-    source_names = {x.source_name for x in episodes}
-
-    s3_repo = S3Repository()
-    todoist_repo = TodoistRepository()
-    telegram_repo = TelegramRepository()
-
-    s3_episodes = await get_all_episodes(s3_repo, source_names)
-    s3_episodes_map = {f"{x.source_name} {x.chapter_id}": x for x in s3_episodes}
-
-    new_episodes_source_names: set[str] = set()
-    for episode in episodes:
-        task_title = f"{episode.source_name} {episode.chapter_id}"
-        s3_episode = s3_episodes_map.get(task_title)
-
-        if not s3_episode or assume_new:
-            task_content = f"[{task_title}]({episode.chapter_url})"
-            task_create = TaskCreate(
-                content=task_content,
-                description="",
-                project_id=episode.source.inputs.todoist_project_id,
-                section_id=episode.source.inputs.todoist_section_id,
-                due_date=today,
+    sink = NonScheduledEpisodesSink(assume_new, dry_run)
+    await sink.process(episodes)
+    sink.finish()
+
+
+class NonScheduledEpisodesSink(EpisodesSink[NonScheduledEpisode]):
+    """Creates the Todoist tasks and notifications of new non scheduled episodes, in batches.
+
+    Each batch is checked against (and then saved to) the episodes stored in AWS S3 of its
+    own sources, so a batch must contain all the episodes of the sources in it. The tasks of
+    a batch are created together, and only the episodes whose task was created are saved and
+    notified, even if other writes fail or the batch is cancelled.
+    """
+
+    def __init__(self, assume_new: bool, dry_run: bool):
+        self.assume_new = assume_new
+        self.dry_run = dry_run
+        self.s3_repo = S3Repository()
+        self.todoist_repo = TodoistRepository()
+        self.todoist_writer = get_todoist_writer(self.todoist_repo)
+        self.telegram_repo = TelegramRepository()
+        self._found_new_episodes = False
+
+    def finish(self) -> None:
+        if not self._found_new_episodes:
+            logger.info("No new non scheduled episodes")
+
+    async def process(self, episodes: list[NonScheduledEpisode]) -> list[NonScheduledEpisode]:
+        """Process a batch of episodes, returning the new ones."""
+        today = date.today()
+        source_names = {x.source_name for x in episodes}
+
+        s3_episodes = await get_all_episodes(self.s3_repo, source_names)
+        s3_episodes_map = {f"{x.source_name} {x.chapter_id}": x for x in s3_episodes}
+
+        new_episodes: list[NonScheduledEpisode] = []
+        # Episode, temporary task id and notification of each task to create
+        writes: list[tuple[NonScheduledEpisode, str, str | None]] = []
+        for episode in episodes:
+            task_title = f"{episode.source_name} {episode.chapter_id}"
+            s3_episode = s3_episodes_map.get(task_title)
+
+            if not s3_episode or self.assume_new:
+                task_content = f"[{task_title}]({episode.chapter_url})"
+                task_create = TaskCreate(
+                    content=task_content,
+                    description="",
+                    project_id=episode.source.inputs.todoist_project_id,
+                    section_id=episode.source.inputs.todoist_section_id,
+                    due_date=today,
+                )
+                logger.info(
+                    "Creating task and notification for %r (forced=%r)",
+                    task_title,
+                    self.assume_new,
+                    extra={
+                        "task_create": task_create.dict(),
+                        "op": "create_task",
+                        "type": "non_scheduled",
+                    },
+                )
+                new_episodes.append(episode)
+                if not self.dry_run:
+                    temp_id = self.todoist_writer.create_task(task_create)
+                    message = None if self.assume_new else f"New episode: {task_content}"
+                    writes.append((episode, temp_id, message))
+
+        if not new_episodes:
+            return new_episodes
+
+        self._found_new_episodes = True
+        if self.dry_run:
+            await self._save_created(episodes, new_episodes, new_episodes, [], s3_episodes)
+            return new_episodes
+
+        try:
+            await self.todoist_writer.flush()
+        finally:
+            created = self.todoist_writer.created
+            created_writes = [x for x in writes if x[1] in created]
+            await self._save_created(
+                episodes,
+                new_episodes,
+                [x[0] for x in created_writes],
+                [x[2] for x in created_writes if x[2]],
+                s3_episodes,
             )
-            logger.info(
-                "Creating task and notification for %r (forced=%r)",
-                task_title,
-                assume_new,
-                extra={
-                    "task_create": task_create.dict(),
-                    "op": "create_task",
-                    "type": "non_scheduled",
-                },
-            )
-            new_episodes_source_names.add(episode.source_name)
-            if not dry_run:
-                await todoist_repo.create_task(task_create)
-                if not assume_new:
-                    await telegram_repo.send_message(f"New episode: {task_content}")
-
-    if not new_episodes_source_names:
-        logger.info("No new non scheduled episodes")
-        return
-
-    await update_s3_info(s3_repo, new_episodes_source_names, episodes, dry_run)
+        return new_episodes
+
+    async def _save_created(
+        self,
+        episodes: list[NonScheduledEpisode],
+        new_episodes: list[NonScheduledEpisode],
+        created_episodes: list[NonScheduledEpisode],
+        messages: list[str],
+        s3_episodes: list[S3NonScheduledEpisode],
+    ) -> None:
+        # New episodes without a task are not saved, so they are created in the next run
+        failed_ids = {id(x) for x in new_episodes} - {id(x) for x in created_episodes}
+        saved_episodes = [x for x in episodes if id(x) not in failed_ids]
+        created_source_names = {x.source_name for x in created_episodes}
+        await update_s3_info(
+            self.s3_repo, created_source_names, saved_episodes, self.dry_run, s3_episodes
+        )
+        for message in messages:
+            await self.telegram_repo.send_message(message)
 
 
 async def update_s3_info(
@@ -67,7 +130,14 @@ async def update_s3_info(
     new_episodes_source_names: set[str],
     episodes: list[NonScheduledEpisode],
     dry_run: bool,
+    s3_episodes: list[S3NonScheduledEpisode] | None = None,
 ) -> None:
+    # Providers with incremental discovery only return the new episodes, so the episodes
+    # already stored in S3 are kept
+    s3_episode_ids: dict[str, list[str]] = {}
+    for s3_episode in s3_episodes or []:
+        s3_episode_ids.setdefault(s3_episode.source_name, []).append(s3_episode.chapter_id)
+
     tasks = []
     for source_name, source_episodes_iter in groupby(episodes, key=lambda x: x.source_name):
         if source_name not in new_episodes_source_names:
@@ -78,7 +148,9 @@ async def update_s3_info(
 
         logger.info("Updating %r episodes in AWS S3", source_name)
         source_episodes = list(source_episodes_iter)
-        episode_ids = [x.chapter_id for x in source_episodes]
+        episode_ids = s3_episode_ids.get(source_name, [])
+        known_ids = set(episode_ids)
+        episode_ids += [x.chapter_id for x in source_episodes if x.chapter_id not in known_ids]
         if not dry_run:
             tasks.append(s3_repo.update_episodes(source_name, episode_ids))
 
@@ -0,0 +1,26 @@
+import logging
+from functools import lru_cache
+from importlib.util import find_spec
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from app.models.settings import HTMLParser
+
+logger = logging.getLogger(__name__)
+FALLBACK_PARSER: HTMLParser = "html.parser"
+
+
+@lru_cache()
+def resolve_parser(parser: HTMLParser) -> HTMLParser:
+    """Return the parser if it is installed, or the builtin fallback parser otherwise."""
+    if parser == "lxml" and find_spec("lxml") is None:
+        logger.warning("HTML parser %r is not installed, using %r", parser, FALLBACK_PARSER)
+        return FALLBACK_PARSER
+    return parser
+
+
+def parse_html(
+    text: str, parser: HTMLParser, parse_only: SoupStrainer | None = None
+) -> BeautifulSoup:
+    # All the backends are BeautifulSoup tree builders, so CSS selectors work the same way
+    return BeautifulSoup(text, resolve_parser(parser), parse_only=parse_only)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from time import monotonic
+
+from httpx import URL
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HostLimiter:
+    """Token bucket rate limiter and concurrency limiter for a single host.
+
+    `rate` is the number of requests per second allowed in the long run, and `burst` the number
+    of requests that can be sent at once after an idle period. A `rate` or `max_concurrency` of
+    None disables the corresponding limit.
+    """
+
+    def __init__(self, host: str, rate: float | None, burst: int, max_concurrency: int | None):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        start = monotonic()
+        if self._semaphore:
+            await self._semaphore.acquire()
+        try:
+            await self._take_token()
+            queue_delay = monotonic() - start
+            if queue_delay >= 0.001:
+                logger.debug(
+                    "Request to %s delayed %.3fs by the rate limiter",
+                    self.host,
+                    queue_delay,
+                    extra={"host": self.host, "queue_delay": queue_delay},
+                )
+            yield
+        finally:
+            if self._semaphore:
+                self._semaphore.release()
+
+    def pause(self, seconds: float) -> None:
+        logger.info("Pausing requests to %s for %.3fs", self.host, seconds)
+        self._paused_until = max(self._paused_until, monotonic() + seconds)
+
+    async def _take_token(self) -> None:
+        async with self._lock:
+            while True:
+                now = monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self.rate is None:
+                    return
+
+                elapsed = now - self._updated_at
+                self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RateLimiterRegistry:
+    def __init__(self) -> None:
+        self._limiters: dict[str, HostLimiter] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def get_limiter(self, url: str) -> HostLimiter:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Locks and semaphores are bound to the event loop that uses them
+            self._limiters = {}
+            self._loop = loop
+
+        host = URL(url).host
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = self._limiters[host] = HostLimiter(
+                host,
+                rate=settings.http_rate_limits.get(host),
+                burst=settings.http_rate_limit_burst,
+                max_concurrency=settings.http_concurrency_limits.get(host),
+            )
+        return limiter
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse the Retry-After header, which can be a number of seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+rate_limiters = RateLimiterRegistry()
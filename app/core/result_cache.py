@@ -0,0 +1,111 @@
+import json
+import logging
+import sqlite3
+import zlib
+from collections.abc import Sequence
+from hashlib import sha256
+from pathlib import Path
+from time import time
+from typing import Any, Literal
+
+from app.models.episodes import EpisodeBase, NonScheduledEpisode, ScheduledEpisode
+from app.models.source import Source
+from app.settings import settings
+from app.utils.misc import get_version
+
+logger = logging.getLogger(__name__)
+ResultCacheMode = Literal["use", "refresh", "bypass"]
+EPISODE_MODELS: dict[str, type[EpisodeBase]] = {
+    "ScheduledEpisode": ScheduledEpisode,
+    "NonScheduledEpisode": NonScheduledEpisode,
+}
+
+
+def dump_episodes(episodes: Sequence[EpisodeBase]) -> bytes:
+    """Serialize episodes of the same source in a compact format.
+
+    The source is left out, as it is the same for all the episodes, and the field names are
+    only stored once.
+    """
+    data: dict[str, Any] = {"model": None, "fields": [], "rows": []}
+    if episodes:
+        fields = [x for x in episodes[0].__fields__ if x != "source"]
+        data["model"] = type(episodes[0]).__name__
+        data["fields"] = fields
+        data["rows"] = [[getattr(x, field) for field in fields] for x in episodes]
+    text = json.dumps(data, separators=(",", ":"), default=str)
+    return zlib.compress(text.encode("utf-8"))
+
+
+def load_episodes(data: bytes, source: Source) -> list[EpisodeBase]:
+    loaded = json.loads(zlib.decompress(data))
+    if loaded["model"] is None:
+        return []
+    model = EPISODE_MODELS[loaded["model"]]
+    return [model(source=source, **dict(zip(loaded["fields"], row))) for row in loaded["rows"]]
+
+
+class ResultCache:
+    """SQLite cache of the episodes found for each source.
+
+    Entries are keyed by the source configuration and the application version. If `read` is
+    False, cached entries are ignored but new results are still stored, refreshing the cache.
+    """
+
+    def __init__(self, path: Path, read: bool = True):
+        self.path = path
+        self.read = read
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, data BLOB NOT NULL)"
+            )
+
+    def get(self, source: Source, ttl: float) -> list[EpisodeBase] | None:
+        if not self.read:
+            return None
+        row = self._connection.execute(
+            "SELECT stored_at, data FROM results WHERE key = ?", (self._get_key(source),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        stored_at, data = row
+        age = time() - stored_at
+        if age >= ttl:
+            return None
+        try:
+            episodes = load_episodes(data, source)
+        except Exception:
+            logger.warning("Ignoring corrupted cached results of %r", source.inputs.source_name)
+            return None
+        logger.info(
+            "Serving %d episodes of %r from the result cache",
+            len(episodes),
+            source.inputs.source_name,
+            extra={"cache_age": age},
+        )
+        return episodes
+
+    def set(self, source: Source, episodes: Sequence[EpisodeBase]) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, stored_at, data) VALUES (?, ?, ?)",
+                (self._get_key(source), time(), dump_episodes(episodes)),
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+    @staticmethod
+    def _get_key(source: Source) -> str:
+        key = get_version() + "\n" + source.json()
+        return sha256(key.encode("utf-8")).hexdigest()
+
+
+def get_result_cache(mode: ResultCacheMode) -> ResultCache | None:
+    if settings.cache_dir is None or mode == "bypass":
+        return None
+    return ResultCache(settings.cache_dir / "results.sqlite3", read=mode == "use")
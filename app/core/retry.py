@@ -0,0 +1,62 @@
+import random
+
+from httpx import ConnectError, ConnectTimeout, Response, TimeoutException
+from pydantic import BaseModel
+
+from app.core.rate_limit import parse_retry_after
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class RetryPolicy(BaseModel):
+    """Decides if a failed request must be retried and how long to wait before retrying.
+
+    Requests that never reached the server (connection errors and 429 responses) are retried
+    for any method. Read timeouts and 5xx responses are only retried for `retry_methods`, as
+    the server may have already processed the request.
+    """
+
+    max_attempts: int = 4
+    backoff_base: float = 0.5
+    backoff_cap: float = 8
+    deadline: float = 30
+    retry_methods: frozenset[str] = IDEMPOTENT_METHODS
+    retry_status_codes: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+
+    def get_delay(
+        self,
+        method: str,
+        attempt: int,
+        elapsed: float,
+        response: Response | None = None,
+        exc: Exception | None = None,
+    ) -> float | None:
+        """Return the seconds to wait before the next attempt, or None to stop retrying."""
+        if attempt >= self.max_attempts:
+            return None
+
+        retry_after = None
+        if response is not None:
+            if not self._is_retryable_response(method, response):
+                return None
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        elif exc is None or not self._is_retryable_exception(method, exc):
+            return None
+
+        # Capped exponential backoff with full jitter
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if elapsed + delay > self.deadline:
+            return None
+        return delay
+
+    def _is_retryable_response(self, method: str, response: Response) -> bool:
+        if response.status_code not in self.retry_status_codes:
+            return False
+        return response.status_code == 429 or method in self.retry_methods
+
+    def _is_retryable_exception(self, method: str, exc: Exception) -> bool:
+        if isinstance(exc, (ConnectError, ConnectTimeout)):
+            return True
+        return isinstance(exc, TimeoutException) and method in self.retry_methods
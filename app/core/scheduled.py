@@ -2,6 +2,8 @@ import asyncio
 from datetime import date
 from logging import getLogger
 
+from app.core.sink import EpisodesSink
+from app.core.todoist_writer import get_todoist_writer
 from app.models.episodes import ScheduledEpisode
 from app.models.todoist import Task, TaskCreate, TaskUpdate
 from app.repositories.todoist import TodoistRepository
@@ -12,22 +14,46 @@ logger = getLogger(__name__)
 async def process_scheduled_episodes(
     episodes: list[ScheduledEpisode], assume_new: bool, dry_run: bool
 ) -> None:
-    # We only care about episodes that will be released in the future (excluding today)
-    today = date.today()
-    if assume_new:
-        episodes = [x for x in episodes if x.released_date]
-    else:
-        episodes = [x for x in episodes if x.released_date and x.released_date > today]
+    await ScheduledEpisodesSink(assume_new, dry_run).process(episodes)
 
-    project_ids = set(x.source.inputs.todoist_project_id for x in episodes)
 
-    todoist_repo = TodoistRepository()
-    tasks = await get_tasks_from_project_ids(todoist_repo, project_ids)
-    task_map = {x.content: x for x in tasks}
+class ScheduledEpisodesSink(EpisodesSink[ScheduledEpisode]):
+    """Creates and updates the Todoist tasks of scheduled episodes, in batches.
 
-    for episode in episodes:
+    The tasks of each Todoist project are only listed once, when the first batch with episodes
+    of the project is processed. The task writes of each batch are queued in episode order
+    and sent together once the batch has been checked (see `get_todoist_writer`).
+    """
+
+    def __init__(self, assume_new: bool, dry_run: bool):
+        self.assume_new = assume_new
+        self.dry_run = dry_run
+        self.todoist_repo = TodoistRepository()
+        self.todoist_writer = get_todoist_writer(self.todoist_repo)
+        self._task_map: dict[str, Task] = {}
+        self._project_ids: set[str] = set()
+
+    async def process(self, episodes: list[ScheduledEpisode]) -> None:
+        # We only care about episodes that will be released in the future (excluding today)
+        today = date.today()
+        if self.assume_new:
+            episodes = [x for x in episodes if x.released_date]
+        else:
+            episodes = [x for x in episodes if x.released_date and x.released_date > today]
+
+        project_ids = set(x.source.inputs.todoist_project_id for x in episodes)
+        new_project_ids = project_ids - self._project_ids
+        self._project_ids |= new_project_ids
+        tasks = await get_tasks_from_project_ids(self.todoist_repo, new_project_ids)
+        self._task_map.update({x.content: x for x in tasks})
+
+        for episode in episodes:
+            self._process_episode(episode)
+        await self.todoist_writer.flush()
+
+    def _process_episode(self, episode: ScheduledEpisode) -> None:
         task_content = f"{episode.source_name} {episode.chapter_id}"
-        task = task_map.get(task_content)
+        task = self._task_map.get(task_content)
         task_description = f"Released: {episode.released_date} on {episode.platform}"
 
         if not task:
@@ -43,9 +69,9 @@ async def process_scheduled_episodes(
                 task_content,
                 extra={"task_create": task_create.dict(), "op": "create_task", "type": "scheduled"},
             )
-            if not dry_run:
-                await todoist_repo.create_task(task_create)
-            continue
+            if not self.dry_run:
+                self.todoist_writer.create_task(task_create)
+            return
 
         task_update = TaskUpdate()
         if task.description != task_description:
@@ -64,8 +90,8 @@ async def process_scheduled_episodes(
                 task_content,
                 extra={"params_update": params, "op": "update_task", "type": "scheduled"},
             )
-            if not dry_run:
-                await todoist_repo.update_task(task.id, task_update)
+            if not self.dry_run:
+                self.todoist_writer.update_task(task, task_update)
 
 
 async def get_tasks_from_project_ids(todoist_repo: TodoistRepository, ids: set[str]) -> list[Task]:
@@ -0,0 +1,77 @@
+import logging
+from hashlib import sha256
+
+from pydantic import BaseModel
+
+from app.models.source import Source
+
+logger = logging.getLogger(__name__)
+
+
+class Shard(BaseModel):
+    """Part `index` (starting at 0) of the sources split in `count` parts."""
+
+    index: int
+    count: int
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+def parse_shard(value: str) -> Shard:
+    """Parse a shard in the `i/N` format, raising ValueError if it is not valid."""
+    index, sep, count = value.partition("/")
+    if not sep or not index.isdigit() or not count.isdigit():
+        raise ValueError(f"Invalid shard {value!r}, it must have the format i/N")
+    shard = Shard(index=int(index), count=int(count))
+    if shard.index >= shard.count:
+        raise ValueError(f"Invalid shard {value!r}, i must be between 0 and N-1")
+    return shard
+
+
+def group_sources(sources: list[Source]) -> list[list[Source]]:
+    """Group the sources that share a Todoist project or an AWS S3 key (the source name)."""
+    parents = list(range(len(sources)))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    owners: dict[tuple[str, str], int] = {}
+    for i, source in enumerate(sources):
+        for key in (
+            ("project", source.inputs.todoist_project_id),
+            ("s3", source.inputs.source_name),
+        ):
+            owner = owners.setdefault(key, i)
+            parents[find(i)] = find(owner)
+
+    groups: dict[int, list[Source]] = {}
+    for i, source in enumerate(sources):
+        groups.setdefault(find(i), []).append(source)
+    return list(groups.values())
+
+
+def get_shard_index(group: list[Source], count: int) -> int:
+    # The group is identified by its smallest source name, so it does not depend on the order
+    key = min(x.inputs.source_name for x in group)
+    return int(sha256(key.encode("utf-8")).hexdigest(), 16) % count
+
+
+def filter_shard(sources: list[Source], shard: Shard) -> list[Source]:
+    """Return the sources of `shard`, keeping their order.
+
+    Every group of related sources (see `group_sources`) belongs to a single shard, so two
+    shards never write to the same Todoist project or AWS S3 file.
+    """
+    selected = {
+        id(source)
+        for group in group_sources(sources)
+        if get_shard_index(group, shard.count) == shard.index
+        for source in group
+    }
+    shard_sources = [x for x in sources if id(x) in selected]
+    logger.info("Processing %d of %d sources in shard %s", len(shard_sources), len(sources), shard)
+    return shard_sources
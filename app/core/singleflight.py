@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self, future: "asyncio.Future[T]"):
+        self.future = future
+        self.callers = 0
+
+
+class SingleFlight(Generic[T]):
+    """Deduplicates concurrent calls that share the same key.
+
+    The first caller starts the function in its own task, and every caller arriving while it
+    is still running waits for it and gets the same result (or exception) instead of running
+    it again. A caller that is cancelled (for example by a timeout) stops waiting without
+    affecting the others: the shared task is only cancelled once no callers are left.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, _Call[T]] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            new_call: _Call[T] = _Call(asyncio.ensure_future(func()))
+            new_call.future.add_done_callback(lambda _: self._forget(key, new_call))
+            call = self._calls[key] = new_call
+        else:
+            logger.debug("Joining in-flight call %s", key)
+
+        call.callers += 1
+        try:
+            return await asyncio.shield(call.future)
+        finally:
+            call.callers -= 1
+            if not call.callers and not call.future.done():
+                call.future.cancel()
+                # New callers start the function again instead of joining the cancelled task
+                self._forget(key, call)
+
+    def _forget(self, key: Hashable, call: _Call[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
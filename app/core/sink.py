@@ -0,0 +1,52 @@
+import asyncio
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from logging import getLogger
+from typing import Generic, TypeVar
+
+from app.models.episodes import EpisodeBase
+from app.settings import settings
+
+logger = getLogger(__name__)
+E = TypeVar("E", bound=EpisodeBase)
+
+
+class EpisodesSink(ABC, Generic[E]):
+    """Reconciles batches of episodes, each batch with the episodes of a single source."""
+
+    async def consume(
+        self,
+        queue: "asyncio.Queue[list[E] | None]",
+        on_processed: Callable[[list[E]], None] | None = None,
+    ) -> None:
+        """Process the batches put in `queue` until None is received.
+
+        Each batch must be processed within `RECONCILE_TIMEOUT`, if set. Batches that take
+        longer or fail are logged and skipped, without stopping the rest, and `on_processed` is
+        only called with the batches that were processed.
+        """
+        while (episodes := await queue.get()) is not None:
+            try:
+                async with asyncio.timeout(settings.reconcile_timeout or None):
+                    await self.process(episodes)
+            except TimeoutError:
+                logger.error(
+                    "Timed out reconciling the episodes of source %r after %.0fs",
+                    episodes[0].source_name,
+                    settings.reconcile_timeout,
+                )
+                continue
+            except Exception:
+                template = "Error while reconciling the episodes of source %r"
+                logger.exception(template, episodes[0].source_name)
+                continue
+            if on_processed:
+                on_processed(episodes)
+        self.finish()
+
+    def finish(self) -> None:
+        """Called once all the batches have been processed by `consume`."""
+
+    @abstractmethod
+    async def process(self, episodes: list[E]) -> object:
+        """Process a batch of episodes."""
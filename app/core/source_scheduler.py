@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Callable, Coroutine, Iterable
+from time import monotonic
+from typing import Any
+
+from app.models.source import Source
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SourceScheduler:
+    """Work queue that limits how many sources are processed at the same time.
+
+    At most `max_in_flight` sources are processed at once, and at most `provider_limits[name]`
+    of the provider `name`. A limit of 0 (or a missing provider) means no limit. Sources are
+    started in order, but a source blocked by its provider limit does not hold back the
+    sources of other providers.
+    """
+
+    def __init__(self, max_in_flight: int, provider_limits: dict[str, int]):
+        self.max_in_flight = max_in_flight
+        self.provider_limits = provider_limits
+        self.max_queue_wait = 0.0
+        self._in_flight: dict[str, int] = {}
+
+    async def run(
+        self, sources: Iterable[Source], func: Callable[[Source], Coroutine[Any, Any, None]]
+    ) -> None:
+        queue = deque((source, monotonic()) for source in sources)
+        total = len(queue)
+        running: dict[asyncio.Task[None], str] = {}
+        try:
+            while queue or running:
+                while (item := self._pop_ready(queue, len(running))) is not None:
+                    source, enqueued_at = item
+                    self._start(source, enqueued_at, len(queue))
+                    running[asyncio.create_task(func(source))] = source.provider
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    self._in_flight[running.pop(task)] -= 1
+                    task.result()
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+        logger.info(
+            "Processed %d sources, the longest queue wait was %.3fs",
+            total,
+            self.max_queue_wait,
+            extra={"max_queue_wait": self.max_queue_wait},
+        )
+
+    def _pop_ready(
+        self, queue: deque[tuple[Source, float]], running: int
+    ) -> tuple[Source, float] | None:
+        if self.max_in_flight > 0 and running >= self.max_in_flight:
+            return None
+        for item in queue:
+            limit = self.provider_limits.get(item[0].provider, 0)
+            if limit <= 0 or self._in_flight.get(item[0].provider, 0) < limit:
+                queue.remove(item)
+                return item
+        return None
+
+    def _start(self, source: Source, enqueued_at: float, queue_depth: int) -> None:
+        queue_wait = monotonic() - enqueued_at
+        self.max_queue_wait = max(self.max_queue_wait, queue_wait)
+        self._in_flight[source.provider] = self._in_flight.get(source.provider, 0) + 1
+        logger.debug(
+            "Starting source %r after waiting %.3fs in the queue (%d sources queued)",
+            source.inputs.source_name,
+            queue_wait,
+            queue_depth,
+            extra={"queue_wait": queue_wait, "queue_depth": queue_depth},
+        )
+
+
+def get_source_scheduler() -> SourceScheduler:
+    return SourceScheduler(settings.source_concurrency, settings.source_concurrency_limits)
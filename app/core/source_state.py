@@ -0,0 +1,96 @@
+import json
+import logging
+from collections.abc import Iterable, Sequence
+from hashlib import sha256
+
+from pydantic import BaseModel
+
+from app.core.state_store import StateStore, get_state_store
+from app.models.episodes import EpisodeBase
+from app.models.source import Source
+from app.utils.misc import get_version
+
+logger = logging.getLogger(__name__)
+
+
+class SourceState(BaseModel):
+    payload_hash: str
+    episodes_hash: str
+    # Last episode found by providers with incremental discovery, see `BaseProvider.get_watermark`
+    watermark: dict[str, str] | None = None
+
+
+def hash_payload(pages: list[str]) -> str:
+    digest = sha256()
+    for page in pages:
+        digest.update(page.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def hash_episodes(episodes: Sequence[EpisodeBase]) -> str:
+    data = json.dumps([x.dict() for x in episodes], sort_keys=True, default=str)
+    return sha256(data.encode("utf-8")).hexdigest()
+
+
+class SourceTracker:
+    """Detects sources whose pages or episodes did not change since the last run.
+
+    The state of each source is keyed by the source configuration and the application version,
+    so changing either invalidates it. New states are kept in memory until `commit` is called,
+    which must only happen once the episodes have been reconciled.
+    """
+
+    def __init__(self, store: StateStore[SourceState]):
+        self.store = store
+        self._pending: dict[str, SourceState] = {}
+
+    def is_payload_unchanged(self, source: Source, pages: list[str]) -> bool:
+        state = self.store.get(self._get_key(source))
+        if state is None or state.payload_hash != hash_payload(pages):
+            return False
+        logger.info("Skipping source %r, its pages did not change", source.inputs.source_name)
+        return True
+
+    def get_watermark(self, source: Source) -> dict[str, str] | None:
+        state = self.store.get(self._get_key(source))
+        return state.watermark if state else None
+
+    def is_episodes_unchanged(
+        self,
+        source: Source,
+        pages: list[str],
+        episodes: Sequence[EpisodeBase],
+        watermark: dict[str, str] | None = None,
+    ) -> bool:
+        key = self._get_key(source)
+        state = self.store.get(key)
+        new_state = SourceState(
+            payload_hash=hash_payload(pages),
+            episodes_hash=hash_episodes(episodes),
+            watermark=watermark,
+        )
+        self._pending[key] = new_state
+        if state is None or state.episodes_hash != new_state.episodes_hash:
+            return False
+        logger.info("Skipping source %r, its episodes did not change", source.inputs.source_name)
+        return True
+
+    def commit(self, sources: Iterable[Source] | None = None) -> None:
+        """Save the new states, only the ones of `sources` if set."""
+        keys = list(self._pending) if sources is None else [self._get_key(x) for x in sources]
+        states = [(x, self._pending.pop(x)) for x in keys if x in self._pending]
+        for key, state in states:
+            self.store.set(key, state)
+        logger.debug("Saved the state of %d sources", len(states))
+
+    @staticmethod
+    def _get_key(source: Source) -> str:
+        return get_version() + "\n" + source.json()
+
+
+def get_source_tracker() -> SourceTracker | None:
+    store = get_state_store("sources", SourceState)
+    if store is None:
+        return None
+    return SourceTracker(store)
@@ -0,0 +1,50 @@
+import logging
+from hashlib import sha256
+from pathlib import Path
+from typing import Generic, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+M = TypeVar("M", bound=BaseModel)
+
+
+class StateStore(Generic[M]):
+    """Small on-disk store of models, kept between runs.
+
+    Each key is stored in its own JSON file, written atomically. Corrupted files are ignored,
+    so a broken store only makes the application behave as in a cold start.
+    """
+
+    def __init__(self, path: Path, model: type[M]):
+        self.path = path
+        self.model = model
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> M | None:
+        file = self._get_file(key)
+        try:
+            return self.model.parse_raw(file.read_text("utf-8"))
+        except FileNotFoundError:
+            return None
+        except ValidationError:
+            logger.warning("Ignoring corrupted state %r in %s", key, self.path)
+            return None
+
+    def set(self, key: str, value: M) -> None:
+        file = self._get_file(key)
+        tmp_file = file.with_suffix(".tmp")
+        tmp_file.write_text(value.json(), "utf-8")
+        tmp_file.replace(file)
+
+    def _get_file(self, key: str) -> Path:
+        return self.path / (sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+
+def get_state_store(name: str, model: type[M]) -> StateStore[M] | None:
+    """Return the store `name` under `CACHE_DIR`, or None if local caches are disabled."""
+    if settings.cache_dir is None:
+        return None
+    return StateStore(settings.cache_dir / name, model)
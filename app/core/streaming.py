@@ -0,0 +1,78 @@
+import codecs
+import logging
+from html.parser import HTMLParser
+
+from click import ClickException
+from httpx import Response
+
+logger = logging.getLogger(__name__)
+
+
+class _ElementEndTracker(HTMLParser):
+    """Incremental tokenizer that detects when the element with a given id is closed."""
+
+    def __init__(self, element_id: str):
+        super().__init__(convert_charrefs=False)
+        self.element_id = element_id
+        self.closed = False
+        self._tag: str | None = None
+        self._depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self._tag is None:
+            if ("id", self.element_id) in attrs:
+                self._tag = tag
+                self._depth = 1
+        elif tag == self._tag:
+            self._depth += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == self._tag and not self.closed:
+            self._depth -= 1
+            self.closed = self._depth == 0
+
+
+class PageReader:
+    """Reads the body of a streamed response in chunks.
+
+    Reading stops as soon as the element with id `stop_after` is closed, so the rest of the
+    page is never downloaded. Bodies bigger than `max_size` bytes are rejected.
+    """
+
+    def __init__(self, max_size: int, stop_after: str | None = None):
+        self.max_size = max_size
+        self.stop_after = stop_after
+        self.text = ""
+        self.truncated = False
+
+    async def read(self, response: Response) -> None:
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        tracker = _ElementEndTracker(self.stop_after) if self.stop_after else None
+        chunks: list[str] = []
+        size = 0
+        self.truncated = False
+
+        async for raw_chunk in response.aiter_bytes():
+            size += len(raw_chunk)
+            if size > self.max_size:
+                raise ClickException(
+                    f"Response body of {response.url} is bigger than {self.max_size} bytes"
+                )
+            chunk = decoder.decode(raw_chunk)
+            chunks.append(chunk)
+            if tracker:
+                tracker.feed(chunk)
+                if tracker.closed:
+                    self.truncated = True
+                    break
+
+        if not self.truncated:
+            chunks.append(decoder.decode(b"", final=True))
+        else:
+            logger.debug(
+                "Stopped reading %s after element #%s (%d bytes read)",
+                response.url,
+                self.stop_after,
+                size,
+            )
+        self.text = "".join(chunks)
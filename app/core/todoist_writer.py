@@ -0,0 +1,193 @@
+import asyncio
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from functools import partial
+from logging import getLogger
+from math import ceil
+from typing import Any
+from uuid import uuid4
+
+from click import ClickException
+
+from app.models.todoist import Task, TaskCreate, TaskUpdate
+from app.repositories.todoist import TodoistRepository
+from app.settings import settings
+
+logger = getLogger(__name__)
+# Maximum number of commands the Todoist Sync API accepts in a single request
+MAX_BATCH_SIZE = 100
+
+
+class TodoistWriter(ABC):
+    """Collects Todoist task writes, which are sent by `flush`.
+
+    `created` has the ids of the tasks created by the last `flush` by temporary id. It is
+    updated as the writes finish, so it is also known when `flush` fails or is cancelled.
+    """
+
+    def __init__(self) -> None:
+        self.created: dict[str, str] = {}
+
+    @abstractmethod
+    def create_task(self, task_create: TaskCreate) -> str:
+        """Queue the creation of a task, returning a temporary id."""
+
+    @abstractmethod
+    def update_task(self, task: Task, task_update: TaskUpdate) -> None:
+        """Queue the update of `task`."""
+
+    @abstractmethod
+    async def flush(self) -> dict[str, str]:
+        """Send the queued writes, returning the ids of the created tasks by temporary id."""
+
+
+class TodoistConcurrentWriter(TodoistWriter):
+    """Sends each Todoist task write in its own REST API request, several at the same time.
+
+    At most `max_concurrency` requests are in flight. A failed write does not stop the rest:
+    once all of them finish, the failures are logged in the order the writes were queued and
+    `flush` raises a single ClickException.
+    """
+
+    def __init__(self, todoist_repo: TodoistRepository, max_concurrency: int):
+        super().__init__()
+        self.todoist_repo = todoist_repo
+        self.max_concurrency = max(max_concurrency, 1)
+        self._writes: list[tuple[str | None, str, Callable[[], Awaitable[Task]]]] = []
+
+    def create_task(self, task_create: TaskCreate) -> str:
+        temp_id = str(uuid4())
+        func = partial(self.todoist_repo.create_task, task_create)
+        self._writes.append((temp_id, task_create.content, func))
+        return temp_id
+
+    def update_task(self, task: Task, task_update: TaskUpdate) -> None:
+        func = partial(self.todoist_repo.update_task, task.id, task_update)
+        self._writes.append((None, task.content, func))
+
+    async def flush(self) -> dict[str, str]:
+        writes, self._writes = self._writes, []
+        self.created = {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def send(temp_id: str | None, func: Callable[[], Awaitable[Task]]) -> None:
+            async with semaphore:
+                task = await func()
+            if temp_id:
+                self.created[temp_id] = task.id
+
+        results = await asyncio.gather(*(send(x[0], x[2]) for x in writes), return_exceptions=True)
+
+        failed = 0
+        for (_, task_content, _), result in zip(writes, results):
+            if result is None:
+                continue
+            if not isinstance(result, Exception):
+                raise result
+            failed += 1
+            logger.error(
+                "Todoist write failed for task %r: %s",
+                task_content,
+                result,
+                exc_info=result,
+            )
+
+        if failed:
+            raise ClickException(f"{failed} of {len(writes)} Todoist writes failed")
+        return self.created
+
+
+class TodoistBatchWriter(TodoistWriter):
+    """Collects Todoist task writes and sends them in batches through the Sync API.
+
+    Tasks created by `create_task` get a temporary id, which `flush` maps to the id assigned
+    by Todoist. A failed command does not stop the rest of its batch: every failure is logged
+    and `flush` raises a single ClickException once all the batches have been sent.
+    """
+
+    def __init__(self, todoist_repo: TodoistRepository, batch_size: int = MAX_BATCH_SIZE):
+        super().__init__()
+        self.todoist_repo = todoist_repo
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self._commands: list[dict[str, Any]] = []
+
+    def create_task(self, task_create: TaskCreate) -> str:
+        temp_id = str(uuid4())
+        args: dict[str, Any] = {
+            "content": task_create.content,
+            "description": task_create.description,
+            "project_id": task_create.project_id,
+            "due": {"date": task_create.due_date.isoformat()},
+        }
+        if task_create.section_id:
+            args["section_id"] = task_create.section_id
+        self._add_command("item_add", args, temp_id=temp_id)
+        return temp_id
+
+    def update_task(self, task: Task, task_update: TaskUpdate) -> None:
+        """Queue the update of `task`.
+
+        The Sync API moves tasks with a separate command, so changing the section or the
+        project of the task queues an `item_move` command too.
+        """
+        params = task_update.dict(exclude_unset=True)
+        args: dict[str, Any] = {"id": task.id}
+        for field in ("content", "description"):
+            if field in params:
+                args[field] = params[field]
+        if "due_date" in params:
+            due_date = params["due_date"]
+            args["due"] = {"date": due_date.isoformat()} if due_date else None
+        if len(args) > 1:
+            self._add_command("item_update", args)
+
+        if params.get("section_id"):
+            self._add_command("item_move", {"id": task.id, "section_id": params["section_id"]})
+        elif "section_id" in params or "project_id" in params:
+            # Moving a task to its project (or another one) takes it out of its section
+            project_id = params.get("project_id") or task.project_id
+            self._add_command("item_move", {"id": task.id, "project_id": project_id})
+
+    async def flush(self) -> dict[str, str]:
+        commands, self._commands = self._commands, []
+        self.created = {}
+        failed = 0
+        for i in range(0, len(commands), self.batch_size):
+            batch = commands[i : i + self.batch_size]
+            result = await self.todoist_repo.sync(batch)
+            for command in batch:
+                status = result.sync_status.get(command["uuid"])
+                if status == "ok":
+                    temp_id = command.get("temp_id")
+                    if temp_id:
+                        self.created[temp_id] = result.temp_id_mapping[temp_id]
+                    continue
+                failed += 1
+                logger.error(
+                    "Todoist command %s failed: %s",
+                    command["type"],
+                    status,
+                    extra={"command": command, "sync_status": status},
+                )
+
+        if commands:
+            logger.info(
+                "Sent %d Todoist commands in %d batches",
+                len(commands),
+                ceil(len(commands) / self.batch_size),
+            )
+        if failed:
+            raise ClickException(f"{failed} of {len(commands)} Todoist commands failed")
+        return self.created
+
+    def _add_command(self, type_: str, args: dict[str, Any], temp_id: str | None = None) -> None:
+        command: dict[str, Any] = {"type": type_, "uuid": str(uuid4()), "args": args}
+        if temp_id:
+            command["temp_id"] = temp_id
+        self._commands.append(command)
+
+
+def get_todoist_writer(todoist_repo: TodoistRepository) -> TodoistWriter:
+    if settings.todoist_batch_size:
+        return TodoistBatchWriter(todoist_repo, settings.todoist_batch_size)
+    return TodoistConcurrentWriter(todoist_repo, settings.todoist_concurrency)
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, TypeVar
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+class WorkerPool:
+    """Runs CPU bound functions, like HTML parsing, outside of the event loop.
+
+    The pool is created on first use from the `parser_workers` and `parser_pool` settings.
+    With 0 workers functions run directly in the event loop. Functions run in a process pool
+    must be picklable and must not rely on logging, as it is not configured in the workers.
+    """
+
+    def __init__(self) -> None:
+        self._executor: Executor | None = None
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        if settings.parser_workers <= 0:
+            return func(*args)
+        if self._executor is None:
+            self._executor = self._create_executor()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def _create_executor() -> Executor:
+        logger.debug(
+            "Creating %s pool with %d workers", settings.parser_pool, settings.parser_workers
+        )
+        if settings.parser_pool == "process":
+            return ProcessPoolExecutor(max_workers=settings.parser_workers)
+        return ThreadPoolExecutor(max_workers=settings.parser_workers, thread_name_prefix="parser")
+
+
+worker_pool = WorkerPool()
@@ -0,0 +1,155 @@
+import asyncio
+import random
+import signal
+from logging import getLogger
+from time import time
+
+from click import ClickException
+
+from app.core.cadence import (
+    ReleaseHistory,
+    date_to_timestamp,
+    get_polling_policy,
+    get_release_history_store,
+)
+from app.core.client import client_manager
+from app.core.non_scheduled import NonScheduledEpisodesSink
+from app.core.result_cache import ResultCacheMode, get_result_cache
+from app.core.scheduled import ScheduledEpisodesSink
+from app.core.sharding import Shard, filter_shard
+from app.core.source_state import get_source_tracker
+from app.core.workers import worker_pool
+from app.logs import setup_logging
+from app.main import get_episodes_from_source
+from app.models.episodes import NonScheduledEpisode, ScheduledEpisode
+from app.models.source import Source
+from app.settings import get_sources, settings
+
+logger = getLogger(__name__)
+
+
+class Daemon:
+    """Keeps processing the sources, each one on its own interval, until it is stopped.
+
+    The HTTP connections and caches are shared by all the cycles. Stopping the daemon waits
+    for the cycles in progress to finish.
+    """
+
+    def __init__(
+        self, sources: list[Source], dry_run: bool, result_cache_mode: ResultCacheMode = "use"
+    ):
+        self.sources = sources
+        self.dry_run = dry_run
+        self.result_cache_mode = result_cache_mode
+        self.polling_policy = get_polling_policy()
+        self.release_history = get_release_history_store()
+        self._stop_event = asyncio.Event()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.stop)
+        logger.info("Starting daemon with %d sources", len(self.sources))
+        try:
+            await asyncio.gather(*(self._run_source(source) for source in self.sources))
+        finally:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(signum)
+        logger.info("Daemon stopped")
+
+    def stop(self) -> None:
+        if not self._stop_event.is_set():
+            logger.info("Stopping daemon after the cycles in progress finish")
+            self._stop_event.set()
+
+    def get_interval(self, source: Source) -> float:
+        """Seconds to wait before the next cycle of the source, with jitter applied."""
+        interval = self._get_base_interval(source)
+        jitter = interval * settings.daemon_jitter
+        return max(0.0, interval + random.uniform(-jitter, jitter))
+
+    def _get_base_interval(self, source: Source) -> float:
+        source_name = source.inputs.source_name
+        if self.polling_policy and self.release_history:
+            history = self.release_history.get(source_name)
+            interval = self.polling_policy.get_interval(history, time())
+            if interval is not None:
+                return interval
+        return settings.daemon_intervals.get(source_name, settings.daemon_interval)
+
+    async def run_cycle(self, source: Source) -> None:
+        """Find the episodes of the source and reconcile them with Todoist and AWS S3."""
+        tracker = get_source_tracker()
+        result_cache = get_result_cache(self.result_cache_mode)
+        try:
+            episodes = await get_episodes_from_source(
+                source, disable_filter=False, tracker=tracker, result_cache=result_cache
+            )
+        finally:
+            if result_cache:
+                result_cache.close()
+
+        scheduled_eps = [x for x in episodes if isinstance(x, ScheduledEpisode)]
+        non_scheduled_eps = [x for x in episodes if isinstance(x, NonScheduledEpisode)]
+        releases = [date_to_timestamp(x.released_date) for x in scheduled_eps if x.released_date]
+        if scheduled_eps:
+            sink = ScheduledEpisodesSink(assume_new=False, dry_run=self.dry_run)
+            await sink.process(scheduled_eps)
+        if non_scheduled_eps:
+            sink_ns = NonScheduledEpisodesSink(assume_new=False, dry_run=self.dry_run)
+            if await sink_ns.process(non_scheduled_eps):
+                releases.append(time())
+
+        if not self.dry_run:
+            if tracker:
+                tracker.commit()
+            self._record_releases(source, releases)
+
+    def _record_releases(self, source: Source, releases: list[float]) -> None:
+        if not self.release_history or not releases:
+            return
+        source_name = source.inputs.source_name
+        history = self.release_history.get(source_name) or ReleaseHistory()
+        history.add(releases)
+        self.release_history.set(source_name, history)
+        logger.debug("Release cadence of source %r is %s seconds", source_name, history.cadence)
+
+    async def _run_source(self, source: Source) -> None:
+        # The first cycles are spread over the jitter window, so the sources do not start at once
+        source_name = source.inputs.source_name
+        delay = random.uniform(0, self._get_base_interval(source) * settings.daemon_jitter)
+        while not await self._wait(delay):
+            try:
+                await self.run_cycle(source)
+            except Exception:
+                logger.exception("Error while running the cycle of source %r", source_name)
+            delay = self.get_interval(source)
+            logger.debug("Next cycle of source %r in %.0fs", source_name, delay)
+
+    async def _wait(self, delay: float) -> bool:
+        """Wait `delay` seconds, returning True if the daemon was stopped meanwhile."""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), delay)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+async def run_daemon(
+    *, dry_run: bool = False, result_cache: ResultCacheMode = "use", shard: Shard | None = None
+) -> None:
+    setup_logging()
+    try:
+        sources = get_sources()
+        if shard is not None:
+            sources = filter_shard(sources, shard)
+        sources = [x for x in sources if x.inputs.source_name not in settings.disabled_sources]
+        await Daemon(sources, dry_run, result_cache).run()
+    except Exception as e:
+        if not isinstance(e, ClickException):
+            logger.exception("Internal error")
+            raise ClickException("Internal error: " + str(e))
+        raise
+    finally:
+        await client_manager.aclose()
+        worker_pool.shutdown()
@@ -1,10 +1,18 @@
 import asyncio
+from collections.abc import Coroutine
 from logging import getLogger
+from typing import Any
 
 from click import ClickException
 
-from app.core.non_scheduled import process_non_scheduled_episodes
-from app.core.scheduled import process_scheduled_episodes
+from app.core.client import client_manager
+from app.core.non_scheduled import NonScheduledEpisodesSink
+from app.core.result_cache import ResultCache, ResultCacheMode, get_result_cache
+from app.core.scheduled import ScheduledEpisodesSink
+from app.core.sharding import Shard, filter_shard
+from app.core.source_scheduler import get_source_scheduler
+from app.core.source_state import SourceTracker, get_source_tracker
+from app.core.workers import worker_pool
 from app.logs import setup_logging
 from app.models.episodes import NonScheduledEpisode, ScheduledEpisode
 from app.models.source import Source
@@ -14,18 +22,33 @@ from app.settings import get_sources, settings
 logger = getLogger(__name__)
 
 
-async def _get_episodes_from_source(source: Source, disable_filter: bool) -> _LS | _LNS:
+async def _get_episodes_from_source(
+    source: Source,
+    disable_filter: bool,
+    tracker: SourceTracker | None,
+    result_cache: ResultCache | None,
+) -> _LS | _LNS:
     if not disable_filter and source.inputs.source_name in settings.disabled_sources:
         logger.info("Source %r is disabled", source.inputs.source_name)
         return []  # type: ignore[return-value]
-    result = await process_source(source)
+    result = await process_source(source, tracker, result_cache)
     logger.debug("Found %d episodes for %s", len(result), source.inputs.source_name)
     return result
 
 
-async def get_episodes_from_source(source: Source, disable_filter: bool) -> _LS | _LNS:
+async def get_episodes_from_source(
+    source: Source,
+    disable_filter: bool,
+    tracker: SourceTracker | None = None,
+    result_cache: ResultCache | None = None,
+) -> _LS | _LNS:
     try:
-        return await _get_episodes_from_source(source, disable_filter)
+        async with asyncio.timeout(settings.source_timeout or None):
+            return await _get_episodes_from_source(source, disable_filter, tracker, result_cache)
+    except TimeoutError:
+        template = "Timed out processing source %r after %.0fs"
+        logger.error(template, source.inputs.source_name, settings.source_timeout)
+        return []  # type: ignore[return-value]
     except Exception:
         template = "Error while processing source %r"
         logger.exception(template, source.inputs.source_name)
@@ -41,32 +64,126 @@ def filter_sources(sources: list[Source], entire_source: str) -> list[Source]:
     return filtered_sources
 
 
-async def _main(entire_source: str | None, dry_run: bool) -> None:
+async def _main(
+    entire_source: str | None,
+    dry_run: bool,
+    result_cache_mode: ResultCacheMode = "use",
+    shard: Shard | None = None,
+) -> None:
     sources = get_sources()
     if entire_source is not None:
         sources = filter_sources(sources, entire_source)
+    if shard is not None:
+        sources = filter_shard(sources, shard)
 
     assume_new = entire_source is not None
-    tasks = [get_episodes_from_source(source, disable_filter=assume_new) for source in sources]
-    episodes_nested = await asyncio.gather(*tasks)
-    episodes = [item for sublist in episodes_nested for item in sublist]
+    # Unchanged sources are only skipped in regular runs
+    tracker = None if assume_new else get_source_tracker()
+    result_cache = get_result_cache(result_cache_mode)
+
+    # Each source's episodes are reconciled as soon as its fetch completes. The queues are
+    # bounded, so fetching slows down when the sinks can't keep up
+    scheduled_queue: asyncio.Queue[_LS | None] = asyncio.Queue(settings.pipeline_queue_size)
+    non_scheduled_queue: asyncio.Queue[_LNS | None] = asyncio.Queue(settings.pipeline_queue_size)
+    scheduled_count = non_scheduled_count = 0
+    # The state of a source is only committed once all its batches have been reconciled.
+    # Providers can name their episodes differently from their inputs, so each batch is
+    # matched to its source by identity
+    batch_sources: dict[int, Source] = {}
+    pending_batches: dict[str, int] = {}
+    finished_sources: list[Source] = []
+
+    def on_processed(episodes: _LS | _LNS) -> None:
+        source = batch_sources.pop(id(episodes))
+        pending_batches[source.inputs.source_name] -= 1
+        if not pending_batches[source.inputs.source_name]:
+            finished_sources.append(source)
+
+    async def produce(source: Source) -> None:
+        nonlocal scheduled_count, non_scheduled_count
+        episodes = await get_episodes_from_source(
+            source, disable_filter=assume_new, tracker=tracker, result_cache=result_cache
+        )
+        scheduled_eps = [x for x in episodes if isinstance(x, ScheduledEpisode)]
+        non_scheduled_eps = [x for x in episodes if isinstance(x, NonScheduledEpisode)]
+        scheduled_count += len(scheduled_eps)
+        non_scheduled_count += len(non_scheduled_eps)
+        pending_batches[source.inputs.source_name] = bool(scheduled_eps) + bool(non_scheduled_eps)
+        if not scheduled_eps and not non_scheduled_eps:
+            finished_sources.append(source)
+        if scheduled_eps:
+            batch_sources[id(scheduled_eps)] = source
+            await scheduled_queue.put(scheduled_eps)
+        if non_scheduled_eps:
+            batch_sources[id(non_scheduled_eps)] = source
+            await non_scheduled_queue.put(non_scheduled_eps)
+
+    async def produce_all() -> None:
+        try:
+            await get_source_scheduler().run(sources, produce)
+        finally:
+            if result_cache:
+                result_cache.close()
+        logger.info("Found %d scheduled episodes", scheduled_count)
+        logger.info("Found %d non-scheduled episodes", non_scheduled_count)
+        await scheduled_queue.put(None)
+        await non_scheduled_queue.put(None)
+
+    scheduled_sink = ScheduledEpisodesSink(assume_new=assume_new, dry_run=dry_run)
+    non_scheduled_sink = NonScheduledEpisodesSink(assume_new=assume_new, dry_run=dry_run)
+    deadline_exceeded = False
+    try:
+        async with asyncio.timeout(settings.run_timeout or None):
+            await run_pipeline(
+                produce_all(),
+                scheduled_sink.consume(scheduled_queue, on_processed),
+                non_scheduled_sink.consume(non_scheduled_queue, on_processed),
+            )
+    except TimeoutError:
+        deadline_exceeded = True
+        logger.error(
+            "Run deadline of %.0fs exceeded, cancelled the sources in progress",
+            settings.run_timeout,
+        )
+
+    if tracker and not dry_run:
+        tracker.commit(finished_sources)
+    if deadline_exceeded:
+        msg = f"Run deadline of {settings.run_timeout:.0f}s exceeded, "
+        msg += f"{len(finished_sources)} of {len(sources)} sources finished"
+        raise ClickException(msg)
 
-    scheduled_eps = [x for x in episodes if isinstance(x, ScheduledEpisode)]
-    non_scheduled_eps = [x for x in episodes if isinstance(x, NonScheduledEpisode)]
 
-    logger.info("Found %d scheduled episodes", len(scheduled_eps))
-    logger.info("Found %d non-scheduled episodes", len(non_scheduled_eps))
+async def run_pipeline(*stages: Coroutine[Any, Any, None]) -> None:
+    """Run the pipeline stages concurrently.
 
-    await process_scheduled_episodes(scheduled_eps, assume_new=assume_new, dry_run=dry_run)
-    await process_non_scheduled_episodes(non_scheduled_eps, assume_new=assume_new, dry_run=dry_run)
+    If a stage fails the rest are cancelled, as they could be waiting forever on its queue.
+    """
+    tasks = [asyncio.create_task(x) for x in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
 
 
-async def main(*, entire_source: str | None = None, dry_run: bool = False) -> None:
+async def main(
+    *,
+    entire_source: str | None = None,
+    dry_run: bool = False,
+    result_cache: ResultCacheMode = "use",
+    shard: Shard | None = None,
+) -> None:
     setup_logging()
     try:
-        await _main(entire_source, dry_run)
+        await _main(entire_source, dry_run, result_cache, shard)
     except Exception as e:
         if not isinstance(e, ClickException):
             logger.exception("Internal error")
             raise ClickException("Internal error: " + str(e))
         raise
+    finally:
+        await client_manager.aclose()
+        worker_pool.shutdown()
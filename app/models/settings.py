@@ -1,4 +1,9 @@
-from pydantic import BaseModel
+from pathlib import Path
+from typing import Any, Literal
+
+from pydantic import BaseModel, validator
+
+HTMLParser = Literal["lxml", "html.parser"]
 
 
 class Settings(BaseModel):
@@ -11,6 +16,54 @@ class Settings(BaseModel):
     aws_region_name: str
     log_level: str = "DEBUG"
     disabled_sources: list[str] = []
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30
+    http2_enabled: bool = False
+    cache_dir: Path | None = None
+    http_cache_max_size: int = 50_000_000
+    http_cache_ttl: dict[str, float] = {}
+    http_max_body_size: int = 10_000_000
+    http_rate_limits: dict[str, float] = {"api.todoist.com": 0.5, "api.telegram.org": 1}
+    http_rate_limit_burst: int = 5
+    http_concurrency_limits: dict[str, int] = {"api.todoist.com": 4, "api.telegram.org": 1}
+    html_parser: HTMLParser = "lxml"
+    html_parsers: dict[str, HTMLParser] = {}
+    parser_workers: int = 0
+    parser_pool: Literal["thread", "process"] = "thread"
+    thetvdb_status_ttl: float = 86400
+    thetvdb_ended_poll_interval: float = 0
+    result_cache_ttl: dict[str, float] = {}
+    pipeline_queue_size: int = 10
+    source_concurrency: int = 10
+    source_concurrency_limits: dict[str, int] = {}
+    source_timeout: float = 300
+    reconcile_timeout: float = 0
+    run_timeout: float = 1800
+    daemon_interval: float = 3600
+    daemon_intervals: dict[str, float] = {}
+    daemon_jitter: float = 0.1
+    daemon_polling_policy: Literal["fixed", "adaptive"] = "fixed"
+    daemon_min_interval: float = 1800
+    daemon_max_interval: float = 86400
+    todoist_batch_size: int = 0
+    todoist_concurrency: int = 4
+
+    @validator(
+        "http_cache_ttl",
+        "http_rate_limits",
+        "http_concurrency_limits",
+        "html_parsers",
+        "result_cache_ttl",
+        "source_concurrency_limits",
+        "daemon_intervals",
+        pre=True,
+    )
+    def parse_mapping(cls, value: Any) -> Any:
+        # Mappings are set in environment variables as "key1=value1,key2=value2"
+        if isinstance(value, str):
+            return dict(item.split("=", 1) for item in value.split(",") if item)
+        return value
 
     @property
     def telegram_enabled(self) -> bool:
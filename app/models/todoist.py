@@ -1,4 +1,5 @@
 from datetime import date
+from typing import Any
 
 from pydantic import BaseModel
 
@@ -25,3 +26,9 @@ class TaskUpdate(BaseModel):
 
     def __bool__(self) -> bool:
         return bool(self.dict(exclude_unset=True))
+
+
+class SyncResult(BaseModel):
+    # "ok" or the error of each command, by command uuid
+    sync_status: dict[str, Any] = {}
+    temp_id_mapping: dict[str, str] = {}
@@ -1,23 +1,70 @@
+from logging import getLogger
+from typing import Any
+
+from app.core.result_cache import ResultCache
+from app.core.source_state import SourceTracker
 from app.models.episodes import NonScheduledEpisode, ScheduledEpisode
 from app.models.source import Source
-from app.providers.inmanga import InMangaProvider
-from app.providers.spyxfamily import SpyXFamilyProvider
-from app.providers.thetvdb import TheTVDBProvider
+from app.providers.base import BaseProvider, SkipSourceError
+from app.utils.registry import provider_registry
 
+logger = getLogger(__name__)
 _LS = list[ScheduledEpisode]
 _LNS = list[NonScheduledEpisode]
 
-inmanga_provider = InMangaProvider()
-thetvdb_provider = TheTVDBProvider()
-spyxfamily_provider = SpyXFamilyProvider()
 
+def get_provider(source: Source) -> BaseProvider[Any]:
+    try:
+        return provider_registry.get(source.provider)
+    except KeyError:
+        raise ValueError(f"Invalid provider: {source.provider}")
+
+
+async def process_source(
+    source: Source,
+    tracker: SourceTracker | None = None,
+    result_cache: ResultCache | None = None,
+) -> _LS | _LNS:
+    """Find the episodes of a source.
+
+    If `tracker` is set, the sources the provider skips in this run (see
+    `BaseProvider.check_skip`) and the ones whose pages or episodes did not change since the
+    last run return no episodes, so they are not reconciled again, and providers with
+    incremental discovery only return the episodes found since the last run.
 
-async def process_source(source: Source) -> _LS | _LNS:
-    if source.provider == "InManga":
-        return await inmanga_provider.process_source(source)
-    elif source.provider == "SpyXFamily":
-        return await spyxfamily_provider.process_source(source)
-    elif source.provider == "TheTVDB":
-        return await thetvdb_provider.process_source(source)
+    If `result_cache` is set, recent results of the source are served from it. Only complete
+    results are cached, never incremental ones.
+    """
+    provider = get_provider(source)
+    if provider.get_result_cache_ttl() <= 0:
+        result_cache = None
+    if result_cache:
+        cached = result_cache.get(source, provider.get_result_cache_ttl())
+        if cached is not None:
+            return cached  # type: ignore[return-value]
+
+    if tracker:
+        try:
+            provider.check_skip(source)
+        except SkipSourceError as exc:
+            logger.info("Skipping source %r: %s", source.inputs.source_name, exc)
+            return []  # type: ignore[return-value]
+
+    pages = await provider.fetch_source(source)
+    if tracker and tracker.is_payload_unchanged(source, pages):
+        return []  # type: ignore[return-value]
+
+    watermark = tracker.get_watermark(source) if tracker else None
+    if watermark is None:
+        episodes = await provider.parse_source(source, pages)
+        if result_cache:
+            result_cache.set(source, episodes)
     else:
-        raise ValueError(f"Invalid provider: {source.provider}")
+        episodes = await provider.parse_source_since(source, pages, watermark)
+    if tracker is None:
+        return episodes
+
+    watermark = provider.get_watermark(episodes) or watermark
+    if tracker.is_episodes_unchanged(source, pages, episodes, watermark):
+        return []  # type: ignore[return-value]
+    return episodes
@@ -0,0 +1,62 @@
+from abc import ABC, abstractmethod
+from typing import Generic, TypeVar
+
+from app.core.common import BaseRepository
+from app.models.episodes import EpisodeBase
+from app.models.source import Source
+from app.settings import settings
+
+E = TypeVar("E", bound=EpisodeBase)
+
+
+class SkipSourceError(Exception):
+    """Raised by `check_skip` when the source does not need to be checked in this run."""
+
+
+class BaseProvider(BaseRepository, ABC, Generic[E]):
+    """Finds the episodes of a source.
+
+    Processing a source is split in two steps: fetching the raw pages of the source and
+    parsing them into episodes, so the parsing can be skipped if the pages did not change.
+    """
+
+    # Seconds the results of a source are served from the result cache, 0 to disable it
+    result_cache_ttl: float = 300
+
+    def get_result_cache_ttl(self) -> float:
+        if self.provider_name is None:
+            return self.result_cache_ttl
+        return settings.result_cache_ttl.get(self.provider_name, self.result_cache_ttl)
+
+    async def process_source(self, source: Source) -> list[E]:
+        pages = await self.fetch_source(source)
+        return await self.parse_source(source, pages)
+
+    def check_skip(self, source: Source) -> None:  # noqa: ARG002
+        """Raise SkipSourceError if the source does not need to be checked in this run.
+
+        Only called in tracked runs, so a source processed on its own (like with the
+        `update-single-source` command) is always fetched.
+        """
+
+    @abstractmethod
+    async def fetch_source(self, source: Source) -> list[str]:
+        """Download the pages needed to find the episodes of the source."""
+
+    @abstractmethod
+    async def parse_source(self, source: Source, pages: list[str]) -> list[E]:
+        """Find the episodes of the source in the pages returned by `fetch_source`."""
+
+    async def parse_source_since(
+        self, source: Source, pages: list[str], watermark: dict[str, str]  # noqa: ARG002
+    ) -> list[E]:
+        """Like `parse_source`, but only returns the episodes after `watermark`.
+
+        `watermark` was returned by `get_watermark` in a previous run. Providers without
+        incremental discovery return all the episodes.
+        """
+        return await self.parse_source(source, pages)
+
+    def get_watermark(self, episodes: list[E]) -> dict[str, str] | None:  # noqa: ARG002
+        """Return the position of the last episode, to be used by `parse_source_since`."""
+        return None
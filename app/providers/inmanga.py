@@ -1,24 +1,93 @@
-from bs4 import Tag
+from logging import getLogger
 
-from app.core.common import BaseRepository
+from bs4 import SoupStrainer, Tag
+
+from app.core.parsers import parse_html
 from app.models.episodes import NonScheduledEpisode
 from app.models.inputs import InMangaInputs
+from app.models.settings import HTMLParser
 from app.models.source import Source
+from app.providers.base import BaseProvider
 
+logger = getLogger(__name__)
 INMANGA_HTML_TEMPLATE = "https://inmanga.com/ver/manga/{}/{}/{}"
+CHAPTER_LIST_STRAINER = SoupStrainer(id="ChapList")
+
 
+class InMangaProvider(BaseProvider[NonScheduledEpisode]):
+    provider_name = "InManga"
 
-class InMangaProvider(BaseRepository):
     def __init__(self) -> None:
         super().__init__("https://inmanga.com/chapter/chapterIndexControls")
 
-    async def process_source(self, source: Source) -> list[NonScheduledEpisode]:
+    async def fetch_source(self, source: Source) -> list[str]:
         inputs: InMangaInputs = source.inputs  # type: ignore
         path = "?identification=" + str(inputs.first_chapter_id)
-        soup = await self._send_request_soup("GET", path)
-        elements = soup.select("#ChapList")[0].select("option")
+        return [await self._send_request_page("GET", path, stop_after="ChapList")]
+
+    async def parse_source(self, source: Source, pages: list[str]) -> list[NonScheduledEpisode]:
+        inputs: InMangaInputs = source.inputs  # type: ignore
+        return await self._run_parser(
+            self._parse_chapters, pages[0], self._get_html_parser(), inputs, source
+        )
+
+    async def parse_source_since(
+        self, source: Source, pages: list[str], watermark: dict[str, str]
+    ) -> list[NonScheduledEpisode]:
+        inputs: InMangaInputs = source.inputs  # type: ignore
+        episodes, found = await self._run_parser(
+            self._parse_chapters_since,
+            pages[0],
+            self._get_html_parser(),
+            inputs,
+            source,
+            watermark["chapter_uuid"],
+        )
+        if not found:
+            logger.warning(
+                "Last known chapter %s of %r not found, processing all the chapters",
+                watermark["chapter_id"],
+                inputs.source_name,
+            )
+        return episodes
+
+    def get_watermark(self, episodes: list[NonScheduledEpisode]) -> dict[str, str] | None:
+        if not episodes:
+            return None
+        # Chapters are listed in ascending order and their URL ends with the chapter UUID
+        last_episode = episodes[-1]
+        return {
+            "chapter_uuid": last_episode.chapter_url.rsplit("/", 1)[-1],
+            "chapter_id": last_episode.chapter_id,
+        }
+
+    def _parse_chapters(
+        self, text: str, parser: HTMLParser, inputs: InMangaInputs, source: Source
+    ) -> list[NonScheduledEpisode]:
+        elements = self._get_chapter_tags(text, parser)
         return [self._parse_tag(element, inputs, source) for element in elements]
 
+    def _parse_chapters_since(
+        self,
+        text: str,
+        parser: HTMLParser,
+        inputs: InMangaInputs,
+        source: Source,
+        chapter_uuid: str,
+    ) -> tuple[list[NonScheduledEpisode], bool]:
+        """Parse the chapters after `chapter_uuid`, or all of them if it is not found."""
+        elements = self._get_chapter_tags(text, parser)
+        uuids = [element.get("value") for element in elements]
+        found = chapter_uuid in uuids
+        if found:
+            elements = elements[uuids.index(chapter_uuid) + 1 :]
+        return [self._parse_tag(element, inputs, source) for element in elements], found
+
+    @staticmethod
+    def _get_chapter_tags(text: str, parser: HTMLParser) -> list[Tag]:
+        soup = parse_html(text, parser, CHAPTER_LIST_STRAINER)
+        return soup.select("#ChapList")[0].select("option")
+
     def _parse_tag(self, tag: Tag, inputs: InMangaInputs, source: Source) -> NonScheduledEpisode:
         chapter_id = self._process_chapter_id(tag.text.replace(",", ""))
         chapter_uuid = tag["value"]
@@ -1,23 +1,38 @@
 import re
 
-from bs4 import Tag
+from bs4 import SoupStrainer, Tag
 
-from app.core.common import BaseRepository
+from app.core.parsers import parse_html
 from app.models.episodes import NonScheduledEpisode
+from app.models.settings import HTMLParser
 from app.models.source import Source
+from app.providers.base import BaseProvider
 
+LATEST_CHAPTERS_ID = "ceo_latest_comics_widget-3"
+LATEST_CHAPTERS_STRAINER = SoupStrainer(id=LATEST_CHAPTERS_ID)
+
+
+class SpyXFamilyProvider(BaseProvider[NonScheduledEpisode]):
+    provider_name = "SpyXFamily"
 
-class SpyXFamilyProvider(BaseRepository):
     def __init__(self) -> None:
         super().__init__("https://w12.spyxmanga.com")
 
-    async def process_source(self, source: Source) -> list[NonScheduledEpisode]:
-        doc = await self._send_request_soup("GET", "/")
+    async def fetch_source(self, source: Source) -> list[str]:  # noqa: ARG002
+        return [await self._send_request_page("GET", "/", stop_after=LATEST_CHAPTERS_ID)]
+
+    async def parse_source(self, source: Source, pages: list[str]) -> list[NonScheduledEpisode]:
+        return await self._run_parser(self._parse_page, pages[0], self._get_html_parser(), source)
+
+    def _parse_page(
+        self, text: str, parser: HTMLParser, source: Source
+    ) -> list[NonScheduledEpisode]:
+        doc = parse_html(text, parser, LATEST_CHAPTERS_STRAINER)
         episodes = self.build_episodes(doc, source)
         return self.filter_episodes(episodes)
 
     def build_episodes(self, doc: Tag, source: Source) -> list[NonScheduledEpisode]:
-        chapters_source = doc.select("#ceo_latest_comics_widget-3")[0].select("li a")
+        chapters_source = doc.select(f"#{LATEST_CHAPTERS_ID}")[0].select("li a")
         return [self.build_episode(episode, source) for episode in chapters_source]
 
     def build_episode(self, episode: Tag, source: Source) -> NonScheduledEpisode:
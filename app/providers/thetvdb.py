@@ -1,36 +1,105 @@
+import asyncio
 import re
 from logging import getLogger
+from time import time
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 from click import ClickException
-from dateutil.parser import parse as parse_date
+from pydantic import BaseModel
 
-from app.core.common import BaseRepository
+from app.core.parsers import parse_html
+from app.core.state_store import get_state_store
 from app.models.episodes import ScheduledEpisode
 from app.models.inputs import TheTVDBInputs
+from app.models.settings import HTMLParser
 from app.models.source import Source
+from app.providers.base import BaseProvider, SkipSourceError
+from app.settings import settings
+from app.utils.dates import parse_date
 
 logger = getLogger(__name__)
+SERIES_INFO_STRAINER = SoupStrainer(id="series_basic_info")
+EPISODES_STRAINER = SoupStrainer("li", class_="list-group-item")
 
 
-class TheTVDBProvider(BaseRepository):
+class SeriesStatus(BaseModel):
+    status: str | None
+    checked_at: float
+    polled_at: float | None = None
+
+    @property
+    def age(self) -> float:
+        return time() - self.checked_at
+
+    @property
+    def is_ended(self) -> bool:
+        return self.status == "Ended"
+
+
+class TheTVDBProvider(BaseProvider[ScheduledEpisode]):
+    provider_name = "TheTVDB"
+
     def __init__(self) -> None:
         super().__init__("https://thetvdb.com/series")
 
-    async def process_source(self, source: Source) -> list[ScheduledEpisode]:
+    def check_skip(self, source: Source) -> None:
+        inputs: TheTVDBInputs = source.inputs  # type: ignore
+        store = get_state_store("thetvdb", SeriesStatus)
+        status = store.get(inputs.source_encoded_name) if store else None
+        if status and status.is_ended:
+            since_polled = time() - (status.polled_at or 0)
+            if since_polled < settings.thetvdb_ended_poll_interval:
+                raise SkipSourceError(f"series has ended and was checked {since_polled:.0f}s ago")
+
+    async def fetch_source(self, source: Source) -> list[str]:
+        inputs: TheTVDBInputs = source.inputs  # type: ignore
+        store = get_state_store("thetvdb", SeriesStatus)
+        status = store.get(inputs.source_encoded_name) if store else None
+        episodes_path = f"/{inputs.source_encoded_name}/allseasons/official"
+        if status is None or not (status.is_ended or status.age < settings.thetvdb_status_ttl):
+            new_status, episodes_page = await asyncio.gather(
+                self._fetch_status(inputs), self._send_request_page("GET", episodes_path)
+            )
+            status = new_status
+        else:
+            # Ended series are not expected to come back, so their status is never checked again
+            logger.debug("Using cached status %r of series %r", status.status, inputs.source_name)
+            episodes_page = await self._send_request_page("GET", episodes_path)
+
+        self._log_finished_series(status, inputs.source_name)
+        if store:
+            status.polled_at = time()
+            store.set(inputs.source_encoded_name, status)
+        return [episodes_page]
+
+    async def parse_source(self, source: Source, pages: list[str]) -> list[ScheduledEpisode]:
         inputs: TheTVDBInputs = source.inputs  # type: ignore
-        soup0 = await self._send_request_soup("GET", f"/{inputs.source_encoded_name}")
-        self._log_finished_series(soup0, inputs.source_name)
+        return await self._run_parser(
+            self._parse_episodes_page, pages[0], self._get_html_parser(), inputs, source
+        )
 
-        path = f"/{inputs.source_encoded_name}/allseasons/official"
-        soup1 = await self._send_request_soup("GET", path)
-        return self._parse_episodes(soup1, inputs, source)
+    async def _fetch_status(self, inputs: TheTVDBInputs) -> SeriesStatus:
+        path = f"/{inputs.source_encoded_name}"
+        info_page = await self._send_request_page("GET", path, stop_after="series_basic_info")
+        series_basic_info = await self._run_parser(
+            self._parse_series_basic_info, info_page, self._get_html_parser()
+        )
+        return SeriesStatus(status=series_basic_info.get("Status"), checked_at=time())
 
-    def _log_finished_series(self, soup: BeautifulSoup, source_name: str) -> None:
-        series_basic_info = self._get_series_basic_info_map(soup)
-        if series_basic_info.get("Status") == "Ended":
+    def _log_finished_series(self, status: SeriesStatus, source_name: str) -> None:
+        if status.is_ended:
             logger.warning("Series %r has ended", source_name)
 
+    def _parse_series_basic_info(self, text: str, parser: HTMLParser) -> dict[str, str]:
+        soup = parse_html(text, parser, SERIES_INFO_STRAINER)
+        return self._get_series_basic_info_map(soup)
+
+    def _parse_episodes_page(
+        self, text: str, parser: HTMLParser, inputs: TheTVDBInputs, source: Source
+    ) -> list[ScheduledEpisode]:
+        soup = parse_html(text, parser, EPISODES_STRAINER)
+        return self._parse_episodes(soup, inputs, source)
+
     @staticmethod
     def _get_series_basic_info_map(soup: BeautifulSoup) -> dict[str, str]:
         container = soup.find("div", id="series_basic_info")
@@ -63,7 +132,7 @@ class TheTVDBProvider(BaseRepository):
         release_parts = tag.select(".list-inline > li")
 
         if len(release_parts) > 1:
-            date = parse_date(release_parts[0].text).date()
+            date = parse_date(release_parts[0].text)
             platform = release_parts[1].text
         else:
             date = None
@@ -1,10 +1,14 @@
 from app.core.common import BaseRepository
+from app.core.retry import RetryPolicy
 from app.settings import settings
 
 SPECIAL_TG_CHARS = ".-"
 
 
 class TelegramRepository(BaseRepository):
+    # Messages are sent with GET requests, but sending them is not idempotent
+    retry_policy = RetryPolicy(retry_methods=frozenset())
+
     def __init__(self) -> None:
         super().__init__(api_base_url="https://api.telegram.org")
         pass
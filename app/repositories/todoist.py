@@ -1,10 +1,21 @@
-from app.builders.todoist import build_task_from_response, build_tasks_from_response
+from typing import Any
+from uuid import uuid4
+
+from app.builders.todoist import (
+    build_sync_result_from_response,
+    build_task_from_response,
+    build_tasks_from_response,
+)
 from app.core.common import BaseRepository
-from app.models.todoist import Task, TaskCreate, TaskUpdate
+from app.core.retry import IDEMPOTENT_METHODS, RetryPolicy
+from app.models.todoist import SyncResult, Task, TaskCreate, TaskUpdate
 from app.settings import settings
 
 
 class TodoistRepository(BaseRepository):
+    # POST requests are sent with a X-Request-Id header, so Todoist discards duplicates
+    retry_policy = RetryPolicy(retry_methods=IDEMPOTENT_METHODS | {"POST"})
+
     def __init__(self) -> None:
         super().__init__(
             api_base_url="https://api.todoist.com", bearer_token=settings.todoist_api_key
@@ -12,7 +23,8 @@ class TodoistRepository(BaseRepository):
 
     async def create_task(self, task_create: TaskCreate) -> Task:
         payload = self._normalize_payload(task_create.dict())
-        res = await self._send_request("POST", "/rest/v2/tasks", payload)
+        headers = {"X-Request-Id": str(uuid4())}
+        res = await self._send_request("POST", "/rest/v2/tasks", payload, headers=headers)
         return build_task_from_response(res)
 
     async def list_tasks(self, project_id: str) -> list[Task]:
@@ -22,5 +34,18 @@ class TodoistRepository(BaseRepository):
 
     async def update_task(self, task_id: str | int, task_update: TaskUpdate) -> Task:
         payload = self._normalize_payload(task_update.dict(exclude_unset=True))
-        res = await self._send_request("POST", f"/rest/v2/tasks/{task_id}", payload)
+        headers = {"X-Request-Id": str(uuid4())}
+        path = f"/rest/v2/tasks/{task_id}"
+        res = await self._send_request("POST", path, payload, headers=headers)
         return build_task_from_response(res)
+
+    async def sync(self, commands: list[dict[str, Any]]) -> SyncResult:
+        """Send a batch of commands to the Sync API.
+
+        Each command has its own uuid, so Todoist ignores the ones already applied if the
+        request is retried.
+        """
+        headers = {"X-Request-Id": str(uuid4())}
+        data = {"commands": commands}
+        res = await self._send_request("POST", "/sync/v9/sync", data, headers=headers)
+        return build_sync_result_from_response(res)
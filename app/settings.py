@@ -1,8 +1,9 @@
 from base64 import b64decode
+from functools import lru_cache
 from json import loads
 from logging import _nameToLevel
 from os import getenv
-from typing import Any
+from typing import Any, cast
 
 from click import ClickException
 from dotenv import load_dotenv
@@ -11,14 +12,48 @@ from pydantic import ValidationError
 from app.models.inputs import InputsBase
 from app.models.settings import Settings
 from app.models.source import Source
-from app.utils.inputs import INPUTS_MAP
-
-load_dotenv(override=True)
+from app.utils.registry import inputs_registry
+
+# Settings with a default value, parsed and validated by pydantic from their environment variable
+OPTIONAL_SETTINGS = (
+    "http_max_connections",
+    "http_max_keepalive_connections",
+    "http_keepalive_expiry",
+    "http2_enabled",
+    "cache_dir",
+    "http_cache_max_size",
+    "http_cache_ttl",
+    "http_max_body_size",
+    "http_rate_limits",
+    "http_rate_limit_burst",
+    "http_concurrency_limits",
+    "html_parser",
+    "html_parsers",
+    "parser_workers",
+    "parser_pool",
+    "thetvdb_status_ttl",
+    "thetvdb_ended_poll_interval",
+    "result_cache_ttl",
+    "pipeline_queue_size",
+    "source_concurrency",
+    "source_concurrency_limits",
+    "source_timeout",
+    "reconcile_timeout",
+    "run_timeout",
+    "daemon_interval",
+    "daemon_intervals",
+    "daemon_jitter",
+    "daemon_polling_policy",
+    "daemon_min_interval",
+    "daemon_max_interval",
+    "todoist_batch_size",
+    "todoist_concurrency",
+)
 
 
 def process_inputs(provider: str, inputs: dict[str, Any]) -> InputsBase:
     try:
-        return INPUTS_MAP[provider](**inputs)
+        return inputs_registry.get(provider)(**inputs)
     except KeyError:
         raise ClickException(f"Invalid provider: {provider}")
     except ValidationError as e:
@@ -48,8 +83,37 @@ def get_disabled_sources() -> list[str]:
     return []
 
 
+def get_optional_settings() -> dict[str, Any]:
+    output: dict[str, Any] = {}
+    for name in OPTIONAL_SETTINGS:
+        value = getenv(name.upper())
+        if value:
+            output[name] = value
+    return output
+
+
+@lru_cache()
+def load_env() -> None:
+    """Load the `.env` file into the environment, only the first time it is called."""
+    load_dotenv(override=True)
+
+
 def get_settings() -> Settings:
-    settings = Settings(
+    load_env()
+    try:
+        settings = _build_settings()
+    except ValidationError as e:
+        raise ClickException(f"Invalid settings: {e}")
+
+    if not settings.valid_telegram_config:
+        msg = "Must set both TELEGRAM_TOKEN and TELEGRAM_CHAT_ID or neither."
+        raise ClickException(msg)
+
+    return settings
+
+
+def _build_settings() -> Settings:
+    return Settings(
         telegram_token=getenv("TELEGRAM_TOKEN"),
         telegram_chat_id=getenv("TELEGRAM_CHAT_ID"),
         todoist_api_key=getenv_required("TODOIST_API_KEY"),
@@ -59,16 +123,12 @@ def get_settings() -> Settings:
         aws_region_name=getenv_required("AWS_REGION_NAME"),
         log_level=get_log_level(),
         disabled_sources=get_disabled_sources(),
+        **get_optional_settings(),
     )
 
-    if not settings.valid_telegram_config:
-        msg = "Must set both TELEGRAM_TOKEN and TELEGRAM_CHAT_ID or neither."
-        raise ClickException(msg)
-
-    return settings
-
 
 def get_sources() -> list[Source]:
+    load_env()
     data = getenv_required("SOURCES")
     real_data = b64decode(data).decode("utf-8")
     return _parse_sources(real_data)
@@ -86,4 +146,31 @@ def _parse_sources(data: Any) -> list[Source]:
     return output
 
 
-settings = get_settings()
+class LazySettings:
+    """Proxy of the application settings, which are only loaded and validated on first use.
+
+    This way commands that do not need the settings, like `--help`, work without them.
+    Attributes are read from, set on and deleted from the loaded settings.
+    """
+
+    def __init__(self) -> None:
+        object.__setattr__(self, "_settings", None)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._load(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._load(), name)
+
+    def _load(self) -> Settings:
+        settings: Settings | None = object.__getattribute__(self, "_settings")
+        if settings is None:
+            settings = get_settings()
+            object.__setattr__(self, "_settings", settings)
+        return settings
+
+
+settings = cast(Settings, LazySettings())
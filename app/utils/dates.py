@@ -0,0 +1,53 @@
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+from dateutil.parser import parse
+
+# English names are used explicitly, as `%B` depends on the current locale
+MONTHS = {
+    name: number
+    for number, name in enumerate(
+        [
+            "january",
+            "february",
+            "march",
+            "april",
+            "may",
+            "june",
+            "july",
+            "august",
+            "september",
+            "october",
+            "november",
+            "december",
+        ],
+        start=1,
+    )
+}
+# Dates displayed by TheTVDB, like "July 25, 2010"
+DISPLAY_DATE_PATTERN = re.compile(r"([A-Za-z]+)\s+(\d{1,2}),\s*(\d{4})")
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value: str) -> date:
+    """Parse a date from the formats used by the providers and Todoist.
+
+    ISO dates and datetimes and TheTVDB display dates are parsed with exact formats. Any other
+    string is parsed by dateutil, which is much slower. Results are memoized, as the same dates
+    are repeated across runs and sources.
+    """
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        pass
+
+    match = DISPLAY_DATE_PATTERN.fullmatch(value)
+    if match and match[1].lower() in MONTHS:
+        return date(int(match[3]), MONTHS[match[1].lower()], int(match[2]))
+    return parse(value).date()
@@ -0,0 +1,74 @@
+import logging
+from collections.abc import Callable
+from functools import cached_property
+from importlib.metadata import EntryPoint, entry_points
+from typing import TYPE_CHECKING, Any, Generic, TypeVar, cast
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.models.inputs import InputsBase
+    from app.providers.base import BaseProvider
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+PROVIDERS_GROUP = "entertainment_source_manager.providers"
+INPUTS_GROUP = "entertainment_source_manager.inputs"
+# Used when the package is not installed, like in the docker image, which has no entry points
+BUILTIN_PROVIDERS = {
+    "InManga": "app.providers.inmanga:InMangaProvider",
+    "SpyXFamily": "app.providers.spyxfamily:SpyXFamilyProvider",
+    "TheTVDB": "app.providers.thetvdb:TheTVDBProvider",
+}
+BUILTIN_INPUTS = {
+    "InManga": "app.models.inputs:InMangaInputs",
+    "SpyXFamily": "app.models.inputs:SpyXFamilyInputs",
+    "TheTVDB": "app.models.inputs:TheTVDBInputs",
+}
+
+
+class EntryPointRegistry(Generic[T]):
+    """Objects registered by name under an entry point group.
+
+    Objects are imported the first time they are requested, so only the modules of the
+    providers used by the configured sources are loaded. Entry points take precedence over
+    the built-in objects with the same name. `factory` builds the registered object from
+    the loaded one.
+    """
+
+    def __init__(
+        self, group: str, builtins: dict[str, str], factory: Callable[[Any], Any] = lambda x: x
+    ):
+        self.group = group
+        self.builtins = builtins
+        self.factory = factory
+        self._loaded: dict[str, T] = {}
+
+    @cached_property
+    def entry_points(self) -> dict[str, EntryPoint]:
+        output = {
+            name: EntryPoint(name=name, value=value, group=self.group)
+            for name, value in self.builtins.items()
+        }
+        for entry_point in entry_points(group=self.group):
+            output[entry_point.name] = entry_point
+        return output
+
+    def names(self) -> list[str]:
+        return sorted(self.entry_points)
+
+    def get(self, name: str) -> T:
+        """Return the object registered as `name`, raising KeyError if there is none."""
+        if name not in self._loaded:
+            entry_point = self.entry_points[name]
+            logger.debug("Loading %s %r from %s", self.group, name, entry_point.value)
+            self._loaded[name] = cast(T, self.factory(entry_point.load()))
+        return self._loaded[name]
+
+
+inputs_registry: EntryPointRegistry[type["InputsBase"]] = EntryPointRegistry(
+    INPUTS_GROUP, BUILTIN_INPUTS
+)
+# Providers are stateless, so a single instance is shared by all the sources
+provider_registry: EntryPointRegistry["BaseProvider[Any]"] = EntryPointRegistry(
+    PROVIDERS_GROUP, BUILTIN_PROVIDERS, factory=lambda provider_class: provider_class()
+)
@@ -0,0 +1,227 @@
+"""Benchmark of the provider parsing paths.
+
+Each provider page fixture under `test/data` is parsed as is and scaled synthetically by
+repeating its episode elements. Results are printed as JSON, so they can be stored and
+compared between releases:
+
+    python -m benchmarks.parsing --sizes 1000,5000 --output parsing.json
+"""
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+from collections.abc import Callable
+from copy import copy
+from pathlib import Path
+from statistics import mean
+from time import perf_counter
+from typing import Any
+from uuid import NAMESPACE_URL, UUID, uuid5
+
+import click
+from bs4 import BeautifulSoup, Tag
+
+from app.core.parsers import parse_html, resolve_parser
+from app.models.inputs import InMangaInputs, SpyXFamilyInputs, TheTVDBInputs
+from app.models.settings import HTMLParser
+from app.models.source import Source
+from app.providers.inmanga import CHAPTER_LIST_STRAINER, InMangaProvider
+from app.providers.spyxfamily import (
+    LATEST_CHAPTERS_ID,
+    LATEST_CHAPTERS_STRAINER,
+    SpyXFamilyProvider,
+)
+from app.providers.thetvdb import EPISODES_STRAINER, TheTVDBProvider
+
+DATA_PATH = Path(__file__).parent.parent / "test" / "data"
+INMANGA_SOURCE = Source(
+    provider="InManga",
+    inputs=InMangaInputs(
+        source_encoded_name="one-punch-man",
+        first_chapter_id=UUID("8dcb38ab-2677-4e39-844f-2ac891e607be"),
+        source_name="One Punch Man",
+        todoist_project_id="",
+        todoist_section_id="",
+    ),
+)
+SPYXFAMILY_SOURCE = Source(
+    provider="SpyXFamily",
+    inputs=SpyXFamilyInputs(todoist_project_id="", todoist_section_id=""),
+)
+THETVDB_SOURCE = Source(
+    provider="TheTVDB",
+    inputs=TheTVDBInputs(
+        source_encoded_name="sherlock",
+        source_name="Sherlock",
+        todoist_project_id="",
+        todoist_section_id="",
+    ),
+)
+
+
+def scale_inmanga(html: str, size: int) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    chapter_list = soup.select("#ChapList")[0]
+    template = chapter_list.select("option")[0]
+    chapter_list.clear()
+    for number in range(1, size + 1):
+        option = copy(template)
+        option["value"] = str(uuid5(NAMESPACE_URL, str(number)))
+        option.string = f"{number:02d}"
+        chapter_list.append(option)
+    return str(soup)
+
+
+def scale_spyxfamily(html: str, size: int) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    chapter_list = soup.select(f"#{LATEST_CHAPTERS_ID} ul")[0]
+    template = chapter_list.select("li")[0]
+    chapter_list.clear()
+    for number in range(size, 0, -1):
+        item = copy(template)
+        link = item.select("a")[0]
+        link["href"] = f"https://w12.spyxmanga.com/manga/spy-x-family-mission-{number}/"
+        link.string = f"Spy x Family, Mission {number}"
+        chapter_list.append(item)
+    return str(soup)
+
+
+def scale_thetvdb(html: str, size: int) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    template = soup.select("li.list-group-item:not(.list-group-item-special)")[0]
+    episode_list: Tag = template.parent  # type: ignore[assignment]
+    template = copy(template)
+    for item in soup.select("li.list-group-item"):
+        item.decompose()
+    for number in range(size):
+        item = copy(template)
+        season, episode = divmod(number, 100)
+        item.select(".episode-label")[0].string = f"S{season + 1:02d}E{episode + 1:02d}"
+        episode_list.append(item)
+    return str(soup)
+
+
+def measure(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"best_s": min(times), "mean_s": mean(times), "peak_memory_bytes": peak}
+
+
+def get_cases(size: int | None, parser: HTMLParser) -> list[tuple[str, Callable[[], Any]]]:
+    """Return the benchmarked functions for a fixture scaled to `size` episodes.
+
+    If `size` is None, the fixtures are used as is.
+    """
+    inmanga = InMangaProvider()
+    spyxfamily = SpyXFamilyProvider()
+    thetvdb = TheTVDBProvider()
+    inmanga_html = DATA_PATH.joinpath("inmanga", "inputs.html").read_text()
+    spyxfamily_html = DATA_PATH.joinpath("spyxfamily", "inputs.html").read_text()
+    thetvdb_html = DATA_PATH.joinpath("thetvdb", "sherlock", "inputs.html").read_text()
+    if size is not None:
+        inmanga_html = scale_inmanga(inmanga_html, size)
+        spyxfamily_html = scale_spyxfamily(spyxfamily_html, size)
+        thetvdb_html = scale_thetvdb(thetvdb_html, size)
+
+    inmanga_inputs: InMangaInputs = INMANGA_SOURCE.inputs  # type: ignore
+    thetvdb_inputs: TheTVDBInputs = THETVDB_SOURCE.inputs  # type: ignore
+    inmanga_doc = parse_html(inmanga_html, parser, CHAPTER_LIST_STRAINER)
+    inmanga_tags = inmanga_doc.select("#ChapList")[0].select("option")
+    spyxfamily_doc = parse_html(spyxfamily_html, parser, LATEST_CHAPTERS_STRAINER)
+    spyxfamily_episodes = spyxfamily.build_episodes(spyxfamily_doc, SPYXFAMILY_SOURCE)
+    thetvdb_doc = parse_html(thetvdb_html, parser, EPISODES_STRAINER)
+
+    return [
+        (
+            "inmanga.parse_chapters",
+            lambda: inmanga._parse_chapters(inmanga_html, parser, inmanga_inputs, INMANGA_SOURCE),
+        ),
+        (
+            "inmanga.parse_tag",
+            lambda: [inmanga._parse_tag(x, inmanga_inputs, INMANGA_SOURCE) for x in inmanga_tags],
+        ),
+        (
+            "spyxfamily.parse_page",
+            lambda: spyxfamily._parse_page(spyxfamily_html, parser, SPYXFAMILY_SOURCE),
+        ),
+        ("spyxfamily.filter_episodes", lambda: spyxfamily.filter_episodes(spyxfamily_episodes)),
+        (
+            "thetvdb.parse_episodes_page",
+            lambda: thetvdb._parse_episodes_page(
+                thetvdb_html, parser, thetvdb_inputs, THETVDB_SOURCE
+            ),
+        ),
+        (
+            "thetvdb.parse_episodes",
+            lambda: thetvdb._parse_episodes(thetvdb_doc, thetvdb_inputs, THETVDB_SOURCE),
+        ),
+    ]
+
+
+def run_benchmarks(
+    sizes: list[int | None], parser: HTMLParser, repeat: int
+) -> list[dict[str, Any]]:
+    results = []
+    for size in sizes:
+        for name, func in get_cases(size, parser):
+            episodes = len(func())
+            stats = measure(func, repeat)
+            per_episode = stats["best_s"] / episodes if episodes else None
+            results.append(
+                {
+                    "name": name,
+                    "size": "fixture" if size is None else size,
+                    "episodes": episodes,
+                    "repeat": repeat,
+                    **stats,
+                    "per_episode_us": per_episode and per_episode * 1_000_000,
+                }
+            )
+    return results
+
+
+def parse_sizes(_ctx: click.Context, _param: click.Parameter, value: str) -> list[int | None]:
+    try:
+        return [None] + [int(x) for x in value.split(",") if x]
+    except ValueError:
+        raise click.BadParameter("must be a comma separated list of integers")
+
+
+@click.command()
+@click.option(
+    "--sizes",
+    default="1000,5000",
+    callback=parse_sizes,
+    help="Comma separated number of episodes to scale the fixtures to.",
+)
+@click.option("--parser", type=click.Choice(["lxml", "html.parser"]), default="lxml")
+@click.option("--repeat", type=click.IntRange(min=1), default=5)
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path))
+def main(sizes: list[int | None], parser: HTMLParser, repeat: int, output: Path | None) -> None:
+    """Benchmark the provider parsing paths and print the results as JSON."""
+    report = {
+        "python": platform.python_version(),
+        "parser": resolve_parser(parser),
+        "results": run_benchmarks(sizes, parser, repeat),
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        output.write_text(text + "\n")
+    click.echo(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Benchmark of the CLI startup time.
+
+Each command runs in a new interpreter with `-X importtime`, so the time spent importing
+modules is measured along with the total wall time. The libraries that are only needed to
+process the sources are reported when a command imports them. Results are printed as JSON,
+so they can be stored and compared between releases:
+
+    python -m benchmarks.startup --output startup.json
+
+The sources of the test data are used when `SOURCES` is not set.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from base64 import b64encode
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import click
+
+ROOT_PATH = Path(__file__).parent.parent
+SOURCES_PATH = ROOT_PATH / "test" / "data" / "main" / "sources.json"
+# Libraries only needed to process the sources, which simple commands should not import
+HEAVY_MODULES = ["aioboto3", "bs4", "dateutil", "httpx", "lxml"]
+CASES: dict[str, list[str]] = {
+    "--help": ["-m", "app.cli", "--help"],
+    "print source-names": ["-m", "app.cli", "print", "source-names"],
+    "print sources": ["-m", "app.cli", "print", "sources"],
+    "update-single-source --help": ["-m", "app.cli", "update-single-source", "--help"],
+    "daemon --help": ["-m", "app.cli", "daemon", "--help"],
+    # Imports done by the commands that process the sources
+    "import app.main": ["-c", "import app.main"],
+    "import app.daemon": ["-c", "import app.daemon"],
+}
+
+
+def parse_import_times(stderr: str) -> dict[str, int]:
+    """Return the self import time in microseconds of each module in `-X importtime` output."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, module = line[len("import time:") :].split("|")
+        if self_us.strip().isdigit():
+            times[module.strip()] = int(self_us)
+    return times
+
+
+def get_env() -> dict[str, str]:
+    env = dict(os.environ)
+    if not env.get("SOURCES"):
+        env["SOURCES"] = b64encode(SOURCES_PATH.read_bytes()).decode("utf-8")
+    return env
+
+
+def measure(args: list[str], repeat: int) -> dict[str, Any]:
+    env = get_env()
+    runs = []
+    for _ in range(repeat):
+        start = perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            capture_output=True,
+            cwd=ROOT_PATH,
+            env=env,
+            text=True,
+        )
+        runs.append((perf_counter() - start, process))
+
+    wall_s, process = min(runs, key=lambda x: x[0])
+    import_times = parse_import_times(process.stderr)
+    return {
+        "exit_code": process.returncode,
+        "wall_s": wall_s,
+        "import_s": sum(import_times.values()) / 1_000_000,
+        "modules": len(import_times),
+        "heavy_modules": [x for x in HEAVY_MODULES if x in import_times],
+    }
+
+
+def run_benchmarks(names: list[str], repeat: int) -> list[dict[str, Any]]:
+    return [{"name": name, "repeat": repeat, **measure(CASES[name], repeat)} for name in names]
+
+
+@click.command()
+@click.option(
+    "--case",
+    "cases",
+    type=click.Choice(list(CASES)),
+    multiple=True,
+    help="Command to benchmark, can be repeated. Defaults to all of them.",
+)
+@click.option("--repeat", type=click.IntRange(min=1), default=5)
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path))
+def main(cases: tuple[str, ...], repeat: int, output: Path | None) -> None:
+    """Benchmark the CLI startup and print the results as JSON."""
+    report = {
+        "python": platform.python_version(),
+        "results": run_benchmarks(list(cases or CASES), repeat),
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        output.write_text(text + "\n")
+    click.echo(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
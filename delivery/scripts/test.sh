@@ -19,14 +19,17 @@ function lint() {
   echo "+Running ruff linter"
   ruff check app
   ruff check test
+  ruff check benchmarks
 
   echo "+Running black linter"
   black --check app
   black --check test
+  black --check benchmarks
 
   echo "+Running mypy linter"
   mypy --strict --check-untyped-defs app
   mypy --check-untyped-defs test
+  mypy --strict benchmarks
 }
 
 function test() {
@@ -1,2 +1,16 @@
+from unittest import mock
+
+import pytest
+
+from app.core.client import ClientManager
+
+
 def pytest_configure(config):  # noqa: ARG001
     pass
+
+
+@pytest.fixture(autouse=True)
+def client_manager():
+    # Each test runs in its own event loop, so the HTTP clients can't be shared between them
+    with mock.patch("app.core.common.client_manager", ClientManager()) as client_manager:
+        yield client_manager
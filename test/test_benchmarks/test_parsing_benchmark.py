@@ -0,0 +1,50 @@
+import json
+
+from click.testing import CliRunner
+
+from benchmarks.parsing import main, run_benchmarks
+
+BENCHMARKS = [
+    "inmanga.parse_chapters",
+    "inmanga.parse_tag",
+    "spyxfamily.parse_page",
+    "spyxfamily.filter_episodes",
+    "thetvdb.parse_episodes_page",
+    "thetvdb.parse_episodes",
+]
+
+
+def test_run_benchmarks_scaled():
+    results = run_benchmarks([25], "html.parser", repeat=1)
+    assert [x["name"] for x in results] == BENCHMARKS
+    for result in results:
+        assert result["size"] == 25
+        assert result["episodes"] == 25
+        assert result["best_s"] > 0
+        assert result["peak_memory_bytes"] > 0
+        assert result["per_episode_us"] == result["best_s"] / 25 * 1_000_000
+
+
+def test_run_benchmarks_fixtures():
+    results = run_benchmarks([None], "html.parser", repeat=1)
+    episodes = {x["name"]: x["episodes"] for x in results}
+    assert all(x["size"] == "fixture" for x in results)
+    assert episodes["thetvdb.parse_episodes"] == 12
+    assert episodes["inmanga.parse_tag"] == episodes["inmanga.parse_chapters"]
+
+
+def test_cli(tmp_path):
+    output = tmp_path / "results.json"
+    args = ["--sizes", "5", "--parser", "html.parser", "--repeat", "1", "--output", output]
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+    report = json.loads(output.read_text())
+    assert json.loads(result.output) == report
+    assert report["parser"] == "html.parser"
+    assert [x["size"] for x in report["results"]] == ["fixture"] * 6 + [5] * 6
+
+
+def test_cli_invalid_sizes():
+    result = CliRunner().invoke(main, ["--sizes", "a,b"])
+    assert result.exit_code == 2
+    assert "must be a comma separated list of integers" in result.output
@@ -0,0 +1,39 @@
+import json
+
+from click.testing import CliRunner
+
+from benchmarks.startup import main, parse_import_times, run_benchmarks
+
+IMPORT_TIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1035 |       1155 | click
+other line
+"""
+
+
+def test_parse_import_times():
+    assert parse_import_times(IMPORT_TIME_OUTPUT) == {"_io": 120, "click": 1035}
+
+
+def test_simple_commands_do_not_import_heavy_modules():
+    results = run_benchmarks(["--help", "print source-names", "import app.main"], repeat=1)
+    assert [x["name"] for x in results] == ["--help", "print source-names", "import app.main"]
+    help_result, print_result, main_result = results
+    assert all(x["exit_code"] == 0 for x in results)
+    assert help_result["heavy_modules"] == []
+    assert print_result["heavy_modules"] == []
+    # The HTML parsers are only imported with the providers
+    assert main_result["heavy_modules"] == ["aioboto3", "dateutil", "httpx"]
+    assert 0 < help_result["import_s"] < help_result["wall_s"]
+    assert help_result["modules"] < main_result["modules"]
+
+
+def test_cli(tmp_path):
+    output = tmp_path / "results.json"
+    args = ["--case", "--help", "--repeat", "2", "--output", output]
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+    report = json.loads(output.read_text())
+    assert json.loads(result.output) == report
+    assert [(x["name"], x["repeat"]) for x in report["results"]] == [("--help", 2)]
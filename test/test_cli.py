@@ -4,19 +4,20 @@ import pytest
 from click.testing import CliRunner
 
 from app.cli import cli
+from app.core.sharding import Shard
 
 
-@mock.patch("app.cli.main")
+@mock.patch("app.main.main")
 @pytest.mark.parametrize("dry_run", [True, False])
 def test_main_normal_ok(main_m, dry_run):
     args = [] if not dry_run else ["--dry-run"]
     result = CliRunner().invoke(cli, args)
     assert result.exit_code == 0
 
-    main_m.assert_called_once_with(dry_run=dry_run)
+    main_m.assert_called_once_with(dry_run=dry_run, result_cache="use", shard=None)
 
 
-@mock.patch("app.cli.main")
+@mock.patch("app.main.main")
 @pytest.mark.parametrize("dry_run", [True, False])
 def test_main_update_single_source_ok(main_m, dry_run):
     args = [] if not dry_run else ["--dry-run"]
@@ -25,12 +26,30 @@ def test_main_update_single_source_ok(main_m, dry_run):
     assert result.exit_code == 0
 
     if dry_run:
-        main_m.assert_called_once_with(entire_source="test", dry_run=True)
+        main_m.assert_called_once_with(entire_source="test", dry_run=True, result_cache="use")
     else:
-        main_m.assert_called_once_with(entire_source="test", dry_run=False)
+        main_m.assert_called_once_with(entire_source="test", dry_run=False, result_cache="use")
 
 
-@mock.patch("app.cli.print_sources")
+@mock.patch("app.main.main")
+@pytest.mark.parametrize("mode", ["use", "refresh", "bypass"])
+def test_main_result_cache(main_m, mode):
+    result = CliRunner().invoke(cli, ["--result-cache", mode])
+    assert result.exit_code == 0
+    main_m.assert_called_once_with(dry_run=False, result_cache=mode, shard=None)
+
+    main_m.reset_mock()
+    result = CliRunner().invoke(cli, ["--result-cache", mode, "update-single-source", "test"])
+    assert result.exit_code == 0
+    main_m.assert_called_once_with(entire_source="test", dry_run=False, result_cache=mode)
+
+
+def test_main_invalid_result_cache():
+    result = CliRunner().invoke(cli, ["--result-cache", "invalid"])
+    assert result.exit_code == 2
+
+
+@mock.patch("app.show.print_sources")
 def test_print_helper_sources(print_sources_m):
     result = CliRunner().invoke(cli, ["print", "sources"])
     assert result.exit_code == 0
@@ -38,9 +57,39 @@ def test_print_helper_sources(print_sources_m):
     print_sources_m.assert_called_once_with()
 
 
-@mock.patch("app.cli.print_source_names")
+@mock.patch("app.show.print_source_names")
 def test_print_helper_source_names(print_source_names_m):
     result = CliRunner().invoke(cli, ["print", "source-names"])
     assert result.exit_code == 0
 
     print_source_names_m.assert_called_once_with()
+
+
+@mock.patch("app.daemon.run_daemon")
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_daemon(run_daemon_m, dry_run):
+    args = ["--dry-run"] if dry_run else []
+    result = CliRunner().invoke(cli, args + ["--result-cache", "refresh", "daemon"])
+    assert result.exit_code == 0
+    run_daemon_m.assert_called_once_with(dry_run=dry_run, result_cache="refresh", shard=None)
+
+
+@mock.patch("app.daemon.run_daemon")
+@mock.patch("app.main.main")
+def test_shard(main_m, run_daemon_m):
+    result = CliRunner().invoke(cli, ["--shard", "1/3"])
+    assert result.exit_code == 0
+    main_m.assert_called_once_with(dry_run=False, result_cache="use", shard=Shard(index=1, count=3))
+
+    result = CliRunner().invoke(cli, ["--shard", "2/3", "daemon"])
+    assert result.exit_code == 0
+    run_daemon_m.assert_called_once_with(
+        dry_run=False, result_cache="use", shard=Shard(index=2, count=3)
+    )
+
+
+@pytest.mark.parametrize("value", ["1", "3/3", "a/3", "-1/3"])
+def test_invalid_shard(value):
+    result = CliRunner().invoke(cli, ["--shard", value])
+    assert result.exit_code == 2
+    assert "Invalid value for '--shard'" in result.output
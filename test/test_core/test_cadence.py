@@ -0,0 +1,98 @@
+from datetime import date, datetime
+from unittest import mock
+
+import pytest
+
+from app.core.cadence import (
+    MAX_RELEASES,
+    AdaptivePollingPolicy,
+    ReleaseHistory,
+    date_to_timestamp,
+    get_polling_policy,
+    get_release_history_store,
+)
+from app.settings import settings
+
+DAY = 86400
+WEEK = 7 * DAY
+
+
+class TestReleaseHistory:
+    def test_add(self):
+        history = ReleaseHistory()
+        history.add([3, 1])
+        history.add([2, 3])
+        assert history.releases == [1, 2, 3]
+
+        history.add(range(100))
+        assert history.releases == list(range(100 - MAX_RELEASES, 100))
+
+    def test_cadence(self):
+        assert ReleaseHistory().cadence is None
+        assert ReleaseHistory(releases=[10]).cadence is None
+        # The median ignores occasional breaks, like the ones between seasons
+        assert ReleaseHistory(releases=[0, WEEK, 2 * WEEK, 3 * WEEK, 20 * WEEK]).cadence == WEEK
+
+    def test_get_next_release(self):
+        assert ReleaseHistory(releases=[10]).get_next_release(20) is None
+        history = ReleaseHistory(releases=[0, WEEK, 2 * WEEK])
+        assert history.get_next_release(WEEK + 1) == 2 * WEEK
+        assert history.get_next_release(2 * WEEK + 1) == 3 * WEEK
+
+
+def test_date_to_timestamp():
+    assert date_to_timestamp(date(2023, 4, 16)) == datetime(2023, 4, 16).timestamp()
+
+
+class TestAdaptivePollingPolicy:
+    policy = AdaptivePollingPolicy(min_interval=1800, max_interval=DAY)
+    history = ReleaseHistory(releases=[0, WEEK, 2 * WEEK])
+
+    def test_unknown_cadence(self):
+        assert self.policy.get_interval(None, 0) is None
+        assert self.policy.get_interval(ReleaseHistory(releases=[0]), 0) is None
+
+    @pytest.mark.parametrize(
+        "now, expected",
+        [
+            # Before the release window the source is polled when the window starts
+            (2 * WEEK + DAY, DAY),
+            (3 * WEEK - 0.05 * WEEK - 3600, 3600),
+            (3 * WEEK - 0.05 * WEEK - 60, 1800),
+            # Around the expected release the source is polled as often as possible
+            (3 * WEEK - 3600, 1800),
+            (3 * WEEK + 0.05 * WEEK, 1800),
+            # Late releases make the interval grow, up to the maximum interval
+            (3 * WEEK + 0.05 * WEEK + 1, 0.05 * WEEK + 1),
+            (4 * WEEK, DAY),
+        ],
+    )
+    def test_get_interval(self, now, expected):
+        assert self.policy.get_interval(self.history, now) == pytest.approx(expected)
+
+    def test_known_future_release(self):
+        history = ReleaseHistory(releases=[0, WEEK, 2 * WEEK, 2 * WEEK + DAY])
+        assert self.policy.get_interval(history, 2 * WEEK + DAY - 3600) == 1800
+
+
+@mock.patch.object(settings, "daemon_min_interval", 60)
+@mock.patch.object(settings, "daemon_max_interval", 600)
+def test_get_polling_policy():
+    with mock.patch.object(settings, "daemon_polling_policy", "fixed"):
+        assert get_polling_policy() is None
+
+    with mock.patch.object(settings, "daemon_polling_policy", "adaptive"):
+        policy = get_polling_policy()
+    assert isinstance(policy, AdaptivePollingPolicy)
+    assert (policy.min_interval, policy.max_interval) == (60, 600)
+
+
+def test_get_release_history_store(tmp_path):
+    with mock.patch.object(settings, "cache_dir", None):
+        assert get_release_history_store() is None
+
+    with mock.patch.object(settings, "cache_dir", tmp_path):
+        store = get_release_history_store()
+    assert store is not None
+    assert store.path == tmp_path / "releases"
+    assert store.model is ReleaseHistory
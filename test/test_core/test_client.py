@@ -0,0 +1,110 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from pytest_httpx import HTTPXMock
+
+from app.core.client import ClientManager
+from app.models.settings import Settings
+
+
+def get_settings(**kwargs):
+    return Settings(
+        aws_access_key_id="aws_access_key_id",
+        aws_bucket_name="aws_bucket_name",
+        aws_region_name="aws_region_name",
+        aws_secret_access_key="aws_secret_access_key",
+        todoist_api_key="todoist_api_key",
+        **kwargs,
+    )
+
+
+@pytest.fixture(autouse=True)
+def mocks():
+    starter = mock.patch("app.core.client.settings", new=get_settings())
+    starter.start()
+    yield
+    starter.stop()
+
+
+@pytest.mark.asyncio
+async def test_get_client_reuses_client_per_host():
+    manager = ClientManager()
+    client_1 = manager.get_client("https://example.com/path-1")
+    client_2 = manager.get_client("https://example.com/path-2?query=1")
+    client_3 = manager.get_client("https://other.com/path-1")
+    client_4 = manager.get_client("http://example.com/path-1")
+
+    assert client_1 is client_2
+    assert client_1 is not client_3
+    assert client_1 is not client_4
+    assert client_1.headers["User-Agent"].startswith("EntertainmentSourceManager/")
+
+    await manager.aclose()
+    assert client_1.is_closed
+    assert client_3.is_closed
+    assert client_4.is_closed
+
+
+@pytest.mark.asyncio
+async def test_get_client_reused_connection(httpx_mock: HTTPXMock):
+    httpx_mock.add_response(content=b"1")
+    httpx_mock.add_response(content=b"2")
+    manager = ClientManager()
+
+    client = manager.get_client("https://example.com")
+    res_1 = await client.get("https://example.com/1")
+    res_2 = await manager.get_client("https://example.com").get("https://example.com/2")
+    assert res_1.content == b"1"
+    assert res_2.content == b"2"
+    await manager.aclose()
+
+
+def test_get_client_resets_on_new_event_loop(caplog):
+    manager = ClientManager()
+
+    async def get_client():
+        return manager.get_client("https://example.com")
+
+    client_1 = asyncio.run(get_client())
+    client_2 = asyncio.run(get_client())
+    assert client_1 is not client_2
+    warnings = [x.message for x in caplog.records if x.levelname == "WARNING"]
+    assert warnings == [
+        "Dropping 1 HTTP clients of a previous event loop without closing them, "
+        "call aclose before the event loop finishes"
+    ]
+
+
+def test_get_client_on_new_event_loop_after_aclose(caplog):
+    manager = ClientManager()
+
+    async def get_client():
+        client = manager.get_client("https://example.com")
+        await manager.aclose()
+        return client
+
+    client_1 = asyncio.run(get_client())
+    client_2 = asyncio.run(get_client())
+    assert client_1 is not client_2
+    assert not [x for x in caplog.records if x.levelname == "WARNING"]
+
+
+@pytest.mark.parametrize("h2_installed", [True, False])
+@pytest.mark.parametrize("http2_enabled", [True, False])
+@mock.patch("app.core.client.find_spec")
+@mock.patch("app.core.client.AsyncClient")
+@pytest.mark.asyncio
+async def test_create_client_http2(client_m, find_spec_m, http2_enabled, h2_installed, caplog):
+    find_spec_m.return_value = object() if h2_installed else None
+    new_settings = get_settings(http2_enabled=http2_enabled, http_max_connections=5)
+    with mock.patch("app.core.client.settings", new=new_settings):
+        ClientManager().get_client("https://example.com")
+
+    client_m.assert_called_once()
+    kwargs = client_m.call_args.kwargs
+    assert kwargs["http2"] is (http2_enabled and h2_installed)
+    assert kwargs["limits"].max_connections == 5
+
+    warnings = [x for x in caplog.records if x.levelname == "WARNING"]
+    assert len(warnings) == int(http2_enabled and not h2_installed)
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+from datetime import date
+from unittest import mock
+
+import pytest
+from click import ClickException
+from httpx import ReadTimeout
+from pytest_httpx import HTTPXMock, IteratorStream
+
+from app.core.common import BaseRepository
+from app.core.http_cache import HTTPCache
+from app.core.retry import RetryPolicy
+from app.core.streaming import PageReader
+
+URL = "https://example.com/page?q=1"
+
+
+class Repository(BaseRepository):
+    provider_name = "Example"
+
+    def __init__(self) -> None:
+        super().__init__("https://example.com")
+
+
+def test_normalize_payload():
+    payload = {"date": date(2023, 1, 2), "text": "text"}
+    result = Repository()._normalize_payload(payload)
+    assert result == {"date": "2023-01-02", "text": "text"}
+    assert payload["date"] == date(2023, 1, 2)
+
+
+class TestSendRequestPageCache:
+    @pytest.fixture(autouse=True)
+    def mocks(self, tmp_path):
+        self.cache = HTTPCache(tmp_path, max_size=100_000)
+        self.ghc_sm = mock.patch("app.core.common.get_http_cache", return_value=self.cache)
+        self.settings_sm = mock.patch("app.core.common.settings")
+        self.ghc_sm.start()
+        self.settings_m = self.settings_sm.start()
+        self.settings_m.http_cache_ttl = {}
+        self.settings_m.html_parser = "html.parser"
+        self.settings_m.html_parsers = {}
+        self.settings_m.http_max_body_size = 1000
+        yield
+        self.ghc_sm.stop()
+        self.settings_sm.stop()
+
+    @pytest.mark.asyncio
+    async def test_cache_disabled(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(url=URL, text="<p>1</p>")
+        with mock.patch("app.core.common.get_http_cache", return_value=None):
+            page = await Repository()._send_request_page("GET", "/page", params={"q": 1})
+        assert page == "<p>1</p>"
+        assert self.cache.get(URL) is None
+
+    @pytest.mark.asyncio
+    async def test_cache_ignored_for_non_get_requests(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(url=URL, method="POST", text="<p>1</p>")
+        page = await Repository()._send_request_page("POST", "/page", params={"q": 1})
+        assert page == "<p>1</p>"
+        assert self.cache.get(URL) is None
+
+    @pytest.mark.asyncio
+    async def test_cache_miss(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(url=URL, text="<p>1</p>", headers={"ETag": '"v1"'})
+        page = await Repository()._send_request_page("GET", "/page", params={"q": 1})
+        assert page == "<p>1</p>"
+
+        entry = self.cache.get(URL)
+        assert entry is not None
+        assert entry.etag == '"v1"'
+        assert entry.body == "<p>1</p>"
+
+    @pytest.mark.asyncio
+    async def test_cache_not_modified(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(url=URL, text="<p>1</p>", headers={"ETag": '"v1"'})
+        httpx_mock.add_response(url=URL, status_code=304, match_headers={"If-None-Match": '"v1"'})
+
+        repo = Repository()
+        await repo._send_request_page("GET", "/page", params={"q": 1})
+        page = await repo._send_request_page("GET", "/page", params={"q": 1})
+        assert page == "<p>1</p>"
+        assert len(httpx_mock.get_requests()) == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_modified(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(url=URL, text="<p>1</p>", headers={"ETag": '"v1"'})
+        httpx_mock.add_response(url=URL, text="<p>2</p>", match_headers={"If-None-Match": '"v1"'})
+
+        repo = Repository()
+        await repo._send_request_page("GET", "/page", params={"q": 1})
+        page = await repo._send_request_page("GET", "/page", params={"q": 1})
+        assert page == "<p>2</p>"
+        entry = self.cache.get(URL)
+        assert entry is not None
+        assert entry.body == "<p>2</p>"
+
+    @pytest.mark.parametrize("from_settings", [True, False])
+    @pytest.mark.asyncio
+    async def test_cache_fresh_entry(self, httpx_mock: HTTPXMock, from_settings):
+        httpx_mock.add_response(url=URL, text="<p>1</p>")
+
+        repo = Repository()
+        if from_settings:
+            self.settings_m.http_cache_ttl = {"Example": 60}
+        else:
+            repo.http_cache_ttl = 60
+        await repo._send_request_page("GET", "/page", params={"q": 1})
+        page = await repo._send_request_page("GET", "/page", params={"q": 1})
+        assert page == "<p>1</p>"
+        assert len(httpx_mock.get_requests()) == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_keeps_truncated_pages_apart(self, httpx_mock: HTTPXMock):
+        chunks = [b"<div id='a'><p>1</p>", b"</div>", b"<div id='b'><p>2</p></div>"]
+        httpx_mock.add_response(url=URL, stream=IteratorStream(chunks))
+        httpx_mock.add_response(url=URL, stream=IteratorStream(chunks))
+
+        repo = Repository()
+        repo.http_cache_ttl = 60
+        page = await repo._send_request_page("GET", "/page", params={"q": 1}, stop_after="a")
+        assert "<p>2</p>" not in page
+        page = await repo._send_request_page("GET", "/page", params={"q": 1})
+        assert "<p>2</p>" in page
+        page = await repo._send_request_page("GET", "/page", params={"q": 1}, stop_after="a")
+        assert "<p>2</p>" not in page
+        assert len(httpx_mock.get_requests()) == 2
+
+    def test_cache_ttl_without_provider_name(self):
+        repo = BaseRepository("https://example.com")
+        repo.http_cache_ttl = 5
+        self.settings_m.http_cache_ttl = {"None": 60}
+        assert repo._get_http_cache_ttl() == 5
+
+
+@pytest.mark.parametrize("status_code", [429, 503])
+@pytest.mark.parametrize("retry_after", ["30", None])
+@mock.patch("app.core.common.rate_limiters")
+@pytest.mark.asyncio
+async def test_send_request_retry_after(
+    rate_limiters_m, httpx_mock: HTTPXMock, status_code, retry_after
+):
+    headers = {"Retry-After": retry_after} if retry_after else {}
+    httpx_mock.add_response(status_code=status_code, headers=headers)
+    limiter = rate_limiters_m.get_limiter.return_value
+    limiter.acquire.return_value = mock.AsyncMock()
+
+    repo = Repository()
+    repo.retry_policy = RetryPolicy(max_attempts=1)
+    with pytest.raises(ClickException):
+        await repo._send_request("GET", "/page")
+
+    rate_limiters_m.get_limiter.assert_called_once_with("https://example.com/page")
+    if retry_after:
+        limiter.pause.assert_called_once_with(30)
+    else:
+        limiter.pause.assert_not_called()
+
+
+class TestSendRequestRetry:
+    @pytest.fixture(autouse=True)
+    def mocks(self):
+        self.sleep_sm = mock.patch("app.core.common.asyncio.sleep")
+        self.pause_sm = mock.patch("app.core.rate_limit.HostLimiter.pause")
+        self.sleep_m = self.sleep_sm.start()
+        self.pause_m = self.pause_sm.start()
+        self.repo = Repository()
+        self.repo.retry_policy = RetryPolicy(max_attempts=3, backoff_base=1, deadline=100)
+        yield
+        self.sleep_sm.stop()
+        self.pause_sm.stop()
+
+    @pytest.mark.asyncio
+    async def test_retry_status_code(self, httpx_mock: HTTPXMock, caplog):
+        caplog.set_level(logging.INFO)
+        httpx_mock.add_response(status_code=502)
+        httpx_mock.add_response(status_code=429, headers={"Retry-After": "5"})
+        httpx_mock.add_response(text="ok")
+
+        response = await self.repo._send_request("GET", "/page")
+        assert response.text == "ok"
+        assert self.sleep_m.call_count == 2
+        assert self.sleep_m.call_args_list[1].args[0] >= 5
+        self.pause_m.assert_called_once_with(5)
+
+        warnings = [x for x in caplog.records if x.levelname == "WARNING"]
+        assert len(warnings) == 2
+        assert "attempt 1 failed: 502" in warnings[0].message
+        info = [x for x in caplog.records if x.levelname == "INFO"]
+        assert info[-1].message == f"HTTP request to {URL.split('?')[0]} finished after 2 retries"
+        assert info[-1].retry["retries"] == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_exhausted(self, httpx_mock: HTTPXMock, caplog):
+        for _ in range(3):
+            httpx_mock.add_response(status_code=503)
+
+        with pytest.raises(ClickException, match="Error while fetching .+: 503"):
+            await self.repo._send_request("GET", "/page")
+        assert self.sleep_m.call_count == 2
+
+        error = [x for x in caplog.records if x.levelname == "ERROR"][0]
+        assert error.retry["retries"] == 2
+        assert error.retry["elapsed"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_retry_timeout(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_exception(ReadTimeout("timeout"))
+        httpx_mock.add_response(text="ok")
+
+        response = await self.repo._send_request("GET", "/page")
+        assert response.text == "ok"
+        assert self.sleep_m.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_no_retry_timeout_non_idempotent(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_exception(ReadTimeout("timeout"))
+
+        with pytest.raises(ReadTimeout):
+            await self.repo._send_request("POST", "/page")
+        self.sleep_m.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_send_request_page_concurrent_requests_are_shared():
+    calls = []
+
+    async def get_page(_method, path, _data, _params, _stop_after):
+        calls.append(path)
+        await asyncio.sleep(0.01)
+        return f"<p>{path}</p>"
+
+    repo_1, repo_2 = Repository(), Repository()
+    with mock.patch.object(BaseRepository, "_get_page", side_effect=get_page):
+        pages = await asyncio.gather(
+            repo_1._send_request_page("GET", "/page", params={"q": 1}),
+            repo_2._send_request_page("GET", "/page", params={"q": 1}),
+            repo_2._send_request_page("GET", "/page", params={"q": 2}),
+            repo_2._send_request_page("GET", "/other"),
+            repo_2._send_request_page("POST", "/other"),
+        )
+    assert pages == ["<p>/page</p>"] * 3 + ["<p>/other</p>"] * 2
+    assert sorted(calls) == ["/other", "/other", "/page", "/page"]
+
+
+@pytest.mark.parametrize(
+    "provider_name,expected", [("Example", "lxml"), ("Other", "html.parser"), (None, "html.parser")]
+)
+@mock.patch("app.core.common.settings")
+def test_get_html_parser(settings_m, provider_name, expected):
+    settings_m.html_parser = "html.parser"
+    settings_m.html_parsers = {"Example": "lxml"}
+    repo = Repository()
+    repo.provider_name = provider_name
+    assert repo._get_html_parser() == expected
+
+
+@mock.patch("app.core.common.get_http_cache", return_value=None)
+@pytest.mark.asyncio
+async def test_send_request_page_stop_after(_get_http_cache_m, httpx_mock: HTTPXMock):
+    chunks = [b"<div id='a'><p>1</p>", b"</div>", b"<div id='b'><p>2</p></div>"]
+    httpx_mock.add_response(stream=IteratorStream(chunks))
+    page = await Repository()._send_request_page("GET", "/page", stop_after="a")
+    assert "<p>1</p>" in page
+    assert "<p>2</p>" not in page
+
+
+@mock.patch("app.core.common.settings")
+@mock.patch("app.core.common.get_http_cache", return_value=None)
+@pytest.mark.asyncio
+async def test_send_request_page_max_body_size(
+    _get_http_cache_m, settings_m, httpx_mock: HTTPXMock
+):
+    settings_m.http_max_body_size = 10
+    settings_m.html_parsers = {}
+    httpx_mock.add_response(text="<p>" + "a" * 20 + "</p>")
+    with pytest.raises(ClickException, match="bigger than 10 bytes"):
+        await Repository()._send_request_page("GET", "/page")
+
+
+@pytest.mark.asyncio
+async def test_send_request_error_body_is_read(httpx_mock: HTTPXMock, caplog):
+    httpx_mock.add_response(status_code=404, text="not found")
+    reader = PageReader(max_size=1000)
+    with pytest.raises(ClickException, match="404 not found"):
+        await Repository()._send_request("GET", "/page", page_reader=reader)
+    assert reader.text == ""
+    assert caplog.records[0].response["response_body"] == "not found"
@@ -0,0 +1,97 @@
+import os
+from unittest import mock
+
+from httpx import Response
+
+from app.core.http_cache import CacheEntry, HTTPCache, get_http_cache
+
+URL = "https://example.com/page"
+
+
+def build_response(body: str, **headers: str) -> Response:
+    return Response(200, text=body, headers=headers)
+
+
+def test_cache_miss(tmp_path):
+    cache = HTTPCache(tmp_path, max_size=1000)
+    assert cache.get(URL) is None
+
+
+def test_cache_set_and_get(tmp_path):
+    cache = HTTPCache(tmp_path, max_size=1000)
+    response = build_response("body", ETag='"v1"', **{"Last-Modified": "Mon, 01 May 2023"})
+    cache.set(URL, response, "body")
+
+    entry = cache.get(URL)
+    assert entry is not None
+    assert entry.url == URL
+    assert entry.body == "body"
+    assert entry.age >= 0
+    assert entry.validators == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 May 2023",
+    }
+
+
+def test_cache_entry_without_validators():
+    entry = CacheEntry(url=URL, etag=None, last_modified=None, stored_at=0, body="")
+    assert entry.validators == {}
+
+
+def test_cache_refresh(tmp_path):
+    cache = HTTPCache(tmp_path, max_size=1000)
+    entry = cache.set(URL, build_response("body"), "body")
+    entry.stored_at = 0
+    cache.refresh(entry)
+
+    new_entry = cache.get(URL)
+    assert new_entry is not None
+    assert new_entry.stored_at > 0
+
+
+def test_cache_corrupted_entry(tmp_path, caplog):
+    cache = HTTPCache(tmp_path, max_size=1000)
+    cache.set(URL, build_response("body"), "body")
+    file = next(tmp_path.glob("*.json"))
+    file.write_text("{}")
+
+    assert cache.get(URL) is None
+    assert not file.exists()
+    assert caplog.records[0].message == f"Removing corrupted HTTP cache entry for {URL}"
+
+
+def test_cache_lru_eviction(tmp_path):
+    cache = HTTPCache(tmp_path, max_size=600)
+    cache.set(URL + "/1", build_response(""), "a" * 100)
+    cache.set(URL + "/2", build_response(""), "b" * 100)
+    file_1, file_2 = cache._get_file(URL + "/1"), cache._get_file(URL + "/2")
+    os.utime(file_1, (1, 1))
+    os.utime(file_2, (2, 2))
+
+    # Reading the first entry makes it the most recently used one
+    assert cache.get(URL + "/1") is not None
+    cache.set(URL + "/3", build_response(""), "c" * 100)
+
+    assert cache.get(URL + "/1") is not None
+    assert cache.get(URL + "/2") is None
+    assert cache.get(URL + "/3") is not None
+
+
+@mock.patch("app.core.http_cache.settings")
+def test_get_http_cache(settings_m, tmp_path):
+    settings_m.cache_dir = None
+    assert get_http_cache() is None
+
+    settings_m.cache_dir = tmp_path
+    settings_m.http_cache_max_size = 1000
+    cache = get_http_cache()
+    assert cache is not None
+    assert cache.path == tmp_path / "http"
+    assert cache.max_size == 1000
+    assert cache.path.is_dir()
+
+
+def test_cache_entry_bigger_than_max_size(tmp_path):
+    cache = HTTPCache(tmp_path, max_size=10)
+    cache.set(URL, build_response(""), "a" * 100)
+    assert cache.get(URL) is None
@@ -1,14 +1,18 @@
+import asyncio
+import logging
 from datetime import date
 from json import loads
 from pathlib import Path
 from unittest import mock
 
 import pytest
+from click import ClickException
 from freezegun import freeze_time
 
-from app.core.non_scheduled import process_non_scheduled_episodes
+from app.core.non_scheduled import NonScheduledEpisodesSink, process_non_scheduled_episodes
 from app.models.episodes import NonScheduledEpisode, S3NonScheduledEpisode
-from app.models.todoist import TaskCreate
+from app.models.todoist import SyncResult, TaskCreate
+from app.settings import settings
 
 EPISODES_FILE = Path(__file__).parent.parent / "data" / "core" / "non_scheduled_episodes.json"
 EPISODE_LIST = [NonScheduledEpisode(**x) for x in loads(EPISODES_FILE.read_text())]
@@ -98,3 +102,148 @@ class TestProcessNonScheduledEpisodes:
         self.todoist_m.return_value.update_task.assert_not_called()
         self.s3_repo_m.return_value.update_episodes.assert_not_called()
         self.telegram_m.return_value.send_message.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_new_episodes_are_merged_with_s3(self):
+        # Incremental providers only return the episodes after the last known one
+        new_episodes = [x for x in EPISODE_LIST if x.source_name == "Source 3"][1:]
+        assert [x.chapter_id for x in new_episodes] == ["2"]
+
+        await process_non_scheduled_episodes(new_episodes, False, False)
+
+        self.s3_repo_m.return_value.update_episodes.assert_called_once_with("Source 3", ["1", "2"])
+
+    @pytest.mark.asyncio
+    async def test_sink_processes_each_batch(self, caplog):
+        caplog.set_level(logging.INFO)
+        queue: asyncio.Queue = asyncio.Queue()
+        source_names = sorted({x.source_name for x in EPISODE_LIST})
+        for source_name in source_names:
+            queue.put_nowait([x for x in EPISODE_LIST if x.source_name == source_name])
+        queue.put_nowait(None)
+
+        await NonScheduledEpisodesSink(assume_new=False, dry_run=False).consume(queue)
+
+        self.todoist_m.assert_called_once()
+        s3_repo = self.s3_repo_m.return_value
+        assert s3_repo.get_episodes.call_count == len(source_names)
+        s3_repo.update_episodes.assert_called_once_with("Source 3", ["1", "2"])
+        assert "No new non scheduled episodes" not in caplog.messages
+
+    @pytest.mark.asyncio
+    async def test_sink_without_new_episodes(self, caplog):
+        caplog.set_level(logging.INFO)
+        queue: asyncio.Queue = asyncio.Queue()
+        queue.put_nowait([x for x in EPISODE_LIST if x.source_name != "Source 3"])
+        queue.put_nowait([])
+        queue.put_nowait(None)
+
+        await NonScheduledEpisodesSink(assume_new=False, dry_run=False).consume(queue)
+
+        self.s3_repo_m.return_value.update_episodes.assert_not_called()
+        assert caplog.messages.count("No new non scheduled episodes") == 1
+
+    @pytest.mark.asyncio
+    async def test_sink_returns_new_episodes(self):
+        sink = NonScheduledEpisodesSink(assume_new=False, dry_run=True)
+        new_episodes = await sink.process(EPISODE_LIST)
+        assert [(x.source_name, x.chapter_id) for x in new_episodes] == [("Source 3", "2")]
+
+    @pytest.mark.asyncio
+    @mock.patch.object(settings, "todoist_batch_size", 100)
+    async def test_tasks_in_batches(self):
+        todoist_repo = self.todoist_m.return_value
+        todoist_repo.sync.side_effect = lambda commands: SyncResult(
+            sync_status={x["uuid"]: "ok" for x in commands},
+            temp_id_mapping={x["temp_id"]: x["uuid"] for x in commands if "temp_id" in x},
+        )
+
+        await process_non_scheduled_episodes(EPISODE_LIST, True, False)
+
+        todoist_repo.create_task.assert_not_called()
+        todoist_repo.sync.assert_called_once()
+        commands = todoist_repo.sync.call_args.args[0]
+        assert [x["type"] for x in commands] == ["item_add"] * 3
+        assert self.s3_repo_m.return_value.update_episodes.call_count == 2
+
+    @pytest.mark.asyncio
+    @mock.patch.object(settings, "todoist_batch_size", 100)
+    async def test_failed_batch_skips_notifications_and_s3(self):
+        todoist_repo = self.todoist_m.return_value
+        todoist_repo.sync.side_effect = lambda commands: SyncResult(
+            sync_status={x["uuid"]: {"error": "error"} for x in commands}
+        )
+
+        with pytest.raises(ClickException, match="1 of 1 Todoist commands failed"):
+            await process_non_scheduled_episodes(EPISODE_LIST, False, False)
+
+        self.telegram_m.return_value.send_message.assert_not_called()
+        self.s3_repo_m.return_value.update_episodes.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_task_skips_notifications_and_s3(self):
+        self.todoist_m.return_value.create_task.side_effect = ValueError("error")
+
+        with pytest.raises(ClickException, match="1 of 1 Todoist writes failed"):
+            await process_non_scheduled_episodes(EPISODE_LIST, False, False)
+
+        self.telegram_m.return_value.send_message.assert_not_called()
+        self.s3_repo_m.return_value.update_episodes.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_created_tasks_are_saved_when_others_fail(self):
+        self.s3_repo_m.return_value.get_episodes.side_effect = None
+        self.s3_repo_m.return_value.get_episodes.return_value = []
+
+        async def create_task(task_create):
+            if task_create.content.startswith("[Source 3 1]"):
+                raise ValueError("error")
+            return mock.Mock(id=task_create.content)
+
+        self.todoist_m.return_value.create_task.side_effect = create_task
+
+        with pytest.raises(ClickException, match="1 of 3 Todoist writes failed"):
+            await process_non_scheduled_episodes(EPISODE_LIST, False, False)
+
+        # The episode whose task failed is left out, so it is created in the next run
+        s3_repo = self.s3_repo_m.return_value
+        assert s3_repo.update_episodes.call_count == 2
+        s3_repo.update_episodes.assert_any_call("SpyXFamily", ["1"])
+        s3_repo.update_episodes.assert_any_call("Source 3", ["2"])
+        messages = [x.args[0] for x in self.telegram_m.return_value.send_message.call_args_list]
+        assert messages == [
+            "New episode: [SpyXFamily 1](https://source-2.com/chapter-1)",
+            "New episode: [Source 3 2](https://source-3.com/chapter-2)",
+        ]
+
+
+# Not frozen in time, as the timeout needs the clock of the event loop to advance
+@pytest.mark.asyncio
+@mock.patch.object(settings, "reconcile_timeout", 0.05)
+@mock.patch("app.core.non_scheduled.S3Repository")
+@mock.patch("app.core.non_scheduled.TelegramRepository")
+@mock.patch("app.core.non_scheduled.TodoistRepository")
+async def test_sink_saves_created_tasks_when_timed_out(todoist_m, telegram_m, s3_repo_m, caplog):
+    todoist_m.return_value = mock.AsyncMock()
+    telegram_m.return_value = mock.AsyncMock()
+    s3_repo_m.return_value = mock.AsyncMock()
+    s3_repo_m.return_value.get_episodes.return_value = []
+
+    async def create_task(task_create):
+        if task_create.content.startswith("[Source 3 2]"):
+            await asyncio.sleep(1)
+        return mock.Mock(id=task_create.content)
+
+    todoist_m.return_value.create_task.side_effect = create_task
+    queue: asyncio.Queue = asyncio.Queue()
+    queue.put_nowait([x for x in EPISODE_LIST if x.source_name == "Source 3"])
+    queue.put_nowait(None)
+
+    await NonScheduledEpisodesSink(assume_new=False, dry_run=False).consume(queue)
+
+    assert caplog.messages == ["Timed out reconciling the episodes of source 'Source 3' after 0s"]
+    # The task that was created before the timeout is saved, the other one is retried
+    s3_repo_m.return_value.update_episodes.assert_called_once_with("Source 3", ["1"])
+    telegram_m.return_value.send_message.assert_called_once_with(
+        "New episode: [Source 3 1](https://source-3.com/chapter-1)"
+    )
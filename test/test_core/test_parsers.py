@@ -0,0 +1,39 @@
+from unittest import mock
+
+import pytest
+from bs4 import SoupStrainer
+
+from app.core.parsers import parse_html, resolve_parser
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    resolve_parser.cache_clear()
+    yield
+    resolve_parser.cache_clear()
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+@mock.patch("app.core.parsers.find_spec", return_value=object())
+def test_resolve_parser_installed(_find_spec_m, parser):
+    assert resolve_parser(parser) == parser
+
+
+@mock.patch("app.core.parsers.find_spec", return_value=None)
+def test_resolve_parser_fallback(_find_spec_m, caplog):
+    assert resolve_parser("lxml") == "html.parser"
+    assert caplog.records[0].message == "HTML parser 'lxml' is not installed, using 'html.parser'"
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_parse_html(parser):
+    soup = parse_html("<div id='a'><ul><li>1</li><li>2</li></ul></div>", parser)
+    assert [x.text for x in soup.select("#a li")] == ["1", "2"]
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_parse_html_parse_only(parser):
+    html = "<div id='a'><p>1</p></div><div id='b'><p>2</p></div>"
+    soup = parse_html(html, parser, SoupStrainer(id="b"))
+    assert [x.text for x in soup.select("p")] == ["2"]
+    assert soup.select("#a") == []
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from time import monotonic
+from unittest import mock
+
+import pytest
+
+from app.core.rate_limit import HostLimiter, RateLimiterRegistry, parse_retry_after
+
+
+async def send_requests(limiter: HostLimiter, n: int) -> float:
+    async def send_request():
+        async with limiter.acquire():
+            await asyncio.sleep(0)
+
+    start = monotonic()
+    await asyncio.gather(*[send_request() for _ in range(n)])
+    return monotonic() - start
+
+
+class TestHostLimiter:
+    @pytest.mark.asyncio
+    async def test_no_limits(self):
+        limiter = HostLimiter("example.com", rate=None, burst=1, max_concurrency=None)
+        assert await send_requests(limiter, 10) < 0.05
+
+    @pytest.mark.asyncio
+    async def test_burst(self):
+        limiter = HostLimiter("example.com", rate=1, burst=5, max_concurrency=None)
+        assert await send_requests(limiter, 5) < 0.05
+
+    @pytest.mark.asyncio
+    async def test_rate(self, caplog):
+        caplog.set_level(logging.DEBUG, logger="app.core.rate_limit")
+        limiter = HostLimiter("example.com", rate=20, burst=1, max_concurrency=None)
+        elapsed = await send_requests(limiter, 3)
+        assert 0.09 < elapsed < 0.3
+
+        delays = [x for x in caplog.records if "delayed" in x.message]
+        assert len(delays) == 2
+        assert delays[0].host == "example.com"
+        assert delays[0].queue_delay > 0
+
+    @pytest.mark.asyncio
+    async def test_max_concurrency(self):
+        limiter = HostLimiter("example.com", rate=None, burst=1, max_concurrency=2)
+        running = 0
+        max_running = 0
+
+        async def send_request():
+            nonlocal running, max_running
+            async with limiter.acquire():
+                running += 1
+                max_running = max(max_running, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*[send_request() for _ in range(6)])
+        assert max_running == 2
+
+    @pytest.mark.asyncio
+    async def test_pause(self):
+        limiter = HostLimiter("example.com", rate=None, burst=1, max_concurrency=None)
+        limiter.pause(0.1)
+        limiter.pause(0.01)
+        assert 0.09 < await send_requests(limiter, 2) < 0.3
+
+
+class TestRateLimiterRegistry:
+    @pytest.fixture(autouse=True)
+    def mocks(self):
+        self.settings_sm = mock.patch("app.core.rate_limit.settings")
+        self.settings_m = self.settings_sm.start()
+        self.settings_m.http_rate_limits = {"api.todoist.com": 0.5}
+        self.settings_m.http_rate_limit_burst = 3
+        self.settings_m.http_concurrency_limits = {"api.todoist.com": 2}
+        yield
+        self.settings_sm.stop()
+
+    @pytest.mark.asyncio
+    async def test_get_limiter(self):
+        registry = RateLimiterRegistry()
+        limiter = registry.get_limiter("https://api.todoist.com/rest/v2/tasks")
+        assert limiter is registry.get_limiter("https://api.todoist.com/sync/v9/sync")
+        assert limiter.host == "api.todoist.com"
+        assert limiter.rate == 0.5
+        assert limiter.burst == 3
+        assert limiter._semaphore is not None
+
+        other_limiter = registry.get_limiter("https://thetvdb.com/series")
+        assert other_limiter.rate is None
+        assert other_limiter._semaphore is None
+
+    def test_get_limiter_resets_on_new_event_loop(self):
+        registry = RateLimiterRegistry()
+
+        async def get_limiter():
+            return registry.get_limiter("https://thetvdb.com")
+
+        assert asyncio.run(get_limiter()) is not asyncio.run(get_limiter())
+
+
+PARSE_RETRY_AFTER_TEST_DATA = (
+    (None, None),
+    ("", None),
+    ("120", 120),
+    ("1.5", 1.5),
+    ("-5", 0),
+    ("invalid", None),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", 0),
+)
+
+
+@pytest.mark.parametrize("value,expected", PARSE_RETRY_AFTER_TEST_DATA)
+def test_parse_retry_after(value, expected):
+    result = parse_retry_after(value)
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected, abs=2)
+
+
+@pytest.mark.parametrize("usegmt", [True, False])
+def test_parse_retry_after_future_date(usegmt):
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=60)
+    if not usegmt:
+        # Dates without timezone are formatted with the "-0000" offset
+        retry_at = retry_at.replace(tzinfo=None)
+    result = parse_retry_after(format_datetime(retry_at, usegmt=usegmt))
+    assert result == pytest.approx(60, abs=2)
@@ -0,0 +1,126 @@
+import logging
+import sqlite3
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+import pytest
+from freezegun import freeze_time
+
+from app.core.result_cache import ResultCache, dump_episodes, get_result_cache, load_episodes
+from app.models.episodes import NonScheduledEpisode, ScheduledEpisode
+from app.models.inputs import TheTVDBInputs
+from app.models.source import Source
+from app.settings import settings
+
+SOURCE = Source(
+    provider="TheTVDB",
+    inputs=TheTVDBInputs(
+        source_name="Sherlock",
+        source_encoded_name="sherlock",
+        todoist_project_id="project",
+        todoist_section_id="section",
+    ),
+)
+SCHEDULED_EPISODES = [
+    ScheduledEpisode(
+        source_name="Sherlock",
+        chapter_id=f"1x0{x}",
+        released_date=date(2010, 7, 25) if x < 3 else None,
+        platform="BBC One",
+        source=SOURCE,
+    )
+    for x in range(1, 4)
+]
+NON_SCHEDULED_EPISODES = [
+    NonScheduledEpisode(
+        source_name="Sherlock", chapter_id="1", chapter_url="https://example.com/1", source=SOURCE
+    )
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    result_cache = ResultCache(tmp_path / "results.sqlite3")
+    yield result_cache
+    result_cache.close()
+
+
+@pytest.mark.parametrize("episodes", [SCHEDULED_EPISODES, NON_SCHEDULED_EPISODES, []])
+def test_dump_and_load_episodes(episodes):
+    assert load_episodes(dump_episodes(episodes), SOURCE) == episodes
+
+
+def test_dump_episodes_is_compact():
+    data = dump_episodes(SCHEDULED_EPISODES * 100)
+    assert len(data) < len("".join(x.json() for x in SCHEDULED_EPISODES)) / 2
+
+
+def test_get_missing(cache):
+    assert cache.get(SOURCE, 300) is None
+
+
+def test_set_and_get(cache, tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    cache.set(SOURCE, SCHEDULED_EPISODES)
+    assert cache.get(SOURCE, 300) == SCHEDULED_EPISODES
+    assert caplog.records[0].message == "Serving 3 episodes of 'Sherlock' from the result cache"
+
+    other_cache = ResultCache(tmp_path / "results.sqlite3")
+    assert other_cache.get(SOURCE, 300) == SCHEDULED_EPISODES
+    other_cache.close()
+
+
+def test_ttl(cache):
+    cache.set(SOURCE, SCHEDULED_EPISODES)
+    with freeze_time(datetime.now() + timedelta(seconds=301)):
+        assert cache.get(SOURCE, 300) is None
+        assert cache.get(SOURCE, 600) == SCHEDULED_EPISODES
+
+
+def test_key_depends_on_source_and_version(cache):
+    cache.set(SOURCE, SCHEDULED_EPISODES)
+    other_source = SOURCE.copy(deep=True)
+    other_source.inputs.todoist_section_id = "other"
+    assert cache.get(other_source, 300) is None
+    with mock.patch("app.core.result_cache.get_version", return_value="0.0.0"):
+        assert cache.get(SOURCE, 300) is None
+
+
+def test_set_replaces(cache):
+    cache.set(SOURCE, SCHEDULED_EPISODES)
+    cache.set(SOURCE, SCHEDULED_EPISODES[:1])
+    assert cache.get(SOURCE, 300) == SCHEDULED_EPISODES[:1]
+
+
+def test_refresh_does_not_read(tmp_path):
+    cache = ResultCache(tmp_path / "results.sqlite3", read=False)
+    cache.set(SOURCE, SCHEDULED_EPISODES)
+    assert cache.get(SOURCE, 300) is None
+    cache.close()
+    cache = ResultCache(tmp_path / "results.sqlite3")
+    assert cache.get(SOURCE, 300) == SCHEDULED_EPISODES
+    cache.close()
+
+
+def test_corrupted_entry(cache, caplog):
+    cache.set(SOURCE, SCHEDULED_EPISODES)
+    with sqlite3.connect(cache.path) as connection:
+        connection.execute("UPDATE results SET data = ?", (b"invalid",))
+    assert cache.get(SOURCE, 300) is None
+    assert caplog.records[0].message == "Ignoring corrupted cached results of 'Sherlock'"
+
+
+@pytest.mark.parametrize("mode,read", [("use", True), ("refresh", False)])
+def test_get_result_cache(tmp_path, mode, read):
+    with mock.patch.object(settings, "cache_dir", tmp_path):
+        cache = get_result_cache(mode)
+        assert get_result_cache("bypass") is None
+    assert cache is not None
+    assert cache.path == tmp_path / "results.sqlite3"
+    assert cache.read is read
+    cache.close()
+
+
+def test_get_result_cache_disabled():
+    with mock.patch.object(settings, "cache_dir", None):
+        assert get_result_cache("use") is None
@@ -0,0 +1,47 @@
+from unittest import mock
+
+import pytest
+from httpx import ConnectError, ReadTimeout, Response
+
+from app.core.retry import RetryPolicy
+
+POLICY = RetryPolicy(max_attempts=3, backoff_base=1, backoff_cap=3, deadline=10)
+GET_DELAY_TEST_DATA = (
+    # method, attempt, elapsed, status_code, exception, retry_after, expected
+    ("GET", 1, 0, 502, None, None, 1),
+    ("GET", 2, 0, 503, None, None, 2),
+    ("GET", 3, 0, 503, None, None, None),
+    ("GET", 1, 9.5, 503, None, None, None),
+    ("GET", 1, 0, 404, None, None, None),
+    ("GET", 1, 0, 200, None, None, None),
+    ("POST", 1, 0, 502, None, None, None),
+    ("POST", 1, 0, 429, None, None, 1),
+    ("POST", 1, 0, 429, None, "5", 5),
+    ("POST", 1, 0, 429, None, "50", None),
+    ("GET", 1, 0, None, ReadTimeout("timeout"), None, 1),
+    ("POST", 1, 0, None, ReadTimeout("timeout"), None, None),
+    ("POST", 1, 0, None, ConnectError("error"), None, 1),
+    ("GET", 1, 0, None, ValueError("error"), None, None),
+    ("GET", 1, 0, None, None, None, None),
+)
+
+
+@pytest.mark.parametrize(
+    "method,attempt,elapsed,status_code,exc,retry_after,expected", GET_DELAY_TEST_DATA
+)
+@mock.patch("app.core.retry.random.uniform", side_effect=lambda _, b: b)
+def test_get_delay(_uniform_m, method, attempt, elapsed, status_code, exc, retry_after, expected):
+    response = None
+    if status_code:
+        headers = {"Retry-After": retry_after} if retry_after else {}
+        response = Response(status_code, headers=headers)
+    assert POLICY.get_delay(method, attempt, elapsed, response=response, exc=exc) == expected
+
+
+def test_get_delay_backoff_cap():
+    for attempt in range(1, 10):
+        delay = RetryPolicy(max_attempts=10, deadline=100).get_delay(
+            "GET", attempt, 0, exc=ReadTimeout("")
+        )
+        assert delay is not None
+        assert 0 <= delay <= 8
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import date
 from json import loads
 from pathlib import Path
@@ -6,9 +7,10 @@ from unittest import mock
 import pytest
 from freezegun import freeze_time
 
-from app.core.scheduled import process_scheduled_episodes
+from app.core.scheduled import ScheduledEpisodesSink, process_scheduled_episodes
 from app.models.episodes import ScheduledEpisode
-from app.models.todoist import Task, TaskCreate, TaskUpdate
+from app.models.todoist import SyncResult, Task, TaskCreate, TaskUpdate
+from app.settings import settings
 
 TASKS_FILE = Path(__file__).parent.parent / "data" / "core" / "scheduled_tasks.json"
 TASK_LIST = [Task(**x) for x in loads(TASKS_FILE.read_text())]
@@ -58,3 +60,64 @@ async def test_process_scheduled_episodes(todoist_repo_mock, assume_new, dry_run
         repo.update_task.assert_not_called()
     else:
         repo.update_task.assert_called_once_with("task-2", task_update)
+
+
+@pytest.mark.asyncio
+@freeze_time("2018-01-01")
+@mock.patch("app.core.scheduled.TodoistRepository")
+async def test_sink_lists_each_project_once(todoist_repo_mock):
+    repo = todoist_repo_mock.return_value = mock.AsyncMock()
+    repo.list_tasks.return_value = TASK_LIST
+    queue: asyncio.Queue = asyncio.Queue()
+    for episode in EPISODE_LIST:
+        queue.put_nowait([episode])
+    queue.put_nowait(None)
+
+    await ScheduledEpisodesSink(assume_new=False, dry_run=False).consume(queue)
+
+    todoist_repo_mock.assert_called_once()
+    assert repo.list_tasks.call_count == 2
+    repo.list_tasks.assert_any_call(project_id="project-1")
+    repo.list_tasks.assert_any_call(project_id="project-2")
+    assert repo.create_task.call_count == 1
+    assert repo.update_task.call_count == 1
+
+
+@pytest.mark.asyncio
+@freeze_time("2018-01-01")
+@mock.patch.object(settings, "todoist_batch_size", 100)
+@mock.patch("app.core.scheduled.TodoistRepository")
+async def test_process_scheduled_episodes_in_batches(todoist_repo_mock):
+    repo = todoist_repo_mock.return_value = mock.AsyncMock()
+    repo.list_tasks.return_value = TASK_LIST
+    repo.sync.side_effect = lambda commands: SyncResult(
+        sync_status={x["uuid"]: "ok" for x in commands},
+        temp_id_mapping={x["temp_id"]: x["uuid"] for x in commands if "temp_id" in x},
+    )
+
+    await process_scheduled_episodes(EPISODE_LIST, False, False)
+
+    repo.create_task.assert_not_called()
+    repo.update_task.assert_not_called()
+    repo.sync.assert_called_once()
+    commands = repo.sync.call_args.args[0]
+    assert [(x["type"], x["args"]) for x in commands] == [
+        (
+            "item_update",
+            {
+                "id": "task-2",
+                "description": "Released: 2019-01-07 on nginx",
+                "due": {"date": "2019-01-07"},
+            },
+        ),
+        ("item_move", {"id": "task-2", "section_id": "section-1"}),
+        (
+            "item_add",
+            {
+                "content": "Source 2 3x01",
+                "description": "Released: 2019-01-01 on nginx",
+                "project_id": "project-2",
+                "due": {"date": "2019-01-01"},
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+import logging
+
+import pytest
+
+from app.core.sharding import Shard, filter_shard, group_sources, parse_shard
+from app.models.inputs import InputsBase
+from app.models.source import Source
+
+
+def get_source(source_name: str, project_id: str) -> Source:
+    inputs = InputsBase(
+        source_name=source_name,
+        source_encoded_name=source_name,
+        todoist_project_id=project_id,
+        todoist_section_id=None,
+    )
+    return Source(provider="InManga", inputs=inputs)
+
+
+def get_names(sources):
+    return [x.inputs.source_name for x in sources]
+
+
+SOURCES = [get_source(f"Source {i}", f"project-{i}") for i in range(50)]
+
+
+def test_parse_shard():
+    assert parse_shard("0/1") == Shard(index=0, count=1)
+    assert parse_shard("2/3") == Shard(index=2, count=3)
+    assert str(parse_shard("2/3")) == "2/3"
+
+
+@pytest.mark.parametrize("value", ["", "1", "1/", "/2", "a/2", "1/b", "-1/2", "2/2", "0/0"])
+def test_parse_invalid_shard(value):
+    with pytest.raises(ValueError, match="Invalid shard"):
+        parse_shard(value)
+
+
+def test_group_sources():
+    sources = [
+        get_source("A", "project-1"),
+        get_source("B", "project-2"),
+        get_source("C", "project-1"),
+        get_source("D", "project-3"),
+        # Shares the AWS S3 file of D and the Todoist project of B, so it joins both groups
+        get_source("D", "project-2"),
+        get_source("E", "project-4"),
+    ]
+    groups = group_sources(sources)
+    assert [get_names(x) for x in groups] == [["A", "C"], ["B", "D", "D"], ["E"]]
+
+
+def test_shards_are_disjoint_and_complete():
+    shards = [filter_shard(SOURCES, Shard(index=i, count=3)) for i in range(3)]
+    assert all(shards)
+    assert sorted(x for shard in shards for x in get_names(shard)) == sorted(get_names(SOURCES))
+    # The order of the sources is kept
+    assert all(shard == [x for x in SOURCES if x in shard] for shard in shards)
+
+
+def test_shards_are_stable():
+    shard = Shard(index=1, count=4)
+    expected = set(get_names(filter_shard(SOURCES, shard)))
+    # Adding, removing or reordering the rest of the sources does not move a source
+    sources = list(reversed(SOURCES[10:])) + [get_source("New", "project-new")]
+    names = set(get_names(filter_shard(sources, shard))) - {"New"}
+    assert names == expected - set(get_names(SOURCES[:10]))
+
+
+def test_related_sources_share_shard():
+    sources = SOURCES + [get_source("Shared", "project-0")]
+    for index in range(5):
+        names = get_names(filter_shard(sources, Shard(index=index, count=5)))
+        assert ("Source 0" in names) == ("Shared" in names)
+
+
+def test_filter_shard_logs(caplog):
+    caplog.set_level(logging.INFO)
+    shard_sources = filter_shard(SOURCES, Shard(index=0, count=1))
+    assert shard_sources == SOURCES
+    assert caplog.messages == ["Processing 50 of 50 sources in shard 0/1"]
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_shared():
+    flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def func():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*[flight.do("key", func) for _ in range(5)])
+    assert results == [1] * 5
+    assert calls == 1
+    assert flight._calls == {}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_shared():
+    flight: SingleFlight[str] = SingleFlight()
+
+    async def func(key: str):
+        await asyncio.sleep(0.01)
+        return key
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: func("a")), flight.do("b", lambda: func("b"))
+    )
+    assert results == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_sequential_calls_are_not_shared():
+    flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def func():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flight.do("key", func) == 1
+    assert await flight.do("key", func) == 2
+
+
+@pytest.mark.asyncio
+async def test_exception_is_shared():
+    flight: SingleFlight[int] = SingleFlight()
+
+    async def func():
+        await asyncio.sleep(0.01)
+        raise ValueError("error")
+
+    results = await asyncio.gather(
+        *[flight.do("key", func) for _ in range(3)], return_exceptions=True
+    )
+    assert all(isinstance(x, ValueError) for x in results)
+    assert flight._calls == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_waiters():
+    flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def func():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return 1
+
+    async def leader():
+        async with asyncio.timeout(0.01):
+            return await flight.do("key", func)
+
+    leader_task = asyncio.create_task(leader())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", func))
+
+    with pytest.raises(TimeoutError):
+        await leader_task
+    assert await waiter == 1
+    assert calls == 1
+    assert flight._calls == {}
+
+
+@pytest.mark.asyncio
+async def test_call_is_cancelled_without_callers():
+    flight: SingleFlight[int] = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def func():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return 1
+
+    async def func_2():
+        return 2
+
+    tasks = [asyncio.create_task(flight.do("key", func)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(x.cancelled() for x in tasks)
+    # New callers do not join the cancelled call
+    assert flight._calls == {}
+    assert await flight.do("key", func_2) == 2
+    await asyncio.wait_for(cancelled.wait(), 1)
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from unittest import mock
+
+import pytest
+from click import ClickException
+
+from app.core.sink import EpisodesSink
+from app.models.episodes import NonScheduledEpisode
+from app.settings import settings
+from test.test_main import get_non_scheduled_episodes
+
+
+class SlowSink(EpisodesSink):
+    def __init__(self, slow_source_name: str):
+        self.slow_source_name = slow_source_name
+        self.processed: list[list[NonScheduledEpisode]] = []
+        self.finished = False
+
+    async def process(self, episodes):
+        if episodes[0].source_name == self.slow_source_name:
+            await asyncio.sleep(1)
+        self.processed.append(episodes)
+
+    def finish(self):
+        self.finished = True
+
+
+class FailingSink(SlowSink):
+    async def process(self, episodes):
+        if episodes[0].source_name == self.slow_source_name:
+            raise ClickException("1 of 1 Todoist writes failed")
+        self.processed.append(episodes)
+
+
+def get_batches():
+    episodes = get_non_scheduled_episodes()
+    source_names = sorted({x.source_name for x in episodes})
+    return [[x for x in episodes if x.source_name == name] for name in source_names]
+
+
+@pytest.mark.asyncio
+@mock.patch.object(settings, "reconcile_timeout", 0.01)
+async def test_consume_skips_batches_that_time_out(caplog):
+    batches = get_batches()
+    queue: asyncio.Queue = asyncio.Queue()
+    for batch in batches:
+        queue.put_nowait(batch)
+    queue.put_nowait(None)
+    sink = SlowSink(batches[0][0].source_name)
+    on_processed = mock.Mock()
+
+    await sink.consume(queue, on_processed)
+
+    assert sink.processed == batches[1:]
+    assert on_processed.call_args_list == [mock.call(x) for x in batches[1:]]
+    assert sink.finished is True
+    error = [x for x in caplog.records if x.levelno == logging.ERROR]
+    assert [x.message for x in error] == [
+        f"Timed out reconciling the episodes of source {batches[0][0].source_name!r} after 0s"
+    ]
+
+
+@pytest.mark.asyncio
+@mock.patch.object(settings, "reconcile_timeout", 0)
+async def test_consume_without_timeout():
+    batches = get_batches()
+    queue: asyncio.Queue = asyncio.Queue()
+    queue.put_nowait(batches[0])
+    queue.put_nowait(None)
+    sink = SlowSink("")
+
+    await sink.consume(queue)
+
+    assert sink.processed == batches[:1]
+
+
+@pytest.mark.asyncio
+async def test_consume_skips_batches_that_fail(caplog):
+    batches = get_batches()
+    queue: asyncio.Queue = asyncio.Queue()
+    for batch in batches:
+        queue.put_nowait(batch)
+    queue.put_nowait(None)
+    sink = FailingSink(batches[0][0].source_name)
+    on_processed = mock.Mock()
+
+    await sink.consume(queue, on_processed)
+
+    assert sink.processed == batches[1:]
+    assert on_processed.call_args_list == [mock.call(x) for x in batches[1:]]
+    assert sink.finished is True
+    error = [x for x in caplog.records if x.levelno == logging.ERROR]
+    assert [x.message for x in error] == [
+        f"Error while reconciling the episodes of source {batches[0][0].source_name!r}"
+    ]
+    assert isinstance(error[0].exc_info[1], ClickException)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from unittest import mock
+
+import pytest
+
+from app.core.source_scheduler import SourceScheduler, get_source_scheduler
+from app.models.inputs import InputsBase
+from app.models.source import Source
+from app.settings import settings
+
+
+def get_source(provider: str, source_name: str) -> Source:
+    inputs = InputsBase(
+        source_name=source_name,
+        source_encoded_name=source_name,
+        todoist_project_id="project",
+        todoist_section_id=None,
+    )
+    return Source(provider=provider, inputs=inputs)
+
+
+class ConcurrencyRecorder:
+    """Records the maximum number of sources processed at once, in total and by provider."""
+
+    def __init__(self, sleep: float = 0.01):
+        self.sleep = sleep
+        self.started: list[str] = []
+        self.max_in_flight = 0
+        self.max_in_flight_by_provider: dict[str, int] = {}
+        self._in_flight: list[Source] = []
+
+    async def __call__(self, source: Source) -> None:
+        self.started.append(source.inputs.source_name)
+        self._in_flight.append(source)
+        self.max_in_flight = max(self.max_in_flight, len(self._in_flight))
+        count = sum(x.provider == source.provider for x in self._in_flight)
+        self.max_in_flight_by_provider[source.provider] = max(
+            self.max_in_flight_by_provider.get(source.provider, 0), count
+        )
+        await asyncio.sleep(self.sleep)
+        self._in_flight.remove(source)
+
+
+SOURCES = [get_source("InManga", f"InManga {i}") for i in range(4)] + [
+    get_source("TheTVDB", f"TheTVDB {i}") for i in range(4)
+]
+
+
+@pytest.mark.asyncio
+async def test_global_limit(caplog):
+    caplog.set_level(logging.DEBUG)
+    recorder = ConcurrencyRecorder()
+    await SourceScheduler(3, {}).run(SOURCES, recorder)
+
+    assert recorder.started == [x.inputs.source_name for x in SOURCES]
+    assert recorder.max_in_flight == 3
+
+    records = [x for x in caplog.records if x.msg.startswith("Starting source")]
+    assert [x.queue_depth for x in records] == [7, 6, 5, 4, 3, 2, 1, 0]
+    assert records[0].queue_wait < 0.01
+    assert records[-1].queue_wait >= 0.01
+    assert caplog.records[-1].max_queue_wait == records[-1].queue_wait
+
+
+@pytest.mark.asyncio
+async def test_no_limits():
+    recorder = ConcurrencyRecorder()
+    await SourceScheduler(0, {"InManga": 0}).run(SOURCES, recorder)
+    assert recorder.max_in_flight == len(SOURCES)
+
+
+@pytest.mark.asyncio
+async def test_provider_limits():
+    recorder = ConcurrencyRecorder()
+    await SourceScheduler(4, {"InManga": 1}).run(SOURCES, recorder)
+
+    assert recorder.max_in_flight == 4
+    assert recorder.max_in_flight_by_provider == {"InManga": 1, "TheTVDB": 3}
+    # The sources blocked by the provider limit do not hold back the rest of the providers
+    assert recorder.started[:4] == ["InManga 0", "TheTVDB 0", "TheTVDB 1", "TheTVDB 2"]
+
+
+@pytest.mark.asyncio
+async def test_error_cancels_running_sources():
+    cancelled: list[str] = []
+
+    async def process(source: Source) -> None:
+        if source.inputs.source_name == "InManga 0":
+            raise ValueError("error")
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(source.inputs.source_name)
+            raise
+
+    with pytest.raises(ValueError, match="error"):
+        await SourceScheduler(3, {}).run(SOURCES, process)
+    assert cancelled == ["InManga 1", "InManga 2"]
+
+
+@mock.patch.object(settings, "source_concurrency", 5)
+@mock.patch.object(settings, "source_concurrency_limits", {"InManga": 2})
+def test_get_source_scheduler():
+    scheduler = get_source_scheduler()
+    assert scheduler.max_in_flight == 5
+    assert scheduler.provider_limits == {"InManga": 2}
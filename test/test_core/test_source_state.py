@@ -0,0 +1,151 @@
+import logging
+from datetime import date
+from unittest import mock
+
+import pytest
+
+from app.core.source_state import (
+    SourceState,
+    SourceTracker,
+    get_source_tracker,
+    hash_episodes,
+    hash_payload,
+)
+from app.core.state_store import StateStore
+from app.models.episodes import ScheduledEpisode
+from app.models.inputs import TheTVDBInputs
+from app.models.source import Source
+from app.settings import settings
+
+SOURCE = Source(
+    provider="TheTVDB",
+    inputs=TheTVDBInputs(
+        source_name="Sherlock",
+        source_encoded_name="sherlock",
+        todoist_project_id="project",
+        todoist_section_id="section",
+    ),
+)
+PAGES = ["<html>info</html>", "<html>episodes</html>"]
+
+
+def get_episodes(platform="BBC One"):
+    return [
+        ScheduledEpisode(
+            source_name="Sherlock",
+            chapter_id="1x01",
+            released_date=date(2010, 7, 25),
+            platform=platform,
+            source=SOURCE,
+        )
+    ]
+
+
+def get_tracker(path):
+    return SourceTracker(StateStore(path / "sources", SourceState))
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    return get_tracker(tmp_path)
+
+
+def test_hash_payload():
+    assert hash_payload(PAGES) == hash_payload(list(PAGES))
+    assert hash_payload(["ab", "c"]) != hash_payload(["a", "bc"])
+
+
+def test_hash_episodes():
+    assert hash_episodes(get_episodes()) == hash_episodes(get_episodes())
+    assert hash_episodes(get_episodes()) != hash_episodes(get_episodes("Netflix"))
+
+
+def test_cold_start(tracker):
+    assert tracker.is_payload_unchanged(SOURCE, PAGES) is False
+    assert tracker.is_episodes_unchanged(SOURCE, PAGES, get_episodes()) is False
+
+
+def test_state_is_saved_on_commit(tracker, tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    tracker.is_episodes_unchanged(SOURCE, PAGES, get_episodes())
+    assert tracker.is_payload_unchanged(SOURCE, PAGES) is False
+    assert list(tmp_path.joinpath("sources").iterdir()) == []
+
+    tracker.commit()
+    tracker = get_tracker(tmp_path)
+    assert tracker.is_payload_unchanged(SOURCE, PAGES) is True
+    assert tracker.is_payload_unchanged(SOURCE, PAGES[:1]) is False
+    assert caplog.records[-1].message == "Skipping source 'Sherlock', its pages did not change"
+
+
+def test_episodes_unchanged_with_new_payload(tracker, caplog):
+    caplog.set_level(logging.INFO)
+    tracker.is_episodes_unchanged(SOURCE, PAGES, get_episodes())
+    tracker.commit()
+
+    new_pages = ["<html>new ad</html>", PAGES[1]]
+    assert tracker.is_payload_unchanged(SOURCE, new_pages) is False
+    assert tracker.is_episodes_unchanged(SOURCE, new_pages, get_episodes()) is True
+    assert caplog.records[-1].message == "Skipping source 'Sherlock', its episodes did not change"
+    assert tracker.is_episodes_unchanged(SOURCE, new_pages, get_episodes("Netflix")) is False
+
+    tracker.commit()
+    assert tracker.is_payload_unchanged(SOURCE, new_pages) is True
+
+
+def test_state_depends_on_source_and_version(tracker):
+    tracker.is_episodes_unchanged(SOURCE, PAGES, get_episodes())
+    tracker.commit()
+
+    other_source = SOURCE.copy(deep=True)
+    other_source.inputs.todoist_section_id = "other"
+    assert tracker.is_payload_unchanged(other_source, PAGES) is False
+    with mock.patch("app.core.source_state.get_version", return_value="0.0.0"):
+        assert tracker.is_payload_unchanged(SOURCE, PAGES) is False
+
+
+def test_commit_only_some_sources(tracker):
+    other_source = SOURCE.copy(deep=True)
+    other_source.inputs.source_name = "Other"
+    tracker.is_episodes_unchanged(SOURCE, PAGES, get_episodes())
+    tracker.is_episodes_unchanged(other_source, PAGES, get_episodes())
+
+    tracker.commit([other_source, other_source])
+    assert tracker.is_payload_unchanged(SOURCE, PAGES) is False
+    assert tracker.is_payload_unchanged(other_source, PAGES) is True
+    assert list(tracker._pending) == [tracker._get_key(SOURCE)]
+
+    tracker.commit()
+    assert tracker.is_payload_unchanged(SOURCE, PAGES) is True
+
+
+def test_commit_replaces_state(tracker):
+    tracker.is_episodes_unchanged(SOURCE, PAGES, get_episodes())
+    tracker.commit()
+    tracker.is_episodes_unchanged(SOURCE, PAGES[:1], get_episodes())
+    tracker.commit()
+    state = tracker.store.get(tracker._get_key(SOURCE))
+    assert state.payload_hash == hash_payload(PAGES[:1])
+    assert tracker._pending == {}
+
+
+def test_get_source_tracker(tmp_path):
+    with mock.patch.object(settings, "cache_dir", None):
+        assert get_source_tracker() is None
+    with mock.patch.object(settings, "cache_dir", tmp_path):
+        tracker = get_source_tracker()
+    assert tracker is not None
+    assert tracker.store.path == tmp_path / "sources"
+    assert tracker.store.model is SourceState
+
+
+def test_watermark(tracker):
+    assert tracker.get_watermark(SOURCE) is None
+    tracker.is_episodes_unchanged(SOURCE, PAGES, get_episodes(), {"chapter_id": "1x01"})
+    assert tracker.get_watermark(SOURCE) is None
+
+    tracker.commit()
+    assert tracker.get_watermark(SOURCE) == {"chapter_id": "1x01"}
+    tracker.is_episodes_unchanged(SOURCE, PAGES, get_episodes())
+    tracker.commit()
+    assert tracker.get_watermark(SOURCE) is None
@@ -0,0 +1,51 @@
+from unittest import mock
+
+import pytest
+from pydantic import BaseModel
+
+from app.core.state_store import StateStore, get_state_store
+from app.settings import settings
+
+
+class Model(BaseModel):
+    value: int
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StateStore(tmp_path / "store", Model)
+
+
+def test_get_missing(store):
+    assert store.get("key") is None
+
+
+def test_set_and_get(store, tmp_path):
+    store.set("key", Model(value=1))
+    store.set("other", Model(value=2))
+    assert store.get("key") == Model(value=1)
+    assert StateStore(tmp_path / "store", Model).get("other") == Model(value=2)
+    assert sorted(x.suffix for x in store.path.iterdir()) == [".json", ".json"]
+
+
+def test_set_replaces(store):
+    store.set("key", Model(value=1))
+    store.set("key", Model(value=2))
+    assert store.get("key") == Model(value=2)
+
+
+def test_get_corrupted(store, caplog):
+    store._get_file("key").write_text('{"value": "invalid"}')
+    assert store.get("key") is None
+    assert caplog.records[0].message == f"Ignoring corrupted state 'key' in {store.path}"
+
+
+def test_get_state_store(tmp_path):
+    with mock.patch.object(settings, "cache_dir", None):
+        assert get_state_store("name", Model) is None
+    with mock.patch.object(settings, "cache_dir", tmp_path):
+        store = get_state_store("name", Model)
+    assert store is not None
+    assert store.path == tmp_path / "name"
+    assert store.path.is_dir()
+    assert store.model is Model
@@ -0,0 +1,69 @@
+import pytest
+from click import ClickException
+from httpx import Request, Response
+
+from app.core.streaming import PageReader
+
+PAGE = (
+    "<html><body><div id='target'><div><p>1</p></div><p>2</p></div>"
+    "<script>var x = '</div>';</script><div id='after'>3</div></body></html>"
+)
+
+
+def build_response(text: str, chunk_size: int = 7, encoding: str = "utf-8") -> Response:
+    content = text.encode(encoding)
+
+    async def stream():
+        for i in range(0, len(content), chunk_size):
+            yield content[i : i + chunk_size]
+
+    headers = {"Content-Type": f"text/html; charset={encoding}"}
+    return Response(200, content=stream(), headers=headers, request=Request("GET", "https://x"))
+
+
+@pytest.mark.asyncio
+async def test_read_full_body():
+    reader = PageReader(max_size=1000)
+    await reader.read(build_response(PAGE))
+    assert reader.text == PAGE
+    assert reader.truncated is False
+
+
+@pytest.mark.asyncio
+async def test_read_stop_after():
+    reader = PageReader(max_size=1000, stop_after="target")
+    await reader.read(build_response(PAGE))
+    assert reader.truncated is True
+    assert "<p>2</p></div>" in reader.text
+    assert "after" not in reader.text
+
+
+@pytest.mark.asyncio
+async def test_read_stop_after_missing_element():
+    reader = PageReader(max_size=1000, stop_after="missing")
+    await reader.read(build_response(PAGE))
+    assert reader.text == PAGE
+    assert reader.truncated is False
+
+
+@pytest.mark.asyncio
+async def test_read_multibyte_characters_split_between_chunks():
+    text = "<p id='a'>ñandú €</p><p>b</p>"
+    reader = PageReader(max_size=1000, stop_after="a")
+    await reader.read(build_response(text, chunk_size=1))
+    assert reader.text.startswith("<p id='a'>ñandú €</p>")
+
+
+@pytest.mark.asyncio
+async def test_read_latin_1():
+    text = "<p>ñandú</p>"
+    reader = PageReader(max_size=1000)
+    await reader.read(build_response(text, encoding="latin-1"))
+    assert reader.text == text
+
+
+@pytest.mark.asyncio
+async def test_read_max_size():
+    reader = PageReader(max_size=20)
+    with pytest.raises(ClickException, match="Response body of https://x is bigger than 20 bytes"):
+        await reader.read(build_response(PAGE))
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+from datetime import date
+from json import loads
+from unittest import mock
+
+import httpx
+import pytest
+from click import ClickException
+from pytest_httpx import HTTPXMock
+
+from app.core.todoist_writer import (
+    MAX_BATCH_SIZE,
+    TodoistBatchWriter,
+    TodoistConcurrentWriter,
+    get_todoist_writer,
+)
+from app.models.todoist import Task, TaskCreate, TaskUpdate
+from app.repositories.todoist import TodoistRepository
+from app.settings import settings
+
+TASK = Task(
+    id="task-1",
+    content="Source 1 1x01",
+    description="",
+    project_id="project-1",
+    section_id="section-1",
+    due_date=date(2022, 1, 1),
+)
+
+
+class SyncEndpoint:
+    """Stand-in for the Todoist Sync API, failing the commands with content `fail`."""
+
+    def __init__(self, httpx_mock: HTTPXMock):
+        self.requests: list[list[dict]] = []
+        self.next_id = 0
+        httpx_mock.add_callback(
+            self.handle, method="POST", url="https://api.todoist.com/sync/v9/sync"
+        )
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        commands = loads(request.content)["commands"]
+        self.requests.append(commands)
+        sync_status: dict = {}
+        temp_id_mapping = {}
+        for command in commands:
+            if command["args"].get("content") == "fail":
+                sync_status[command["uuid"]] = {"error_code": 15, "error": "Invalid temporary id"}
+                continue
+            sync_status[command["uuid"]] = "ok"
+            if "temp_id" in command:
+                temp_id_mapping[command["temp_id"]] = f"id-{self.next_id}"
+                self.next_id += 1
+        return httpx.Response(
+            200, json={"sync_status": sync_status, "temp_id_mapping": temp_id_mapping}
+        )
+
+    @property
+    def commands(self) -> list[dict]:
+        return [x for commands in self.requests for x in commands]
+
+
+def get_task_create(content: str, section_id: str | None = None) -> TaskCreate:
+    return TaskCreate(
+        content=content,
+        description="description",
+        project_id="project-1",
+        section_id=section_id,
+        due_date=date(2022, 1, 1),
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_tasks(httpx_mock: HTTPXMock):
+    endpoint = SyncEndpoint(httpx_mock)
+    writer = TodoistBatchWriter(TodoistRepository(), batch_size=2)
+
+    temp_ids = [writer.create_task(get_task_create(f"Task {i}", "section-1")) for i in range(3)]
+    temp_id_mapping = await writer.flush()
+
+    assert [len(x) for x in endpoint.requests] == [2, 1]
+    assert temp_id_mapping == {temp_ids[0]: "id-0", temp_ids[1]: "id-1", temp_ids[2]: "id-2"}
+    assert endpoint.commands[0]["type"] == "item_add"
+    assert endpoint.commands[0]["temp_id"] == temp_ids[0]
+    assert endpoint.commands[0]["args"] == {
+        "content": "Task 0",
+        "description": "description",
+        "project_id": "project-1",
+        "section_id": "section-1",
+        "due": {"date": "2022-01-01"},
+    }
+    assert len({x["uuid"] for x in endpoint.commands}) == 3
+
+    # The queue is emptied by each flush
+    assert await writer.flush() == {}
+    assert len(endpoint.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_create_task_without_section(httpx_mock: HTTPXMock):
+    endpoint = SyncEndpoint(httpx_mock)
+    writer = TodoistBatchWriter(TodoistRepository())
+    writer.create_task(get_task_create("Task"))
+    await writer.flush()
+    assert "section_id" not in endpoint.commands[0]["args"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "task_update, expected",
+    [
+        (
+            TaskUpdate(description="new", due_date=date(2022, 1, 2)),
+            [
+                (
+                    "item_update",
+                    {"id": "task-1", "description": "new", "due": {"date": "2022-01-02"}},
+                )
+            ],
+        ),
+        (
+            TaskUpdate(content="new", due_date=None),
+            [("item_update", {"id": "task-1", "content": "new", "due": None})],
+        ),
+        (
+            TaskUpdate(section_id="section-2"),
+            [("item_move", {"id": "task-1", "section_id": "section-2"})],
+        ),
+        (
+            TaskUpdate(description="new", section_id=None),
+            [
+                ("item_update", {"id": "task-1", "description": "new"}),
+                ("item_move", {"id": "task-1", "project_id": "project-1"}),
+            ],
+        ),
+        (
+            TaskUpdate(project_id="project-2"),
+            [("item_move", {"id": "task-1", "project_id": "project-2"})],
+        ),
+    ],
+)
+async def test_update_task(httpx_mock: HTTPXMock, task_update, expected):
+    endpoint = SyncEndpoint(httpx_mock)
+    writer = TodoistBatchWriter(TodoistRepository())
+    writer.update_task(TASK, task_update)
+    assert await writer.flush() == {}
+    assert [(x["type"], x["args"]) for x in endpoint.commands] == expected
+
+
+@pytest.mark.asyncio
+async def test_failed_commands(httpx_mock: HTTPXMock, caplog):
+    caplog.set_level(logging.INFO)
+    endpoint = SyncEndpoint(httpx_mock)
+    writer = TodoistBatchWriter(TodoistRepository(), batch_size=2)
+    writer.create_task(get_task_create("fail"))
+    writer.create_task(get_task_create("Task 1"))
+    writer.update_task(TASK, TaskUpdate(content="fail"))
+
+    with pytest.raises(ClickException, match="2 of 3 Todoist commands failed"):
+        await writer.flush()
+
+    # The commands after a failed one are still sent
+    assert [len(x) for x in endpoint.requests] == [2, 1]
+    errors = [x for x in caplog.records if x.levelname == "ERROR"]
+    assert [x.command["type"] for x in errors] == ["item_add", "item_update"]
+    assert errors[0].sync_status == {"error_code": 15, "error": "Invalid temporary id"}
+    assert "Sent 3 Todoist commands in 2 batches" in caplog.messages
+
+
+def test_batch_size_is_limited():
+    writer = TodoistBatchWriter(TodoistRepository(), batch_size=1000)
+    assert writer.batch_size == MAX_BATCH_SIZE
+
+
+def test_get_todoist_writer():
+    repo = TodoistRepository()
+    with mock.patch.object(settings, "todoist_concurrency", 2):
+        writer = get_todoist_writer(repo)
+    assert isinstance(writer, TodoistConcurrentWriter)
+    assert (writer.todoist_repo, writer.max_concurrency) == (repo, 2)
+
+    with mock.patch.object(settings, "todoist_batch_size", 50):
+        writer = get_todoist_writer(repo)
+    assert isinstance(writer, TodoistBatchWriter)
+    assert (writer.todoist_repo, writer.batch_size) == (repo, 50)
+
+
+class TestTodoistConcurrentWriter:
+    @pytest.fixture(autouse=True)
+    def mocks(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.repo = mock.AsyncMock()
+        self.repo.create_task.side_effect = self.create_task
+        self.repo.update_task.side_effect = self.update_task
+
+    async def send(self, content: str) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Later writes finish first
+        await asyncio.sleep(0.01 / int(content.split()[-1]))
+        self.in_flight -= 1
+        if content.startswith("fail"):
+            raise ValueError(f"error {content}")
+
+    async def create_task(self, task_create: TaskCreate) -> Task:
+        await self.send(task_create.content)
+        return Task(id=f"id-{task_create.content}", **task_create.dict())
+
+    async def update_task(self, task_id: str, task_update: TaskUpdate) -> Task:
+        assert task_update.content is not None
+        await self.send(task_update.content)
+        return TASK.copy(update={"id": task_id, "content": task_update.content})
+
+    @pytest.mark.asyncio
+    async def test_flush(self):
+        writer = TodoistConcurrentWriter(self.repo, max_concurrency=2)
+        temp_ids = [writer.create_task(get_task_create(f"Task {i}")) for i in range(1, 5)]
+        writer.update_task(TASK, TaskUpdate(content="Task 5"))
+
+        temp_id_mapping = await writer.flush()
+
+        assert temp_id_mapping == {x: f"id-Task {i}" for i, x in enumerate(temp_ids, 1)}
+        assert self.max_in_flight == 2
+        assert self.repo.create_task.call_count == 4
+        self.repo.update_task.assert_called_once_with("task-1", TaskUpdate(content="Task 5"))
+        assert await writer.flush() == {}
+        assert self.repo.create_task.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_failed_writes(self, caplog):
+        writer = TodoistConcurrentWriter(self.repo, max_concurrency=0)
+        writer.create_task(get_task_create("fail 1"))
+        writer.create_task(get_task_create("Task 2"))
+        writer.update_task(TASK, TaskUpdate(content="fail 3"))
+        writer.create_task(get_task_create("Task 4"))
+
+        with pytest.raises(ClickException, match="2 of 4 Todoist writes failed"):
+            await writer.flush()
+
+        # A failed write does not stop the rest
+        assert self.repo.create_task.call_count == 3
+        assert self.max_in_flight == 1
+        # The failures are logged in the order the writes were queued
+        errors = [x for x in caplog.records if x.levelname == "ERROR"]
+        assert [x.message for x in errors] == [
+            "Todoist write failed for task 'fail 1': error fail 1",
+            "Todoist write failed for task 'Source 1 1x01': error fail 3",
+        ]
+        assert errors[0].exc_info[0] is ValueError
+
+    @pytest.mark.asyncio
+    async def test_cancelled_write(self):
+        self.repo.create_task.side_effect = asyncio.CancelledError()
+        writer = TodoistConcurrentWriter(self.repo, max_concurrency=2)
+        writer.create_task(get_task_create("Task 1"))
+        with pytest.raises(asyncio.CancelledError):
+            await writer.flush()
@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from os import getpid
+from unittest import mock
+
+import pytest
+
+from app.core.workers import WorkerPool
+from app.settings import settings
+
+
+def get_worker_ids(value: int) -> tuple[int, int, int]:
+    return value, getpid(), threading.get_ident()
+
+
+@pytest.fixture
+def pool():
+    worker_pool = WorkerPool()
+    yield worker_pool
+    worker_pool.shutdown()
+
+
+@pytest.mark.asyncio
+@mock.patch.object(settings, "parser_workers", 0)
+async def test_run_inline(pool):
+    assert await pool.run(get_worker_ids, 1) == (1, getpid(), threading.get_ident())
+    assert pool._executor is None
+
+
+@pytest.mark.asyncio
+@mock.patch.object(settings, "parser_workers", 2)
+@mock.patch.object(settings, "parser_pool", "thread")
+async def test_run_thread_pool(pool):
+    value, pid, thread_id = await pool.run(get_worker_ids, 1)
+    assert (value, pid) == (1, getpid())
+    assert thread_id != threading.get_ident()
+    assert isinstance(pool._executor, ThreadPoolExecutor)
+
+
+@pytest.mark.asyncio
+@mock.patch.object(settings, "parser_workers", 2)
+@mock.patch.object(settings, "parser_pool", "process")
+async def test_run_process_pool(pool):
+    value, pid, _ = await pool.run(get_worker_ids, 1)
+    assert (value, pid != getpid()) == (1, True)
+    assert isinstance(pool._executor, ProcessPoolExecutor)
+
+
+@pytest.mark.asyncio
+@mock.patch.object(settings, "parser_workers", 1)
+@mock.patch.object(settings, "parser_pool", "thread")
+async def test_executor_is_reused_until_shutdown(pool):
+    await pool.run(get_worker_ids, 1)
+    executor = pool._executor
+    await pool.run(get_worker_ids, 2)
+    assert pool._executor is executor
+
+    pool.shutdown()
+    assert pool._executor is None
+    pool.shutdown()
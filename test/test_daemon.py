@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import os
+import signal
+from time import time
+from unittest import mock
+
+import pytest
+from click import ClickException
+
+from app.core.cadence import AdaptivePollingPolicy, ReleaseHistory, date_to_timestamp
+from app.core.sharding import Shard, filter_shard
+from app.core.state_store import StateStore
+from app.daemon import Daemon, run_daemon
+from app.settings import settings
+from test.test_main import get_non_scheduled_episodes, get_scheduled_episodes, get_sources
+
+
+class TestRunCycle:
+    @pytest.fixture(autouse=True)
+    def mocks(self):
+        self.gefs_sm = mock.patch("app.daemon.get_episodes_from_source")
+        self.ses_sm = mock.patch("app.daemon.ScheduledEpisodesSink")
+        self.nses_sm = mock.patch("app.daemon.NonScheduledEpisodesSink")
+        self.gst_sm = mock.patch("app.daemon.get_source_tracker")
+        self.grc_sm = mock.patch("app.daemon.get_result_cache")
+
+        self.gefs_m = self.gefs_sm.start()
+        self.ses_m = self.ses_sm.start()
+        self.nses_m = self.nses_sm.start()
+        self.gst_m = self.gst_sm.start()
+        self.grc_m = self.grc_sm.start()
+
+        self.ses_m.return_value = mock.AsyncMock()
+        self.nses_m.return_value = mock.AsyncMock()
+
+        yield
+
+        self.gefs_sm.stop()
+        self.ses_sm.stop()
+        self.nses_sm.stop()
+        self.gst_sm.stop()
+        self.grc_sm.stop()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("dry_run", [True, False])
+    async def test_run_cycle(self, dry_run):
+        source = get_sources()[0]
+        scheduled_episodes = get_scheduled_episodes()
+        non_scheduled_episodes = get_non_scheduled_episodes()
+        self.gefs_m.return_value = scheduled_episodes + non_scheduled_episodes
+
+        await Daemon([source], dry_run, "refresh").run_cycle(source)
+
+        self.grc_m.assert_called_once_with("refresh")
+        self.gefs_m.assert_called_once_with(
+            source,
+            disable_filter=False,
+            tracker=self.gst_m.return_value,
+            result_cache=self.grc_m.return_value,
+        )
+        self.grc_m.return_value.close.assert_called_once_with()
+        self.ses_m.assert_called_once_with(assume_new=False, dry_run=dry_run)
+        self.ses_m.return_value.process.assert_called_once_with(scheduled_episodes)
+        self.nses_m.assert_called_once_with(assume_new=False, dry_run=dry_run)
+        self.nses_m.return_value.process.assert_called_once_with(non_scheduled_episodes)
+        if dry_run:
+            self.gst_m.return_value.commit.assert_not_called()
+        else:
+            self.gst_m.return_value.commit.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_run_cycle_without_episodes(self):
+        source = get_sources()[0]
+        self.gefs_m.return_value = []
+        self.gst_m.return_value = None
+        self.grc_m.return_value = None
+
+        await Daemon([source], False).run_cycle(source)
+
+        self.ses_m.assert_not_called()
+        self.nses_m.assert_not_called()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("dry_run", [True, False])
+    async def test_run_cycle_records_releases(self, tmp_path, dry_run):
+        source = get_sources()[0]
+        scheduled_episodes = get_scheduled_episodes()
+        non_scheduled_episodes = get_non_scheduled_episodes()
+        self.gefs_m.return_value = scheduled_episodes + non_scheduled_episodes
+        self.nses_m.return_value.process.return_value = non_scheduled_episodes[:1]
+        daemon = Daemon([source], dry_run)
+        daemon.release_history = StateStore(tmp_path, ReleaseHistory)
+
+        start = time()
+        await daemon.run_cycle(source)
+
+        history = daemon.release_history.get("Source 0")
+        if dry_run:
+            assert history is None
+            return
+        assert history is not None
+        released_dates = {x.released_date for x in scheduled_episodes if x.released_date}
+        assert history.releases[:-1] == sorted(date_to_timestamp(x) for x in released_dates)
+        assert history.releases[-1] >= start
+
+    @pytest.mark.asyncio
+    async def test_run_cycle_without_new_releases(self, tmp_path):
+        source = get_sources()[0]
+        self.gefs_m.return_value = get_non_scheduled_episodes()
+        self.nses_m.return_value.process.return_value = []
+        daemon = Daemon([source], False)
+        daemon.release_history = StateStore(tmp_path, ReleaseHistory)
+
+        await daemon.run_cycle(source)
+
+        assert daemon.release_history.get("Source 0") is None
+
+
+@mock.patch.object(settings, "daemon_interval", 100)
+@mock.patch.object(settings, "daemon_intervals", {"Source 1": 10})
+@mock.patch.object(settings, "daemon_jitter", 0.5)
+def test_get_interval():
+    source_0, source_1 = get_sources()[:2]
+    daemon = Daemon([source_0, source_1], False)
+
+    intervals = [daemon.get_interval(source_0) for _ in range(100)]
+    assert all(50 <= x <= 150 for x in intervals)
+    assert len(set(intervals)) > 1
+    assert all(5 <= daemon.get_interval(source_1) <= 15 for _ in range(100))
+
+
+@mock.patch.object(settings, "daemon_interval", 100)
+@mock.patch.object(settings, "daemon_jitter", 0)
+def test_get_interval_adaptive(tmp_path):
+    source_0, source_1 = get_sources()[:2]
+    daemon = Daemon([source_0, source_1], False)
+    daemon.polling_policy = AdaptivePollingPolicy(min_interval=10, max_interval=1000)
+    daemon.release_history = StateStore(tmp_path, ReleaseHistory)
+    now = time()
+    daemon.release_history.set("Source 0", ReleaseHistory(releases=[now - 200, now + 100]))
+
+    assert 10 <= daemon.get_interval(source_0) <= 100 - 0.05 * 300
+    # Sources without a known cadence use the fixed interval
+    assert daemon.get_interval(source_1) == 100
+
+
+@mock.patch.object(settings, "daemon_interval", 0.01)
+@mock.patch.object(settings, "daemon_intervals", {})
+@mock.patch.object(settings, "daemon_jitter", 0)
+class TestRun:
+    @pytest.mark.asyncio
+    async def test_sources_run_on_their_interval(self, caplog):
+        caplog.set_level(logging.INFO)
+        sources = get_sources()[:2]
+        daemon = Daemon(sources, False)
+        cycles = []
+
+        async def run_cycle(source):
+            cycles.append(source.inputs.source_name)
+            if len(cycles) == 2:
+                raise ValueError("error")
+            if len(cycles) == 6:
+                daemon.stop()
+                daemon.stop()
+
+        with mock.patch.object(daemon, "run_cycle", run_cycle):
+            await asyncio.wait_for(daemon.run(), 1)
+
+        assert cycles.count("Source 0") >= 2
+        assert cycles.count("Source 1") >= 2
+        errors = [x for x in caplog.records if x.levelname == "ERROR"]
+        assert len(errors) == 1
+        assert errors[0].exc_info[0] is ValueError
+        assert caplog.messages.count("Stopping daemon after the cycles in progress finish") == 1
+        assert caplog.messages[-1] == "Daemon stopped"
+
+    @pytest.mark.asyncio
+    async def test_sigterm_waits_for_cycles_in_progress(self):
+        daemon = Daemon(get_sources()[:1], False)
+        finished = []
+
+        async def run_cycle(_source):
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.sleep(0.05)
+            finished.append(True)
+
+        with mock.patch.object(daemon, "run_cycle", run_cycle):
+            await asyncio.wait_for(daemon.run(), 1)
+
+        assert finished == [True]
+        # The signal handlers are restored once the daemon stops
+        assert signal.getsignal(signal.SIGTERM) == signal.SIG_DFL
+
+
+class TestRunDaemon:
+    @pytest.fixture(autouse=True)
+    def mocks(self):
+        self.daemon_sm = mock.patch("app.daemon.Daemon")
+        self.gs_sm = mock.patch("app.daemon.get_sources")
+        self.sl_sm = mock.patch("app.daemon.setup_logging")
+        self.cm_sm = mock.patch("app.daemon.client_manager")
+        self.wp_sm = mock.patch("app.daemon.worker_pool")
+        self.ds_sm = mock.patch.object(settings, "disabled_sources", ["Source 1"])
+
+        self.daemon_m = self.daemon_sm.start()
+        self.gs_m = self.gs_sm.start()
+        self.sl_m = self.sl_sm.start()
+        self.cm_m = self.cm_sm.start()
+        self.wp_m = self.wp_sm.start()
+        self.ds_sm.start()
+
+        self.daemon_m.return_value = mock.AsyncMock()
+        self.cm_m.aclose = mock.AsyncMock()
+        self.gs_m.return_value = get_sources()
+
+        yield
+
+        self.daemon_sm.stop()
+        self.gs_sm.stop()
+        self.sl_sm.stop()
+        self.cm_sm.stop()
+        self.wp_sm.stop()
+        self.ds_sm.stop()
+
+    def assert_shutdown(self):
+        self.sl_m.assert_called_once_with()
+        self.cm_m.aclose.assert_called_once_with()
+        self.wp_m.shutdown.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_ok(self):
+        await run_daemon(dry_run=True, result_cache="bypass")
+
+        sources = [x for x in get_sources() if x.inputs.source_name != "Source 1"]
+        self.daemon_m.assert_called_once_with(sources, True, "bypass")
+        self.daemon_m.return_value.run.assert_called_once_with()
+        self.assert_shutdown()
+
+    @pytest.mark.asyncio
+    async def test_shard(self):
+        shard = Shard(index=0, count=2)
+        await run_daemon(shard=shard)
+
+        sources = filter_shard(get_sources(), shard)
+        sources = [x for x in sources if x.inputs.source_name != "Source 1"]
+        self.daemon_m.assert_called_once_with(sources, False, "use")
+        self.daemon_m.return_value.run.assert_called_once_with()
+        self.assert_shutdown()
+
+    @pytest.mark.asyncio
+    async def test_exception(self, caplog):
+        self.daemon_m.return_value.run.side_effect = ValueError("error")
+        with pytest.raises(ClickException, match="Internal error: error"):
+            await run_daemon()
+        assert caplog.records[-1].message == "Internal error"
+        self.assert_shutdown()
+
+    @pytest.mark.asyncio
+    async def test_click_exception(self):
+        self.daemon_m.return_value.run.side_effect = ClickException("error")
+        with pytest.raises(ClickException, match="error"):
+            await run_daemon()
+        self.assert_shutdown()
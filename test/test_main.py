@@ -1,3 +1,4 @@
+import asyncio
 from json import loads
 from pathlib import Path
 from unittest import mock
@@ -5,6 +6,7 @@ from unittest import mock
 import pytest
 from click import ClickException
 
+from app.core.sharding import Shard, filter_shard
 from app.main import _main, main
 from app.models.episodes import NonScheduledEpisode, ScheduledEpisode
 from app.models.source import Source
@@ -30,22 +32,59 @@ def get_non_scheduled_episodes():
     return [NonScheduledEpisode(**x) for x in data]
 
 
+def sort_episodes(episodes):
+    return sorted(episodes, key=lambda x: (x.source_name, x.chapter_id))
+
+
+class FakeSink:
+    """Records the batches received by a sink, optionally raising an error."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.batches = []
+        self.init_kwargs = []
+
+    def __call__(self, **kwargs):
+        self.init_kwargs.append(kwargs)
+        return self
+
+    async def consume(self, queue, on_processed):
+        while (episodes := await queue.get()) is not None:
+            if self.error:
+                raise self.error
+            self.batches.append(episodes)
+            on_processed(episodes)
+
+    @property
+    def episodes(self):
+        return sort_episodes(x for batch in self.batches for x in batch)
+
+
 class TestInnerMain:
     @pytest.fixture(autouse=True)
     def mocks(self):
         self.settings_sm = mock.patch("app.main.settings")
         self.gs_sm = mock.patch("app.main.get_sources")
         self.ps_sm = mock.patch("app.main.process_source")
-        self.pse_sm = mock.patch("app.main.process_scheduled_episodes")
-        self.pnse_sm = mock.patch("app.main.process_non_scheduled_episodes")
+        self.scheduled_sink = FakeSink()
+        self.non_scheduled_sink = FakeSink()
+        self.pse_sm = mock.patch("app.main.ScheduledEpisodesSink", self.scheduled_sink)
+        self.pnse_sm = mock.patch("app.main.NonScheduledEpisodesSink", self.non_scheduled_sink)
+        self.gst_sm = mock.patch("app.main.get_source_tracker")
+        self.grc_sm = mock.patch("app.main.get_result_cache")
 
         self.settings_m = self.settings_sm.start()
         self.gs_m = self.gs_sm.start()
         self.ps_m = self.ps_sm.start()
-        self.pse_m = self.pse_sm.start()
-        self.pnse_m = self.pnse_sm.start()
+        self.pse_sm.start()
+        self.pnse_sm.start()
+        self.gst_m = self.gst_sm.start()
+        self.grc_m = self.grc_sm.start()
 
         self.gs_m.return_value = get_sources()
+        self.settings_m.pipeline_queue_size = 1
+        self.settings_m.source_timeout = 0
+        self.settings_m.run_timeout = 0
 
         yield
 
@@ -54,6 +93,8 @@ class TestInnerMain:
         self.ps_sm.stop()
         self.pse_sm.stop()
         self.pnse_sm.stop()
+        self.gst_sm.stop()
+        self.grc_sm.stop()
 
     @pytest.mark.parametrize("disabled_sources", ["Source 1,Source 3", list()])
     @pytest.mark.parametrize("entire_source", ["Source 1", None])
@@ -66,8 +107,8 @@ class TestInnerMain:
         scheduled_episodes = get_scheduled_episodes()
         non_scheduled_episodes = get_non_scheduled_episodes()
         episodes = scheduled_episodes + non_scheduled_episodes
-        self.ps_m.side_effect = lambda x: [
-            k for k in episodes if k.source_name == x.inputs.source_name
+        self.ps_m.side_effect = lambda x, _tracker, _result_cache: [
+            k for k in episodes if k.source.inputs.source_name == x.inputs.source_name
         ]
 
         await _main(entire_source, dry_run)
@@ -91,21 +132,174 @@ class TestInnerMain:
             exp_non_scheduled_episodes = non_scheduled_episodes
 
         assume_new = entire_source is not None
-        self.pse_m.assert_called_once_with(
-            exp_scheduled_episodes, assume_new=assume_new, dry_run=dry_run
-        )
-        self.pnse_m.assert_called_once_with(
-            exp_non_scheduled_episodes, assume_new=assume_new, dry_run=dry_run
+        sink_kwargs = [{"assume_new": assume_new, "dry_run": dry_run}]
+        assert self.scheduled_sink.init_kwargs == sink_kwargs
+        assert self.non_scheduled_sink.init_kwargs == sink_kwargs
+        assert self.scheduled_sink.episodes == sort_episodes(exp_scheduled_episodes)
+        assert self.non_scheduled_sink.episodes == sort_episodes(exp_non_scheduled_episodes)
+        # Each source is sent to the sinks in its own batch
+        for sink in (self.scheduled_sink, self.non_scheduled_sink):
+            assert all(len({x.source_name for x in batch}) == 1 for batch in sink.batches)
+
+        tracker = self.gst_m.return_value
+        if assume_new:
+            self.gst_m.assert_not_called()
+            assert all(x.args[1] is None for x in self.ps_m.call_args_list)
+        else:
+            self.gst_m.assert_called_once_with()
+            assert all(x.args[1] is tracker for x in self.ps_m.call_args_list)
+        if assume_new or dry_run:
+            tracker.commit.assert_not_called()
+        else:
+            # Sources without episodes are finished too, they have nothing to reconcile
+            tracker.commit.assert_called_once()
+            committed_sources = tracker.commit.call_args.args[0]
+            assert sorted(x.inputs.source_name for x in committed_sources) == sorted(
+                x.inputs.source_name for x in get_sources()
+            )
+
+        result_cache = self.grc_m.return_value
+        self.grc_m.assert_called_once_with("use")
+        assert all(x.args[2] is result_cache for x in self.ps_m.call_args_list)
+        result_cache.close.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", ["refresh", "bypass"])
+    async def test_result_cache_mode(self, mode):
+        self.ps_m.return_value = []
+        self.grc_m.return_value = None
+        await _main(None, False, mode)
+        self.grc_m.assert_called_once_with(mode)
+        assert all(x.args[2] is None for x in self.ps_m.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_episodes_are_processed_before_slow_sources_finish(self):
+        scheduled_episodes = get_scheduled_episodes()
+        source_names = {x.source_name for x in scheduled_episodes}
+        slow_source_name = sorted(source_names)[0]
+
+        async def process_source(source: Source, _tracker, _result_cache):
+            source_name = source.inputs.source_name
+            if source_name == slow_source_name:
+                # Only finishes once the episodes of the rest of the sources are processed
+                while len(self.scheduled_sink.batches) < len(source_names) - 1:
+                    await asyncio.sleep(0)
+            return [k for k in scheduled_episodes if k.source.inputs.source_name == source_name]
+
+        self.ps_m.side_effect = process_source
+        await asyncio.wait_for(_main(None, False), 1)
+
+        assert self.scheduled_sink.batches[-1][0].source_name == slow_source_name
+        assert self.scheduled_sink.episodes == sort_episodes(scheduled_episodes)
+
+    @pytest.mark.asyncio
+    async def test_source_timeout(self, caplog):
+        self.settings_m.source_timeout = 0.01
+
+        async def process_source(source: Source, _tracker, _result_cache):
+            if source.inputs.source_name == "Source 0":
+                await asyncio.sleep(1)
+            return [k for k in episodes if k.source.inputs.source_name == source.inputs.source_name]
+
+        episodes = get_scheduled_episodes()
+        self.ps_m.side_effect = process_source
+        await _main(None, False)
+
+        assert self.scheduled_sink.episodes == [x for x in episodes if x.source_name == "Source 1"]
+        errors = [x.message for x in caplog.records if x.levelname == "ERROR"]
+        assert errors == ["Timed out processing source 'Source 0' after 0s"]
+
+    @pytest.mark.asyncio
+    async def test_shard(self):
+        self.ps_m.return_value = []
+        shard = Shard(index=0, count=2)
+        await _main(None, False, shard=shard)
+
+        shard_sources = filter_shard(get_sources(), shard)
+        assert 0 < len(shard_sources) < len(get_sources())
+        assert [x.args[0] for x in self.ps_m.call_args_list] == shard_sources
+
+    @pytest.mark.asyncio
+    async def test_source_with_both_episode_types(self):
+        self.gs_m.return_value = get_sources()[:1]
+        scheduled_episodes = get_scheduled_episodes()[:1]
+        non_scheduled_episodes = [
+            x.copy(update={"source_name": scheduled_episodes[0].source_name})
+            for x in get_non_scheduled_episodes()[:1]
+        ]
+        self.ps_m.return_value = scheduled_episodes + non_scheduled_episodes
+
+        await _main(None, False)
+
+        assert self.scheduled_sink.batches == [scheduled_episodes]
+        assert self.non_scheduled_sink.batches == [non_scheduled_episodes]
+        self.gst_m.return_value.commit.assert_called_once_with(get_sources()[:1])
+
+    @pytest.mark.asyncio
+    async def test_run_deadline(self, caplog):
+        self.settings_m.run_timeout = 0.05
+        episodes = get_scheduled_episodes() + get_non_scheduled_episodes()
+
+        async def process_source(source: Source, _tracker, _result_cache):
+            if source.inputs.source_name == "Source 0":
+                await asyncio.sleep(1)
+            return [k for k in episodes if k.source.inputs.source_name == source.inputs.source_name]
+
+        self.ps_m.side_effect = process_source
+        err = "Run deadline of 0s exceeded, 3 of 4 sources finished"
+        with pytest.raises(ClickException, match=err):
+            await _main(None, False)
+
+        tracker = self.gst_m.return_value
+        tracker.commit.assert_called_once()
+        committed_sources = tracker.commit.call_args.args[0]
+        assert sorted(x.inputs.source_name for x in committed_sources) == [
+            "Source 1",
+            "Source 3",
+            "SpyXFamily",
+        ]
+        self.grc_m.return_value.close.assert_called_once_with()
+        errors = [x.message for x in caplog.records if x.levelname == "ERROR"]
+        assert errors == ["Run deadline of 0s exceeded, cancelled the sources in progress"]
+
+    @pytest.mark.asyncio
+    async def test_episodes_named_differently_than_their_source(self):
+        # The SpyXFamily provider names its episodes "Spy X Family"
+        non_scheduled_episodes = get_non_scheduled_episodes()
+        self.ps_m.side_effect = lambda x, _tracker, _result_cache: [
+            k for k in non_scheduled_episodes if k.source.inputs.source_name == x.inputs.source_name
+        ]
+
+        await _main(None, False)
+
+        assert "Spy X Family" in {x.source_name for x in self.non_scheduled_sink.episodes}
+        tracker = self.gst_m.return_value
+        committed_sources = tracker.commit.call_args.args[0]
+        assert sorted(x.inputs.source_name for x in committed_sources) == sorted(
+            x.inputs.source_name for x in get_sources()
         )
 
+    @pytest.mark.asyncio
+    async def test_tracker_not_committed_on_error(self):
+        self.ps_m.side_effect = lambda x, _tracker, _result_cache: [
+            k
+            for k in get_non_scheduled_episodes()
+            if k.source.inputs.source_name == x.inputs.source_name
+        ]
+        self.non_scheduled_sink.error = ClickException("Error")
+        with pytest.raises(ClickException, match="Error"):
+            await _main(None, False)
+        self.gst_m.return_value.commit.assert_not_called()
+        self.grc_m.return_value.close.assert_called_once_with()
+
     @pytest.mark.asyncio
     @pytest.mark.parametrize("dry_run", [True, False])
     async def test_error_getting_episodes_from_source(self, caplog, dry_run):
-        def process_source(source: Source):
+        def process_source(source: Source, _tracker, _result_cache):
             source_name = source.inputs.source_name
             if source_name == "Source 0":
                 raise Exception("Error")
-            return [k for k in episodes if k.source_name == source_name]
+            return [k for k in episodes if k.source.inputs.source_name == source_name]
 
         scheduled_episodes = get_scheduled_episodes()
         non_scheduled_episodes = get_non_scheduled_episodes()
@@ -115,12 +309,8 @@ class TestInnerMain:
         await _main(None, dry_run)
 
         exp_scheduled_episodes = [x for x in scheduled_episodes if x.source_name != "Source 0"]
-        self.pse_m.assert_called_once_with(
-            exp_scheduled_episodes, assume_new=False, dry_run=dry_run
-        )
-        self.pnse_m.assert_called_once_with(
-            non_scheduled_episodes, assume_new=False, dry_run=dry_run
-        )
+        assert self.scheduled_sink.episodes == sort_episodes(exp_scheduled_episodes)
+        assert self.non_scheduled_sink.episodes == sort_episodes(non_scheduled_episodes)
 
         log_records = [x for x in caplog.records if x.levelname == "ERROR"]
         assert len(log_records) == 1
@@ -144,29 +334,45 @@ class TestMain:
     def mocks(self):
         self.inner_main_sm = mock.patch("app.main._main")
         self.sl_sm = mock.patch("app.main.setup_logging")
+        self.cm_sm = mock.patch("app.main.client_manager")
+        self.wp_sm = mock.patch("app.main.worker_pool")
         self.inner_main_m = self.inner_main_sm.start()
         self.sl_m = self.sl_sm.start()
+        self.cm_m = self.cm_sm.start()
+        self.wp_m = self.wp_sm.start()
+        self.cm_m.aclose = mock.AsyncMock()
         yield
         self.inner_main_sm.stop()
+        self.cm_sm.stop()
+        self.wp_sm.stop()
 
     @pytest.mark.asyncio
     async def test_without_entire_source(self, caplog):
         await main()
-        self.inner_main_m.assert_called_once_with(None, False)
+        self.inner_main_m.assert_called_once_with(None, False, "use", None)
+        self.cm_m.aclose.assert_awaited_once_with()
+        self.wp_m.shutdown.assert_called_once_with()
         assert len(caplog.records) == 0
 
     @pytest.mark.asyncio
     @pytest.mark.parametrize("dry_run", [True, False])
     async def test_with_entire_source(self, caplog, dry_run):
         await main(entire_source="Source 1", dry_run=dry_run)
-        self.inner_main_m.assert_called_once_with("Source 1", dry_run)
+        self.inner_main_m.assert_called_once_with("Source 1", dry_run, "use", None)
         assert len(caplog.records) == 0
 
+    @pytest.mark.asyncio
+    async def test_with_shard(self):
+        shard = Shard(index=1, count=2)
+        await main(result_cache="bypass", shard=shard)
+        self.inner_main_m.assert_called_once_with(None, False, "bypass", shard)
+
     @pytest.mark.asyncio
     async def test_exception(self, caplog):
         self.inner_main_m.side_effect = Exception("test")
         with pytest.raises(ClickException, match="Internal error: test"):
             await main()
+        self.cm_m.aclose.assert_awaited_once_with()
 
         assert len(caplog.records) == 1
         log_record = caplog.records[0]
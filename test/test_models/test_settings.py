@@ -0,0 +1,34 @@
+import pytest
+from pydantic import ValidationError
+
+from app.models.settings import Settings
+
+
+def build_settings(**kwargs):
+    return Settings(
+        aws_access_key_id="aws_access_key_id",
+        aws_bucket_name="aws_bucket_name",
+        aws_region_name="aws_region_name",
+        aws_secret_access_key="aws_secret_access_key",
+        todoist_api_key="todoist_api_key",
+        **kwargs,
+    )
+
+
+class TestMappingSettings:
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            ("TheTVDB=3600,InManga=60.5", {"TheTVDB": 3600, "InManga": 60.5}),
+            ("TheTVDB=3600,", {"TheTVDB": 3600}),
+            ("", {}),
+            ({"TheTVDB": 1}, {"TheTVDB": 1}),
+        ],
+    )
+    def test_parse_mapping(self, value, expected):
+        assert build_settings(http_cache_ttl=value).http_cache_ttl == expected
+
+    @pytest.mark.parametrize("value", ["TheTVDB", "TheTVDB=abc"])
+    def test_parse_mapping_invalid(self, value):
+        with pytest.raises(ValidationError, match="http_cache_ttl"):
+            build_settings(http_cache_ttl=value)
@@ -0,0 +1,29 @@
+from importlib.util import find_spec
+from unittest import mock
+
+import pytest
+
+from app.core.workers import worker_pool
+from app.settings import settings
+
+
+@pytest.fixture(params=["lxml", "html.parser"])
+def html_parser(request):
+    """Runs a provider test with every HTML parser backend."""
+    if request.param == "lxml" and find_spec("lxml") is None:
+        pytest.skip("lxml is not installed")
+    with mock.patch.object(settings, "html_parser", request.param):
+        yield request.param
+
+
+@pytest.fixture(
+    params=[(0, "thread"), (2, "thread"), (2, "process")], ids=["inline", "thread", "process"]
+)
+def parser_pool(request):
+    """Runs a provider test parsing in the event loop and in every kind of worker pool."""
+    workers, pool = request.param
+    with mock.patch.object(settings, "parser_workers", workers), mock.patch.object(
+        settings, "parser_pool", pool
+    ):
+        yield pool
+    worker_pool.shutdown()
@@ -6,6 +6,7 @@ import pytest
 from click import ClickException
 from pytest_httpx._httpx_mock import HTTPXMock
 
+from app.models.episodes import NonScheduledEpisode
 from app.models.inputs import InMangaInputs
 from app.models.source import Source
 from app.providers.inmanga import InMangaProvider
@@ -43,6 +44,7 @@ def test_process_chapter_id(chapter_id, expected):
 
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("html_parser", "parser_pool")
 async def test_inmanga(httpx_mock: HTTPXMock):
     httpx_mock.add_response(content=DATA_FILES_PATH.joinpath("inputs.html").read_bytes())
     result = await InMangaProvider().process_source(source=SOURCE)
@@ -60,3 +62,49 @@ async def test_inmanga_fail(httpx_mock: HTTPXMock, caplog):
     with pytest.raises(ClickException, match="Error while fetching .*: 403 .*"):
         await InMangaProvider().process_source(source=SOURCE)
     check_invalid_request_log(caplog)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("html_parser", "parser_pool")
+async def test_inmanga_since_watermark(httpx_mock: HTTPXMock, caplog):
+    httpx_mock.add_response(content=DATA_FILES_PATH.joinpath("inputs.html").read_bytes())
+    provider = InMangaProvider()
+    pages = await provider.fetch_source(SOURCE)
+    watermark = {"chapter_uuid": "a9373a69-a005-4b22-b233-cfe444f9a8ea", "chapter_id": "2"}
+    result = await provider.parse_source_since(SOURCE, pages, watermark)
+    expected = loads(DATA_FILES_PATH.joinpath("results.json").read_text())
+
+    assert [x.chapter_id for x in result] == [x["chapter_id"] for x in expected[2:]]
+    assert provider.get_watermark(result) == provider.get_watermark(
+        await provider.parse_source(SOURCE, pages)
+    )
+    assert len(caplog.records) == 0
+
+
+@pytest.mark.asyncio
+async def test_inmanga_since_unknown_watermark(httpx_mock: HTTPXMock, caplog):
+    httpx_mock.add_response(content=DATA_FILES_PATH.joinpath("inputs.html").read_bytes())
+    provider = InMangaProvider()
+    pages = await provider.fetch_source(SOURCE)
+    watermark = {"chapter_uuid": "unknown", "chapter_id": "1000"}
+    result = await provider.parse_source_since(SOURCE, pages, watermark)
+
+    assert len(result) == len(loads(DATA_FILES_PATH.joinpath("results.json").read_text()))
+    assert caplog.records[0].message == (
+        "Last known chapter 1000 of 'One Punch Man' not found, processing all the chapters"
+    )
+
+
+def test_inmanga_get_watermark():
+    provider = InMangaProvider()
+    episodes = [
+        NonScheduledEpisode(
+            source_name="One Punch Man",
+            chapter_id=chapter_id,
+            chapter_url=f"https://inmanga.com/ver/manga/one-punch-man/{chapter_id}/{uuid}",
+            source=SOURCE,
+        )
+        for chapter_id, uuid in [("1", "uuid-1"), ("2", "uuid-2")]
+    ]
+    assert provider.get_watermark(episodes) == {"chapter_uuid": "uuid-2", "chapter_id": "2"}
+    assert provider.get_watermark([]) is None
@@ -1,59 +1,216 @@
+import logging
 from unittest import mock
 
 import pytest
 
 from app.models.inputs import InputsBase
 from app.models.source import Source
-from app.providers import process_source
+from app.providers import get_provider, process_source
+from app.providers.base import SkipSourceError
+from app.providers.inmanga import InMangaProvider
+from app.providers.spyxfamily import SpyXFamilyProvider
+from app.providers.thetvdb import TheTVDBProvider
+from app.settings import settings
 
-TEST_DATA = [
-    ("InManga", 1, 0, 0, None),
-    ("TheTVDB", 0, 1, 0, None),
-    ("SpyXFamily", 0, 0, 1, None),
-    ("Invalid", 0, 0, 0, ValueError("Invalid provider: Invalid")),
+INPUTS = InputsBase(
+    source_name="test",
+    source_encoded_name="test",
+    todoist_project_id="test",
+    todoist_section_id="test",
+)
+GET_PROVIDER_TEST_DATA = [
+    ("InManga", InMangaProvider),
+    ("TheTVDB", TheTVDBProvider),
+    ("SpyXFamily", SpyXFamilyProvider),
 ]
 
 
-@mock.patch("app.providers.spyxfamily_provider")
-@mock.patch("app.providers.thetvdb_provider")
-@mock.patch("app.providers.inmanga_provider")
-@pytest.mark.parametrize(
-    "provider, inmanga_calls, thetvdb_calls, spyxfamily_calls, exception", TEST_DATA
-)
+@pytest.mark.parametrize("provider, expected", GET_PROVIDER_TEST_DATA)
+def test_get_provider(provider, expected):
+    result = get_provider(Source(provider=provider, inputs=INPUTS))
+    assert type(result) is expected
+    assert get_provider(Source(provider=provider, inputs=INPUTS)) is result
+
+
+def test_get_provider_invalid():
+    with pytest.raises(ValueError, match="Invalid provider: Invalid"):
+        get_provider(Source(provider="Invalid", inputs=INPUTS))
+
+
+@mock.patch("app.providers.get_provider")
 @pytest.mark.asyncio
-async def test_process_source(
-    inmanga_prov_mock: mock.MagicMock,
-    thetvdb_prov_mock: mock.MagicMock,
-    spyxfamily_prov_mock: mock.MagicMock,
-    provider: str,
-    inmanga_calls: int,
-    thetvdb_calls: int,
-    spyxfamily_calls: int,
-    exception: Exception,
-):
-    inmanga_prov_mock.process_source = mock.AsyncMock()
-    thetvdb_prov_mock.process_source = mock.AsyncMock()
-    spyxfamily_prov_mock.process_source = mock.AsyncMock()
-    inputs = InputsBase(
-        source_name="test",
-        source_encoded_name="test",
-        todoist_project_id="test",
-        todoist_section_id="test",
-    )
-    source = Source(provider=provider, inputs=inputs)
-
-    if exception:
-        with pytest.raises(type(exception), match=exception.args[0]):
-            await process_source(source)
-    else:
-        result = await process_source(source)
-        if inmanga_calls:
-            assert result == inmanga_prov_mock.process_source.return_value
-        elif thetvdb_calls:
-            assert result == thetvdb_prov_mock.process_source.return_value
-        elif spyxfamily_calls:
-            assert result == spyxfamily_prov_mock.process_source.return_value
-
-    assert inmanga_prov_mock.process_source.call_count == inmanga_calls
-    assert thetvdb_prov_mock.process_source.call_count == thetvdb_calls
-    assert spyxfamily_prov_mock.process_source.call_count == spyxfamily_calls
+async def test_process_source(get_provider_m):
+    provider_m = get_provider_m.return_value
+    provider_m.get_result_cache_ttl.return_value = 300
+    provider_m.fetch_source = mock.AsyncMock()
+    provider_m.parse_source = mock.AsyncMock()
+    source = Source(provider="InManga", inputs=INPUTS)
+
+    result = await process_source(source)
+    assert result == provider_m.parse_source.return_value
+    get_provider_m.assert_called_once_with(source)
+    provider_m.fetch_source.assert_awaited_once_with(source)
+    provider_m.parse_source.assert_awaited_once_with(source, provider_m.fetch_source.return_value)
+
+
+@mock.patch("app.providers.get_provider")
+@pytest.mark.asyncio
+async def test_process_source_skipped(get_provider_m, caplog):
+    caplog.set_level(logging.INFO)
+    provider_m = get_provider_m.return_value
+    provider_m.get_result_cache_ttl.return_value = 300
+    provider_m.check_skip.side_effect = SkipSourceError("reason")
+    provider_m.fetch_source = mock.AsyncMock()
+    provider_m.parse_source = mock.AsyncMock()
+    tracker = mock.MagicMock()
+    source = Source(provider="InManga", inputs=INPUTS)
+
+    assert await process_source(source, tracker) == []
+    provider_m.check_skip.assert_called_once_with(source)
+    provider_m.fetch_source.assert_not_called()
+    provider_m.parse_source.assert_not_called()
+    tracker.is_payload_unchanged.assert_not_called()
+    assert caplog.records[0].message == "Skipping source 'test': reason"
+
+    # Untracked runs, like update-single-source, always fetch the source
+    provider_m.check_skip.reset_mock()
+    result = await process_source(source)
+    assert result == provider_m.parse_source.return_value
+    provider_m.check_skip.assert_not_called()
+    provider_m.fetch_source.assert_awaited_once_with(source)
+
+
+class TestProcessSourceTracker:
+    @pytest.fixture(autouse=True)
+    def mocks(self):
+        self.source = Source(provider="InManga", inputs=INPUTS)
+        self.tracker = mock.MagicMock()
+        self.tracker.get_watermark.return_value = None
+        self.provider_sm = mock.patch("app.providers.get_provider")
+        self.provider_m = self.provider_sm.start().return_value
+        self.provider_m.fetch_source = mock.AsyncMock(return_value=["page"])
+        self.provider_m.parse_source = mock.AsyncMock(return_value=["episode"])
+        self.provider_m.parse_source_since = mock.AsyncMock(return_value=["new episode"])
+        self.provider_m.get_watermark.return_value = None
+        self.provider_m.get_result_cache_ttl.return_value = 300
+        yield
+        self.provider_sm.stop()
+
+    @pytest.mark.asyncio
+    async def test_payload_unchanged(self):
+        self.tracker.is_payload_unchanged.return_value = True
+        assert await process_source(self.source, self.tracker) == []
+        self.tracker.is_payload_unchanged.assert_called_once_with(self.source, ["page"])
+        self.provider_m.parse_source.assert_not_called()
+        self.tracker.is_episodes_unchanged.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_episodes_unchanged(self):
+        self.tracker.is_payload_unchanged.return_value = False
+        self.tracker.is_episodes_unchanged.return_value = True
+        assert await process_source(self.source, self.tracker) == []
+        self.provider_m.parse_source.assert_awaited_once_with(self.source, ["page"])
+        self.tracker.is_episodes_unchanged.assert_called_once_with(
+            self.source, ["page"], ["episode"], None
+        )
+
+    @pytest.mark.asyncio
+    async def test_changed(self):
+        self.tracker.is_payload_unchanged.return_value = False
+        self.tracker.is_episodes_unchanged.return_value = False
+        assert await process_source(self.source, self.tracker) == ["episode"]
+        self.provider_m.process_source.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_watermark(self):
+        self.tracker.is_payload_unchanged.return_value = False
+        self.tracker.is_episodes_unchanged.return_value = False
+        self.tracker.get_watermark.return_value = {"id": "old"}
+        self.provider_m.get_watermark.return_value = {"id": "new"}
+
+        assert await process_source(self.source, self.tracker) == ["new episode"]
+        self.provider_m.parse_source.assert_not_called()
+        self.provider_m.parse_source_since.assert_awaited_once_with(
+            self.source, ["page"], {"id": "old"}
+        )
+        self.provider_m.get_watermark.assert_called_once_with(["new episode"])
+        self.tracker.is_episodes_unchanged.assert_called_once_with(
+            self.source, ["page"], ["new episode"], {"id": "new"}
+        )
+
+    @pytest.mark.asyncio
+    async def test_watermark_without_new_episodes(self):
+        self.tracker.is_payload_unchanged.return_value = False
+        self.tracker.get_watermark.return_value = {"id": "old"}
+        self.provider_m.parse_source_since.return_value = []
+
+        await process_source(self.source, self.tracker)
+        self.tracker.is_episodes_unchanged.assert_called_once_with(
+            self.source, ["page"], [], {"id": "old"}
+        )
+
+
+class TestProcessSourceResultCache:
+    @pytest.fixture(autouse=True)
+    def mocks(self):
+        self.source = Source(provider="InManga", inputs=INPUTS)
+        self.result_cache = mock.MagicMock()
+        self.result_cache.get.return_value = None
+        self.provider_sm = mock.patch("app.providers.get_provider")
+        self.provider_m = self.provider_sm.start().return_value
+        self.provider_m.get_result_cache_ttl.return_value = 300
+        self.provider_m.fetch_source = mock.AsyncMock(return_value=["page"])
+        self.provider_m.parse_source = mock.AsyncMock(return_value=["episode"])
+        self.provider_m.parse_source_since = mock.AsyncMock(return_value=["new episode"])
+        self.provider_m.get_watermark.return_value = None
+        yield
+        self.provider_sm.stop()
+
+    @pytest.mark.asyncio
+    async def test_hit(self):
+        self.result_cache.get.return_value = ["cached episode"]
+        assert await process_source(self.source, result_cache=self.result_cache) == [
+            "cached episode"
+        ]
+        self.result_cache.get.assert_called_once_with(self.source, 300)
+        self.provider_m.fetch_source.assert_not_called()
+        self.result_cache.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_miss(self):
+        assert await process_source(self.source, result_cache=self.result_cache) == ["episode"]
+        self.result_cache.set.assert_called_once_with(self.source, ["episode"])
+
+    @pytest.mark.asyncio
+    async def test_disabled_for_provider(self):
+        self.provider_m.get_result_cache_ttl.return_value = 0
+        await process_source(self.source, result_cache=self.result_cache)
+        self.result_cache.get.assert_not_called()
+        self.result_cache.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_complete_results_with_tracker_are_cached(self):
+        tracker = mock.MagicMock()
+        tracker.is_payload_unchanged.return_value = False
+        tracker.is_episodes_unchanged.return_value = True
+        tracker.get_watermark.return_value = None
+        assert await process_source(self.source, tracker, self.result_cache) == []
+        self.result_cache.set.assert_called_once_with(self.source, ["episode"])
+
+    @pytest.mark.asyncio
+    async def test_incremental_results_are_not_cached(self):
+        tracker = mock.MagicMock()
+        tracker.is_payload_unchanged.return_value = False
+        tracker.is_episodes_unchanged.return_value = False
+        tracker.get_watermark.return_value = {"id": "old"}
+        assert await process_source(self.source, tracker, self.result_cache) == ["new episode"]
+        self.result_cache.set.assert_not_called()
+
+
+def test_get_result_cache_ttl():
+    provider = InMangaProvider()
+    assert provider.get_result_cache_ttl() == 300
+    with mock.patch.object(settings, "result_cache_ttl", {"InManga": 0, "TheTVDB": 60}):
+        assert provider.get_result_cache_ttl() == 0
+        with mock.patch.object(provider, "provider_name", None):
+            assert provider.get_result_cache_ttl() == 300
@@ -36,6 +36,7 @@ class HashableDict(dict):
 
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("html_parser", "parser_pool")
 async def test_spyxfamily(httpx_mock: HTTPXMock):
     httpx_mock.add_response(content=DATA_FILES_PATH.joinpath("inputs.html").read_bytes())
     result = await SpyXFamilyProvider().process_source(source=SOURCE)
@@ -53,3 +54,13 @@ async def test_spyxfamily_fail(httpx_mock: HTTPXMock, caplog):
     with pytest.raises(ClickException, match="Error while fetching .*: 403 .*"):
         await SpyXFamilyProvider().process_source(source=SOURCE)
     check_invalid_request_log(caplog)
+
+
+@pytest.mark.asyncio
+async def test_spyxfamily_without_incremental_discovery(httpx_mock: HTTPXMock):
+    httpx_mock.add_response(content=DATA_FILES_PATH.joinpath("inputs.html").read_bytes())
+    provider = SpyXFamilyProvider()
+    pages = await provider.fetch_source(SOURCE)
+    result = await provider.parse_source_since(SOURCE, pages, {"chapter_id": "1"})
+    assert result == await provider.parse_source(SOURCE, pages)
+    assert provider.get_watermark(result) is None
@@ -1,15 +1,21 @@
+import asyncio
 import re
+from datetime import datetime, timedelta
 from json import loads
 from pathlib import Path
+from unittest import mock
 
 import pytest
 from click import ClickException
 from dateutil.parser import parse as parse_date
+from freezegun import freeze_time
 from pytest_httpx._httpx_mock import HTTPXMock
 
 from app.models.inputs import TheTVDBInputs
 from app.models.source import Source
+from app.providers.base import SkipSourceError
 from app.providers.thetvdb import TheTVDBProvider
+from app.settings import settings
 from test.test_providers import check_invalid_request_log
 
 DATA_FILES_PATH = Path(__file__).parent.parent / "data" / "thetvdb"
@@ -36,6 +42,7 @@ def get_source(name: str, encoded_name: str):
 
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("html_parser", "parser_pool")
 @params
 async def test_thetvdb(httpx_mock: HTTPXMock, name: str, encoded_name: str, caplog):
     httpx_mock.add_response(
@@ -80,7 +87,123 @@ async def test_thetvdb_fail_processing(httpx_mock: HTTPXMock, name: str, encoded
 @pytest.mark.asyncio
 @params
 async def test_thetvdb_fail_request(httpx_mock: HTTPXMock, caplog, name: str, encoded_name: str):
-    httpx_mock.add_response(content=b'{"message": "Forbidden"}', status_code=403)
+    httpx_mock.add_response(
+        url=re.compile(f".+/series/{encoded_name}/allseasons/official"),
+        content=b'{"message": "Forbidden"}',
+        status_code=403,
+    )
+    httpx_mock.add_response(
+        url=re.compile(f".+/series/{encoded_name}"),
+        content=(DATA_FILES_PATH / f"{encoded_name}/info.html").read_bytes(),
+    )
     with pytest.raises(ClickException, match="Error while fetching .*: 403 .*"):
         await TheTVDBProvider().process_source(source=get_source(name, encoded_name))
     check_invalid_request_log(caplog)
+
+
+class TestSeriesStatusCache:
+    @pytest.fixture(autouse=True)
+    def mocks(self, tmp_path, httpx_mock: HTTPXMock):
+        self.httpx_mock = httpx_mock
+        with mock.patch.object(settings, "cache_dir", tmp_path):
+            yield
+
+    def add_responses(self, encoded_name: str, info: bool = True):
+        self.httpx_mock.add_response(
+            url=re.compile(f".+/series/{encoded_name}/allseasons/official"),
+            content=(DATA_FILES_PATH / f"{encoded_name}/inputs.html").read_bytes(),
+        )
+        if info:
+            self.httpx_mock.add_response(
+                url=f"https://thetvdb.com/series/{encoded_name}",
+                content=(DATA_FILES_PATH / f"{encoded_name}/info.html").read_bytes(),
+            )
+
+    def get_info_requests(self, encoded_name: str):
+        url = f"https://thetvdb.com/series/{encoded_name}"
+        return [x for x in self.httpx_mock.get_requests() if x.url == url]
+
+    @pytest.mark.asyncio
+    async def test_status_is_cached(self):
+        self.add_responses("the-last-of-us")
+        source = get_source("The Last of Us", "the-last-of-us")
+        result = await TheTVDBProvider().process_source(source)
+
+        self.httpx_mock.reset(assert_all_responses_were_requested=True)
+        self.add_responses("the-last-of-us", info=False)
+        assert await TheTVDBProvider().process_source(source) == result
+        assert self.get_info_requests("the-last-of-us") == []
+
+    @pytest.mark.asyncio
+    async def test_status_expires(self):
+        self.add_responses("the-last-of-us")
+        source = get_source("The Last of Us", "the-last-of-us")
+        await TheTVDBProvider().process_source(source)
+
+        self.httpx_mock.reset(assert_all_responses_were_requested=True)
+        self.add_responses("the-last-of-us")
+        with mock.patch.object(settings, "thetvdb_status_ttl", 0):
+            await TheTVDBProvider().process_source(source)
+        assert len(self.get_info_requests("the-last-of-us")) == 1
+
+    @pytest.mark.asyncio
+    async def test_ended_series_status_never_expires(self, caplog):
+        self.add_responses("sherlock")
+        source = get_source("Sherlock", "sherlock")
+        await TheTVDBProvider().process_source(source)
+
+        self.httpx_mock.reset(assert_all_responses_were_requested=True)
+        self.add_responses("sherlock", info=False)
+        with mock.patch.object(settings, "thetvdb_status_ttl", 0):
+            await TheTVDBProvider().process_source(source)
+        assert self.get_info_requests("sherlock") == []
+        warnings = [x.message for x in caplog.records if x.levelname == "WARNING"]
+        assert warnings == ["Series 'Sherlock' has ended"] * 2
+
+    @pytest.mark.asyncio
+    async def test_ended_series_poll_interval(self):
+        self.add_responses("sherlock")
+        source = get_source("Sherlock", "sherlock")
+        provider = TheTVDBProvider()
+        with mock.patch.object(settings, "thetvdb_ended_poll_interval", 3600):
+            provider.check_skip(source)
+            await provider.process_source(source)
+            with pytest.raises(SkipSourceError, match="series has ended and was checked 0s ago"):
+                provider.check_skip(source)
+
+            # The source can still be fetched when it is not skipped
+            self.add_responses("sherlock", info=False)
+            await provider.process_source(source)
+
+        with freeze_time(datetime.now() + timedelta(hours=2)):
+            with mock.patch.object(settings, "thetvdb_ended_poll_interval", 3600):
+                provider.check_skip(source)
+
+    @pytest.mark.asyncio
+    async def test_poll_interval_ignores_running_series(self):
+        self.add_responses("the-last-of-us")
+        source = get_source("The Last of Us", "the-last-of-us")
+        with mock.patch.object(settings, "thetvdb_ended_poll_interval", 3600):
+            await TheTVDBProvider().process_source(source)
+            TheTVDBProvider().check_skip(source)
+
+
+@pytest.mark.asyncio
+async def test_pages_are_fetched_concurrently():
+    in_flight = []
+    max_in_flight = 0
+
+    async def send_request_page(_method, path, **_kwargs):
+        nonlocal max_in_flight
+        in_flight.append(path)
+        max_in_flight = max(max_in_flight, len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(path)
+        name = "info.html" if path == "/sherlock" else "inputs.html"
+        return (DATA_FILES_PATH / "sherlock" / name).read_text()
+
+    provider = TheTVDBProvider()
+    with mock.patch.object(provider, "_send_request_page", send_request_page):
+        result = await provider.process_source(get_source("Sherlock", "sherlock"))
+    assert max_in_flight == 2
+    assert len(result) == 12
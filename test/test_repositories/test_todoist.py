@@ -8,7 +8,7 @@ from click import ClickException
 from pytest_httpx import HTTPXMock
 
 from app.models.settings import Settings
-from app.models.todoist import Task, TaskCreate, TaskUpdate
+from app.models.todoist import SyncResult, Task, TaskCreate, TaskUpdate
 from app.repositories.todoist import TodoistRepository
 from test.test_providers import check_invalid_request_log
 
@@ -179,3 +179,40 @@ async def test_update_task_fail(httpx_mock: HTTPXMock, caplog):
     with pytest.raises(ClickException, match=msg):
         await repo.update_task("task_id", task_update)
     check_invalid_request_log(caplog)
+
+
+@pytest.mark.asyncio
+async def test_sync_ok(httpx_mock: HTTPXMock):
+    httpx_mock.add_response(
+        method="POST",
+        url="https://api.todoist.com/sync/v9/sync",
+        match_headers={"Authorization": "Bearer todoist_api_key"},
+        status_code=200,
+        json={
+            "sync_status": {"uuid-1": "ok"},
+            "temp_id_mapping": {"temp-1": "2995104339"},
+            "full_sync": True,
+        },
+    )
+    repo = TodoistRepository()
+    commands = [{"type": "item_add", "uuid": "uuid-1", "temp_id": "temp-1", "args": {}}]
+    result = await repo.sync(commands)
+    assert result == SyncResult(
+        sync_status={"uuid-1": "ok"}, temp_id_mapping={"temp-1": "2995104339"}
+    )
+
+    request = httpx_mock.get_request()
+    assert request is not None
+    assert "X-Request-Id" in request.headers
+    assert loads(request.content) == {"commands": commands}
+
+
+@pytest.mark.asyncio
+async def test_sync_fail(httpx_mock: HTTPXMock, caplog):
+    httpx_mock.add_response(400, text='{"error": "Bad Request"}')
+
+    repo = TodoistRepository()
+    msg = "Error while fetching .+: 400 .+Bad Request"
+    with pytest.raises(ClickException, match=msg):
+        await repo.sync([])
+    check_invalid_request_log(caplog)
@@ -6,8 +6,19 @@ import pytest
 from click import ClickException
 
 from app.models.inputs import InMangaInputs, SpyXFamilyInputs, TheTVDBInputs
+from app.models.settings import Settings
 from app.models.source import Source
-from app.settings import get_log_level, get_settings, get_sources, getenv_required, process_inputs
+from app.settings import (
+    OPTIONAL_SETTINGS,
+    LazySettings,
+    get_log_level,
+    get_optional_settings,
+    get_settings,
+    get_sources,
+    getenv_required,
+    load_env,
+    process_inputs,
+)
 
 INPUTS_THETVDB = TheTVDBInputs(
     source_encoded_name="test",
@@ -94,6 +105,8 @@ def test_get_settings_ok(getenv_mock, tg_active, disabled_sources):
     def custom_getenv(key: str, default: str | None = None) -> str | None:
         if key == "DISABLED_SOURCES":
             return disabled_sources
+        if key.lower() in OPTIONAL_SETTINGS:
+            return None
         if key == "TELEGRAM_TOKEN" and tg_active is False:
             return None
         elif key == "TELEGRAM_CHAT_ID" and tg_active is False:
@@ -117,6 +130,8 @@ def test_get_settings_ok(getenv_mock, tg_active, disabled_sources):
     assert settings.aws_bucket_name == "AWS_BUCKET_NAME"
     assert settings.aws_region_name == "AWS_REGION_NAME"
     assert settings.log_level == "DEBUG"
+    assert settings.http_max_connections == 100
+    assert settings.http2_enabled is False
     if disabled_sources is not None:
         assert settings.disabled_sources == ["One Piece", "The Blacklist"]
     else:
@@ -131,6 +146,8 @@ def test_get_settings_fail(getenv_mock, token, chat_id):
     def getenv_custom(key: str, default: str | None = None) -> str | None:
         if key in env_vars:
             return env_vars[key]
+        if key.lower() in OPTIONAL_SETTINGS:
+            return None
         return default or key
 
     getenv_mock.side_effect = getenv_custom
@@ -139,6 +156,70 @@ def test_get_settings_fail(getenv_mock, token, chat_id):
         get_settings()
 
 
+@mock.patch("app.settings.getenv")
+def test_get_optional_settings(getenv_mock):
+    env_vars = {"HTTP_MAX_CONNECTIONS": "5", "HTTP2_ENABLED": "true"}
+    getenv_mock.side_effect = env_vars.get
+    assert get_optional_settings() == {"http_max_connections": "5", "http2_enabled": "true"}
+
+
+@mock.patch("app.settings.get_optional_settings")
+@mock.patch("app.settings.getenv")
+def test_get_settings_invalid_optional_setting(getenv_mock, get_optional_settings_mock):
+    getenv_mock.side_effect = lambda key, default=None: default or key
+    get_optional_settings_mock.return_value = {"http_max_connections": "many"}
+    with pytest.raises(ClickException, match="Invalid settings: 1 validation error"):
+        get_settings()
+
+
+@mock.patch("app.settings.load_dotenv")
+def test_load_env(load_dotenv_mock):
+    load_env.cache_clear()
+    try:
+        load_env()
+        load_env()
+    finally:
+        load_env.cache_clear()
+    load_dotenv_mock.assert_called_once_with(override=True)
+
+
+class TestLazySettings:
+    @mock.patch("app.settings.get_settings")
+    def test_loaded_on_first_use(self, get_settings_mock):
+        settings = LazySettings()
+        get_settings_mock.assert_not_called()
+
+        assert settings.log_level is get_settings_mock.return_value.log_level
+        assert settings.telegram_enabled is get_settings_mock.return_value.telegram_enabled
+        get_settings_mock.assert_called_once_with()
+
+    @mock.patch("app.settings.get_settings")
+    def test_invalid_settings(self, get_settings_mock):
+        get_settings_mock.side_effect = ClickException("Invalid settings")
+        settings = LazySettings()
+        with pytest.raises(ClickException, match="Invalid settings"):
+            settings.log_level
+
+    def test_set_and_delete(self):
+        real_settings = Settings(
+            todoist_api_key="key",
+            aws_access_key_id="id",
+            aws_secret_access_key="secret",
+            aws_bucket_name="bucket",
+            aws_region_name="region",
+        )
+        settings = LazySettings()
+        with mock.patch("app.settings.get_settings", return_value=real_settings):
+            with mock.patch.object(settings, "telegram_token", "token"):
+                assert real_settings.telegram_token == "token"
+                assert settings.telegram_token == "token"
+            assert real_settings.telegram_token is None
+            assert settings.telegram_token is None
+
+            del settings.telegram_chat_id
+            assert not hasattr(real_settings, "telegram_chat_id")
+
+
 class TestGetSources:
     @mock.patch("app.settings.getenv")
     def test_sources_not_defined(self, getenv_mock):
@@ -0,0 +1,54 @@
+from datetime import date
+from unittest import mock
+
+import pytest
+from dateutil.parser import ParserError, parse
+
+from app.utils.dates import parse_date
+
+PARSE_DATE_TEST_CASES = [
+    ("2023-04-20", date(2023, 4, 20)),
+    ("2023-04-20T10:30:00", date(2023, 4, 20)),
+    ("2023-04-20T10:30:00Z", date(2023, 4, 20)),
+    ("2023-04-20T23:30:00.000000+02:00", date(2023, 4, 20)),
+    ("July 25, 2010", date(2010, 7, 25)),
+    ("  May 1, 2023\n", date(2023, 5, 1)),
+    ("SEPTEMBER 9,2001", date(2001, 9, 9)),
+    ("25 Jul 2010", date(2010, 7, 25)),
+    ("Jul 25, 2010", date(2010, 7, 25)),
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    parse_date.cache_clear()
+    yield
+    parse_date.cache_clear()
+
+
+@pytest.mark.parametrize("value,expected", PARSE_DATE_TEST_CASES)
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize("value", ["2023-04-20", "2023-04-20T10:30:00Z", "July 25, 2010"])
+@mock.patch("app.utils.dates.parse")
+def test_parse_date_known_formats_skip_dateutil(parse_m, value):
+    parse_date(value)
+    parse_m.assert_not_called()
+
+
+@mock.patch("app.utils.dates.parse", wraps=parse)
+def test_parse_date_is_memoized(parse_m):
+    assert parse_date("25 Jul 2010") == parse_date("25 Jul 2010")
+    parse_m.assert_called_once_with("25 Jul 2010")
+
+
+def test_parse_date_invalid():
+    with pytest.raises(ParserError):
+        parse_date("not a date")
+
+
+def test_parse_date_invalid_day():
+    with pytest.raises(ValueError):
+        parse_date("February 30, 2023")
@@ -0,0 +1,94 @@
+import logging
+from importlib.metadata import EntryPoint
+from unittest import mock
+
+import pytest
+
+from app.models.inputs import InMangaInputs, InputsBase, SpyXFamilyInputs, TheTVDBInputs
+from app.providers.inmanga import InMangaProvider
+from app.providers.spyxfamily import SpyXFamilyProvider
+from app.providers.thetvdb import TheTVDBProvider
+from app.utils.registry import (
+    BUILTIN_INPUTS,
+    BUILTIN_PROVIDERS,
+    INPUTS_GROUP,
+    PROVIDERS_GROUP,
+    EntryPointRegistry,
+    inputs_registry,
+    provider_registry,
+)
+
+GROUP = "test.group"
+BUILTINS = {"Inputs": "app.models.inputs:InputsBase"}
+
+
+@pytest.fixture
+def entry_points_m():
+    with mock.patch("app.utils.registry.entry_points", return_value=[]) as entry_points_m:
+        yield entry_points_m
+
+
+@pytest.mark.parametrize(
+    "name,expected",
+    [("InManga", InMangaInputs), ("SpyXFamily", SpyXFamilyInputs), ("TheTVDB", TheTVDBInputs)],
+)
+def test_inputs_registry(name, expected):
+    assert inputs_registry.group == INPUTS_GROUP
+    assert inputs_registry.get(name) is expected
+
+
+@pytest.mark.parametrize(
+    "name,expected",
+    [
+        ("InManga", InMangaProvider),
+        ("SpyXFamily", SpyXFamilyProvider),
+        ("TheTVDB", TheTVDBProvider),
+    ],
+)
+def test_provider_registry(name, expected):
+    assert provider_registry.group == PROVIDERS_GROUP
+    assert type(provider_registry.get(name)) is expected
+
+
+def test_builtins_match():
+    assert BUILTIN_INPUTS.keys() == BUILTIN_PROVIDERS.keys()
+
+
+def test_builtins(entry_points_m, caplog):
+    caplog.set_level(logging.DEBUG)
+    registry: EntryPointRegistry[type[InputsBase]] = EntryPointRegistry(GROUP, BUILTINS)
+    assert registry.names() == ["Inputs"]
+    assert registry.get("Inputs") is InputsBase
+    entry_points_m.assert_called_once_with(group=GROUP)
+    assert caplog.records[0].message == (
+        "Loading test.group 'Inputs' from app.models.inputs:InputsBase"
+    )
+
+
+def test_entry_points_override_builtins(entry_points_m):
+    entry_points_m.return_value = [
+        EntryPoint(name="Inputs", value="app.models.inputs:InMangaInputs", group=GROUP),
+        EntryPoint(name="Other", value="app.models.inputs:TheTVDBInputs", group=GROUP),
+    ]
+    registry: EntryPointRegistry[type[InputsBase]] = EntryPointRegistry(GROUP, BUILTINS)
+    assert registry.names() == ["Inputs", "Other"]
+    assert registry.get("Inputs") is InMangaInputs
+    assert registry.get("Other") is TheTVDBInputs
+
+
+@pytest.mark.usefixtures("entry_points_m")
+def test_objects_are_loaded_once(caplog):
+    caplog.set_level(logging.DEBUG)
+    factory = mock.MagicMock()
+    registry: EntryPointRegistry[object] = EntryPointRegistry(GROUP, BUILTINS, factory=factory)
+    assert registry.get("Inputs") is factory.return_value
+    assert registry.get("Inputs") is factory.return_value
+    factory.assert_called_once_with(InputsBase)
+    assert len(caplog.records) == 1
+
+
+@pytest.mark.usefixtures("entry_points_m")
+def test_unknown_name():
+    registry: EntryPointRegistry[type[InputsBase]] = EntryPointRegistry(GROUP, BUILTINS)
+    with pytest.raises(KeyError):
+        registry.get("Unknown")